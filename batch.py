@@ -0,0 +1,278 @@
+"""
+batch.py
+===============================================================
+대량 출발–도착(OD) 쌍 일괄 경로 계산 (`planner.py batch ...`)
+----------------------------------------------------------------
+* 입력: CSV(`origin,dest[,id]` 헤더) 또는 JSONL(`{"id", "origin", "dest"}`) 을
+  한 줄씩 스트리밍으로 읽습니다.
+* 지오코딩·ODsay 조회는 스레드 풀로 동시 처리하되 진행 중 작업 수를 제한하고,
+  점수는 기존 `choose_best_route` 로 계산합니다. 지도는 만들지 않습니다.
+* 출력: `.jsonl` (줄 단위 append) 또는 `.parquet` (pyarrow).
+  Parquet 은 footer 를 쓰기(close) 전에는 읽을 수 없으므로 `PARQUET_BATCH` 행마다
+  완결된 파일 하나를 씁니다 → `이름.parquet`, `이름.part1.parquet`, … 순서
+  (임시 파일에 쓰고 이름을 바꿔, 중간에 죽어도 읽을 수 없는 파일이 남지 않음).
+  전체는 `parquet_parts(출력)` 목록을 pyarrow 로 함께 읽으면 됩니다.
+* 체크포인트: 디스크에 완결된 행의 id 만 `<출력>.done` 에 기록 →
+  `--resume` 으로 재실행하면 이미 끝난 id 는 건너뜁니다.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Set
+
+import orjson
+from tqdm import tqdm
+
+import metrics
+import planner
+
+PARQUET_BATCH = 1000  # Parquet 파트 파일 1 개의 행 수
+# 결과 레코드 필드 – 실패 행도 같은 모양 (Parquet 스키마 고정)
+FIELDS = (
+    "id",
+    "origin",
+    "dest",
+    "status",
+    "error",
+    "o_lat",
+    "o_lng",
+    "d_lat",
+    "d_lng",
+    "n_candidates",
+    "best_idx",
+    "score",
+    "total_min",
+    "modes",
+    "segments",
+)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+def read_pairs(path: Path) -> Iterator[Dict]:
+    """CSV/JSONL → {"id", "origin", "dest"} 스트림 (id 없으면 행 번호)"""
+    with path.open(encoding="utf-8-sig", newline="") as f:
+        if path.suffix.lower() in (".jsonl", ".ndjson", ".json"):
+            rows = (orjson.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for i, row in enumerate(rows):
+            yield {
+                "id": str(row.get("id") or i),
+                "origin": str(row["origin"]).strip(),
+                "dest": str(row["dest"]).strip(),
+            }
+
+
+def plan_pair(pair: Dict, prefs) -> Dict:
+    """OD 1 쌍 → 결과 레코드 (예외는 error 필드로 기록)"""
+    with metrics.trace("batch", id=pair["id"]):
+        rec = _plan_pair(pair, prefs)
+    metrics.incr(f"batch.{rec['status']}")
+    return rec
+
+
+def _plan_pair(pair: Dict, prefs) -> Dict:
+    rec = dict.fromkeys(FIELDS)
+    rec.update(pair, status="ok")
+    try:
+        try:
+            o = planner.parse_location(pair["origin"])
+            d = planner.parse_location(pair["dest"])
+        except ValueError as e:  # 검색 결과 없음 (네트워크 오류는 아래 error)
+            rec.update(status="geocode_failed", error=str(e))
+            return rec
+        rec.update(o_lat=o[0], o_lng=o[1], d_lat=d[0], d_lng=d[1])
+        routes = planner.odsay_all_routes(o, d)
+        best_idx, segs = planner.choose_best_route(routes, prefs=prefs)
+        if not segs:
+            rec["status"] = "no_route"
+            segs = planner.fallback_route(o, d, prefs=prefs)
+        rec.update(
+            n_candidates=len(routes),
+            best_idx=best_idx,
+            score=planner.score_route(segs, prefs=prefs),
+            total_min=float(sum(s["duration_min"] for s in segs)),
+            modes="/".join(s["mode"] for s in segs),
+            segments=[
+                {
+                    "mode": s["mode"],
+                    "name": str(s["name"]),
+                    "duration_min": float(s["duration_min"]),
+                    "distance_m": float(s["distance_m"] or 0),
+                    "crowd": int(s["crowd"]),
+                }
+                for s in segs
+            ],
+        )
+    except Exception as e:  # 한 쌍의 실패가 배치 전체를 멈추지 않도록
+        rec.update(status="error", error=f"{type(e).__name__}: {e}")
+    return rec
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+class JsonlSink:
+    """줄 단위 기록 – 쓰는 즉시 flush 후 체크포인트"""
+
+    def __init__(self, path: Path, resume: bool, on_commit: Callable):
+        self.f = path.open("ab" if resume else "wb")
+        self.on_commit = on_commit
+
+    def write(self, rec: Dict):
+        self.f.write(orjson.dumps(rec) + b"\n")
+        self.f.flush()
+        self.on_commit([rec["id"]])
+
+    def close(self):
+        self.f.close()
+
+
+def parquet_parts(path: Path) -> List[Path]:
+    """Parquet 출력의 파트 파일 목록 (기록 순서)"""
+    parts = [path] if path.exists() else []
+    n = 1
+    while (p := path.with_name(f"{path.stem}.part{n}{path.suffix}")).exists():
+        parts.append(p)
+        n += 1
+    return parts
+
+
+class ParquetSink:
+    """PARQUET_BATCH 행마다 완결된 파트 파일 1 개 – 파일을 닫은 뒤에 체크포인트"""
+
+    def __init__(self, path: Path, resume: bool, on_commit: Callable):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa, self.pq = pa, pq
+        seg = pa.struct(
+            [
+                ("mode", pa.string()),
+                ("name", pa.string()),
+                ("duration_min", pa.float64()),
+                ("distance_m", pa.float64()),
+                ("crowd", pa.int8()),
+            ]
+        )
+        f64, i32, s = pa.float64(), pa.int32(), pa.string()
+        types = [s, s, s, s, s, f64, f64, f64, f64, i32, i32, f64, f64, s]
+        self.schema = pa.schema([*zip(FIELDS, types), ("segments", pa.list_(seg))])
+        parts = parquet_parts(path)
+        if not resume:  # 새 실행 – 이전 실행의 파트가 섞이지 않게
+            for p in parts:
+                p.unlink()
+            parts = []
+        self.path = path
+        self.n_parts = len(parts)
+        self.on_commit = on_commit
+        self.rows: List[Dict] = []
+
+    def _next_path(self) -> Path:
+        if self.n_parts == 0:
+            return self.path
+        return self.path.with_name(
+            f"{self.path.stem}.part{self.n_parts}{self.path.suffix}"
+        )
+
+    def write(self, rec: Dict):
+        self.rows.append(rec)
+        if len(self.rows) >= PARQUET_BATCH:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        path = self._next_path()
+        tmp = path.with_name(path.name + ".tmp")
+        self.pq.write_table(self.pa.Table.from_pylist(self.rows, self.schema), tmp)
+        os.replace(tmp, path)  # footer 까지 쓴 파일만 제 이름으로
+        self.n_parts += 1
+        self.on_commit([r["id"] for r in self.rows])
+        self.rows = []
+
+    def close(self):
+        self.flush()
+
+
+def _done_ids(ckpt: Path) -> Set[str]:
+    if not ckpt.exists():
+        return set()
+    return {line.strip() for line in ckpt.read_text(encoding="utf-8").splitlines()}
+
+
+def run_batch(
+    src: Path,
+    out: Path,
+    *,
+    workers: int = 4,
+    resume: bool = False,
+    progress: bool = True,
+) -> Dict[str, int]:
+    """
+    OD 파일을 처리해 결과를 out 에 스트리밍 기록 → 상태별 개수
+    """
+    ckpt = out.with_name(out.name + ".done")
+    done = _done_ids(ckpt) if resume else set()
+    if not resume:
+        ckpt.unlink(missing_ok=True)
+    ck = ckpt.open("a", encoding="utf-8")
+
+    def commit(ids):
+        ck.writelines(i + "\n" for i in ids)
+        ck.flush()
+
+    sink_cls = ParquetSink if out.suffix == ".parquet" else JsonlSink
+    sink = sink_cls(out, resume, commit)
+    prefs = planner.current_prefs()
+    counts: Dict[str, int] = {"skipped": 0}
+    bar = tqdm(desc="OD 쌍", unit="쌍", disable=not progress)
+
+    def collect(futs):
+        for f in futs:
+            rec = f.result()
+            sink.write(rec)
+            counts[rec["status"]] = counts.get(rec["status"], 0) + 1
+            bar.update()
+
+    try:
+        with ThreadPoolExecutor(workers) as pool:
+            pending = set()
+            for pair in read_pairs(src):
+                if pair["id"] in done:
+                    counts["skipped"] += 1
+                    continue
+                if len(pending) >= workers * 2:  # 진행 중 작업 수 제한
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                pending.add(pool.submit(plan_pair, pair, prefs))
+            collect(wait(pending).done)
+    finally:
+        sink.close()
+        ck.close()
+        bar.close()
+    return counts
+
+
+def main(argv: List[str] | None = None):
+    p = argparse.ArgumentParser(
+        prog="planner.py batch", description="OD 쌍 일괄 경로 계산 (지도 없음)"
+    )
+    p.add_argument("input", type=Path, help="CSV(origin,dest[,id]) 또는 JSONL")
+    p.add_argument("output", type=Path, help="결과 .jsonl 또는 .parquet")
+    p.add_argument("-j", "--workers", type=int, default=4, help="동시 처리 수")
+    p.add_argument("--resume", action="store_true", help="체크포인트부터 이어서")
+    p.add_argument("--no-progress", action="store_true")
+    args = p.parse_args(argv)
+    counts = run_batch(
+        args.input,
+        args.output,
+        workers=max(1, args.workers),
+        resume=args.resume,
+        progress=not args.no_progress,
+    )
+    print("[batch]", ", ".join(f"{k}={v}" for k, v in counts.items()), file=sys.stderr)
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+bench.py
+===============================================================
+계획 파이프라인 벤치마크 – 고정 픽스처 재생, 네트워크 없음
+----------------------------------------------------------------
+* `bench_fixtures/*.json` (ODsay searchPubTransPath(T) · Kakao 검색 응답) 을
+  로컬 스텁 HTTP 서버로 재생하고, 실제 코드 경로(httpclient → odsay/planner)를
+  그대로 거쳐 단계별로 시간을 잽니다.
+  기본 픽스처 3 건은 **합성**입니다 – 응답 형식·실제 역/정류장 이름·노선 순서는
+  따르지만 좌표는 근사값, 소요·거리는 좌표로 계산한 값이라 실측이 아닙니다.
+  실측 응답이 필요하면 아래 `--record` 로 다시 받아 교체하세요.
+    geocode → fetch → parse → crowd → score → render (`--folium` 이면 draw_map 도)
+* 단계별 p50 / p95 / p99 (ms) 와 tracemalloc 최대 메모리(KiB) 를 출력.
+* `--save-baseline` 으로 저장한 결과와 `--baseline` 으로 비교 →
+  p50 이 허용 오차(`--tolerance`)를 넘게 느려진 단계가 있으면 종료 코드 1.
+  (기준선은 기기마다 다르므로 저장소에 넣지 않습니다)
+* 실행 중에는 루프백 외 소켓 연결을 막아 외부 네트워크를 쓰지 않음을 보장.
+* `--record 이름 출발 도착` : API 키로 실제 응답을 받아 픽스처로 저장 (네트워크 사용).
+
+    python bench.py [-n 50] [--case gangnam_seoul] [--baseline base.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import orjson
+
+import odsay
+import planner
+from prefs import Prefs
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "bench_fixtures"
+STAGES = ("geocode", "fetch", "parse", "crowd", "score", "render")  # total 합산 대상
+PERCENTILES = (50, 95, 99)
+TOLERANCE = 0.25  # p50 이 기준선 대비 이만큼 넘게 느려지면 회귀
+MIN_DELTA_MS = 0.05  # 이보다 작은 차이는 잡음으로 봄
+LOOPBACK = ("127.0.0.1", "::1", "localhost")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 픽스처 · 스텁 서버
+def load_fixtures(names: List[str] | None = None) -> Dict[str, Dict]:
+    paths = sorted(FIXTURE_DIR.glob("*.json"))
+    fx = {p.stem: orjson.loads(p.read_bytes()) for p in paths}
+    if names:
+        missing = set(names) - set(fx)
+        if missing:
+            raise SystemExit(f"픽스처 없음: {', '.join(sorted(missing))}")
+        fx = {k: fx[k] for k in names}
+    return fx
+
+
+def _od_key(sx, sy, ex, ey) -> tuple:
+    return tuple(round(float(v), 5) for v in (sx, sy, ex, ey))
+
+
+def _kakao_coord(fx: Dict, query: str):
+    for ep in ("address", "keyword"):
+        docs = fx["kakao"].get(query, {}).get(ep, {}).get("documents", [])
+        if docs:
+            return float(docs[0]["y"]), float(docs[0]["x"])
+    raise KeyError(query)
+
+
+class FixtureServer:
+    """
+    /odsay/<엔드포인트>?SX&SY&EX&EY → 좌표가 일치하는 픽스처의 응답
+    /kakao/search/<address|keyword>.json?query= → 검색어별 응답
+    """
+
+    def __init__(self, fixtures: Dict[str, Dict]):
+        kakao: Dict[str, Dict] = {}
+        odsay_by_od: Dict[tuple, Dict] = {}
+        for fx in fixtures.values():
+            kakao.update(fx["kakao"])
+            o, d = _kakao_coord(fx, fx["origin"]), _kakao_coord(fx, fx["dest"])
+            odsay_by_od[_od_key(o[1], o[0], d[1], d[0])] = fx["odsay"]
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                q = {k: v[0] for k, v in parse_qs(url.query).items()}
+                parts = url.path.strip("/").split("/")
+                body = None
+                if parts[0] == "odsay":
+                    key = _od_key(q["SX"], q["SY"], q["EX"], q["EY"])
+                    body = odsay_by_od.get(key, {}).get(parts[-1])
+                elif parts[0] == "kakao":
+                    ep = parts[-1].removesuffix(".json")
+                    body = kakao.get(q.get("query", ""), {}).get(ep, {"documents": []})
+                data = orjson.dumps(
+                    body if body is not None else {"error": "no fixture"}
+                )
+                self.send_response(200 if body is not None else 404)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@contextmanager
+def no_network():
+    """루프백 이외 주소로의 이름 해석·연결을 막음"""
+    orig_getaddrinfo, orig_connect = socket.getaddrinfo, socket.socket.connect
+
+    def getaddrinfo(host, *args, **kw):
+        if host not in LOOPBACK:
+            raise OSError(f"벤치마크 중 외부 네트워크 사용 금지: {host}")
+        return orig_getaddrinfo(host, *args, **kw)
+
+    def connect(self, address):
+        if isinstance(address, tuple) and address[0] not in LOOPBACK:
+            raise OSError(f"벤치마크 중 외부 네트워크 사용 금지: {address[0]}")
+        return orig_connect(self, address)
+
+    socket.getaddrinfo, socket.socket.connect = getaddrinfo, connect
+    try:
+        yield
+    finally:
+        socket.getaddrinfo, socket.socket.connect = orig_getaddrinfo, orig_connect
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 단계
+def pipeline(fx: Dict, prefs: Prefs, *, folium_out: Path | None = None):
+    """
+    픽스처 1 건의 단계 함수 목록 [(이름, fn)] – 앞 단계 결과를 state 에 담아 넘김.
+    캐시(지오코딩·경로)는 거치지 않고 매번 실제 HTTP·파싱을 수행.
+    """
+    depart = datetime.fromisoformat(fx["depart"])
+    st: Dict = {}
+
+    def geocode():
+        st["o"] = planner._geocode_remote(fx["origin"])
+        st["d"] = planner._geocode_remote(fx["dest"])
+
+    def fetch():
+        paths = odsay.fetch_paths(st["o"], st["d"], api_key="bench")
+        st["raw"] = [p.get("subPath", []) for p in paths]
+
+    def parse():
+        st["routes"] = planner.parse_routes(st["raw"])
+
+    def crowd():
+        planner.annotate_crowd(st["routes"], st["raw"], depart)
+
+    def score():
+        st["best"], st["segs"] = planner.choose_best_route(st["routes"], prefs=prefs)
+
+    def render():
+        planner.render_map(st["segs"], st["o"], st["d"])
+
+    stages = [
+        ("geocode", geocode),
+        ("fetch", fetch),
+        ("parse", parse),
+        ("crowd", crowd),
+        ("score", score),
+        ("render", render),
+    ]
+    if folium_out is not None:
+        stages.append(
+            (
+                "render_folium",
+                lambda: planner.draw_map(st["segs"], st["o"], st["d"], out=folium_out),
+            )
+        )
+    return stages
+
+
+def warm():
+    """혼잡 표·칸 모델 적재는 1 회성 비용 → 측정 전에 끝내 두고 따로 보고"""
+    t = time.perf_counter()
+    try:
+        planner._load_sub_index()
+    except FileNotFoundError:
+        pass
+    planner._load_car_model()
+    planner._load_bus_index()
+    return (time.perf_counter() - t) * 1000
+
+
+def run(
+    fixtures: Dict[str, Dict], *, iterations: int, warmup: int, folium: bool
+) -> Dict[str, Dict]:
+    prefs = Prefs.from_dict(None)  # 사용자 prefs 파일과 무관하게 고정
+    samples: Dict[str, List[float]] = {}
+    peaks: Dict[str, int] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        folium_out = Path(tmp) / "route.html" if folium else None
+        # 시간 측정 (tracemalloc 없이)
+        for i in range(warmup + iterations):
+            for fx in fixtures.values():
+                total = 0.0
+                for name, fn in pipeline(fx, prefs, folium_out=folium_out):
+                    t = time.perf_counter()
+                    fn()
+                    ms = (time.perf_counter() - t) * 1000
+                    total += ms if name in STAGES else 0.0
+                    if i >= warmup:
+                        samples.setdefault(name, []).append(ms)
+                if i >= warmup:
+                    samples.setdefault("total", []).append(total)
+        # 메모리 – 픽스처마다 1 회, 단계별 최대 할당량
+        for fx in fixtures.values():
+            for name, fn in pipeline(fx, prefs, folium_out=folium_out):
+                tracemalloc.start()
+                fn()
+                peaks[name] = max(
+                    peaks.get(name, 0), tracemalloc.get_traced_memory()[1]
+                )
+                tracemalloc.stop()
+    out = {}
+    for name, xs in samples.items():
+        p = np.percentile(xs, PERCENTILES)
+        out[name] = {f"p{q}": round(float(v), 4) for q, v in zip(PERCENTILES, p)}
+        out[name]["n"] = len(xs)
+        if name in peaks:
+            out[name]["peak_kib"] = round(peaks[name] / 1024, 1)
+    return out
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 보고 · 기준선
+def max_rss_kib() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 if sys.platform == "darwin" else float(rss)
+
+
+def report(
+    stages: Dict[str, Dict], baseline: Dict | None, tolerance: float
+) -> List[str]:
+    """표 출력 → 회귀 단계 이름 목록"""
+    base = (baseline or {}).get("stages", {})
+    head = f"{'stage':<14}{'p50':>10}{'p95':>10}{'p99':>10}{'peak KiB':>11}"
+    print(head + ("  vs base p50" if base else ""))
+    regressed = []
+    for name, s in stages.items():
+        line = (
+            f"{name:<14}{s['p50']:>10.3f}{s['p95']:>10.3f}{s['p99']:>10.3f}"
+            f"{s.get('peak_kib', float('nan')):>11.1f}"
+        )
+        b = base.get(name)
+        if b and b.get("p50"):
+            ratio = s["p50"] / b["p50"]
+            bad = ratio > 1 + tolerance and s["p50"] - b["p50"] > MIN_DELTA_MS
+            line += f"  {ratio - 1:+7.1%}{'  ✗' if bad else ''}"
+            if bad:
+                regressed.append(name)
+        print(line)
+    return regressed
+
+
+def record(name: str, origin: str, dest: str):
+    """실제 API 응답을 픽스처로 저장 (ODSAY_KEY · KAKAO_REST_KEY 필요)"""
+    from httpclient import get_client
+
+    client = get_client()
+    kakao = {}
+    for q in (origin, dest):
+        kakao[q] = {
+            ep: client.get_json(
+                f"{planner.KAKAO_BASE_URL.rstrip('/')}/search/{ep}.json",
+                headers=planner.HEADERS,
+                params={"query": q},
+                timeout=5,
+            )
+            for ep in ("address", "keyword")
+        }
+    fx = {
+        "origin": origin,
+        "dest": dest,
+        "depart": datetime.now().isoformat(timespec="minutes"),
+        "kakao": kakao,
+    }
+    o, d = _kakao_coord(fx, origin), _kakao_coord(fx, dest)
+    common = odsay.common_params(o, d, planner.ODSAY_KEY)
+    fx["odsay"] = {
+        ep: client.get_json(
+            f"{odsay.ODSAY_BASE_URL.rstrip('/')}/{ep}", params={**common, **extra}
+        )
+        for ep, extra in odsay.ENDPOINTS
+    }
+    path = FIXTURE_DIR / f"{name}.json"
+    path.write_bytes(orjson.dumps(fx, option=orjson.OPT_INDENT_2) + b"\n")
+    print(f"[bench] 픽스처 저장 → {path}")
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(
+        description="경로 계획 파이프라인 벤치마크 (픽스처 재생)"
+    )
+    p.add_argument("-n", "--iterations", type=int, default=50)
+    p.add_argument("--warmup", type=int, default=3)
+    p.add_argument("--case", action="append", help="픽스처 이름 (여러 번 지정 가능)")
+    p.add_argument("--folium", action="store_true", help="draw_map(folium) 단계 포함")
+    p.add_argument("--baseline", type=Path, help="비교할 기준선 JSON")
+    p.add_argument("--save-baseline", type=Path, help="결과를 기준선으로 저장")
+    p.add_argument("--tolerance", type=float, default=TOLERANCE)
+    p.add_argument("--json", type=Path, help="결과 JSON 저장 경로")
+    p.add_argument("--record", nargs=3, metavar=("NAME", "ORIGIN", "DEST"))
+    args = p.parse_args(argv)
+
+    if args.record:
+        record(*args.record)
+        return 0
+
+    fixtures = load_fixtures(args.case)
+    if not fixtures:
+        raise SystemExit(f"{FIXTURE_DIR} 에 픽스처가 없습니다")
+    with FixtureServer(fixtures) as srv, no_network():
+        odsay.ODSAY_BASE_URL = f"{srv.url}/odsay"
+        planner.KAKAO_BASE_URL = f"{srv.url}/kakao"
+        load_ms = warm()
+        stages = run(
+            fixtures, iterations=args.iterations, warmup=args.warmup, folium=args.folium
+        )
+
+    result = {
+        "meta": {
+            "when": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "cases": list(fixtures),
+            "iterations": args.iterations,
+            "load_ms": round(load_ms, 2),
+            "max_rss_kib": max_rss_kib(),
+        },
+        "stages": stages,
+    }
+    print(
+        f"cases={len(fixtures)} iterations={args.iterations} "
+        f"table load={load_ms:.1f} ms max RSS={result['meta']['max_rss_kib'] or 0:.0f} KiB"
+    )
+    baseline = orjson.loads(args.baseline.read_bytes()) if args.baseline else None
+    regressed = report(stages, baseline, args.tolerance)
+    for path in (args.json, args.save_baseline):
+        if path is not None:
+            path.write_bytes(orjson.dumps(result, option=orjson.OPT_INDENT_2) + b"\n")
+    if regressed:
+        print(f"[bench] 회귀: {', '.join(regressed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
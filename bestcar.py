@@ -0,0 +1,281 @@
+"""
+bestcar.py
+===============================================================
+지하철 최적 칸 추천 (난수 대신 칸별 혼잡 테이블 + 환승/출구 위치)
+----------------------------------------------------------------
+* 칸별 혼잡도 CSV(혼잡도 CSV 형식 + `칸` 열)를 읽어
+  `pct[요일, 역 id, 방향, 30분 슬롯, 칸]` 5차원 float32 배열을 만들고,
+  적재 시점에 칸 축 argmin 을 미리 계산해 `best[요일, 역, 방향, 슬롯]` 으로 보관
+  → 환승 위치가 없는 구간은 배열 한 칸 읽기(O(1)).
+* 이동 기록(history.py `car_rollup`)에 사용자가 남긴 (승차역, 방향, 슬롯, 탄 칸,
+  체감 혼잡 레벨) 관측으로 표의 빈 칸을 채웁니다 (`seed_from_history`).
+  레벨은 LEVEL_PCT 로 혼잡 % 눈금에 옮기며, CSV 값이 있는 칸은 덮어쓰지 않습니다.
+* 하차역에서 다음 구간(다른 호선 또는 `출구`)으로 빠른 칸은 환승 칸 CSV
+  (`역명, 환승노선, 칸`), 없으면 ODsay 구간의 `door`("4-3" → 4칸)를 쓰고,
+  그 칸에 가까울수록 유리하도록 칸 거리 × EXIT_WEIGHT(%p) 를 더해 고릅니다.
+  칸 데이터가 전혀 없는 구간은 그 빠른 칸을 그대로 추천합니다.
+* 데이터가 없는 역·시간·칸은 결정적 기본 분포(CAR_PRIOR – 양 끝 칸이 한산)를
+  사용하므로 같은 입력이면 항상 같은 칸을 추천합니다.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from crowd import (
+    DAY_TYPE,
+    LEVEL_BOUNDS,
+    N_DAYS,
+    N_DIRS,
+    N_SLOTS,
+    _decode,
+    load_subway_csv,
+    normalize_station,
+    time_slot,
+)
+
+N_CARS = 10
+# 칸별 상대 혼잡 (계단·환승통로가 몰린 가운데 칸이 붐빔) – 데이터 없을 때 사용
+CAR_PRIOR = np.array([70, 85, 95, 105, 110, 110, 105, 95, 85, 72], dtype=np.float32)
+EXIT_WEIGHT = 8.0  # 환승/출구 칸에서 1칸 멀어질 때마다 더하는 혼잡 %p
+EXIT_COLS = {
+    "station": ("역명", "환승역", "출발역"),
+    "to": ("환승노선", "다음노선", "출구"),
+    "car": ("칸", "칸번호", "빠른환승칸"),
+}
+EXIT = "출구"  # 다음 구간이 지하철이 아닐 때 환승노선 자리에 쓰는 키
+# 체감 혼잡 레벨(1~4) → 혼잡 % (레벨 경계 LEVEL_BOUNDS 사이 대표값)
+LEVEL_PCT = np.array(
+    [
+        LEVEL_BOUNDS[0] - 15,
+        *((LEVEL_BOUNDS[:-1] + LEVEL_BOUNDS[1:]) / 2),
+        LEVEL_BOUNDS[-1] + 25,
+    ],
+    dtype=np.float32,
+)
+
+ExitKey = Tuple[str, str]
+
+
+def line_key(name: str) -> str:
+    """'수도권 2호선', '2 호선' → '2호선' 처럼 호선명 비교 키"""
+    return name.replace("수도권", "").replace(" ", "")
+
+
+def door_car(door) -> int:
+    """ODsay `door` ("4-3", "4", "null") → 칸 번호 (모르면 0)"""
+    head = str(door or "").strip().split("-")[0].rstrip("칸")
+    return int(head) if head.isdigit() and 1 <= int(head) <= N_CARS else 0
+
+
+def _best_from(pct: np.ndarray) -> np.ndarray:
+    """(…, N_CARS) 혼잡 → 가장 한산한 칸 번호(1-based), 칸 데이터가 모두 NaN 이면 0"""
+    filled = np.where(np.isnan(pct), np.inf, pct)
+    best = (filled.argmin(axis=-1) + 1).astype(np.int8)
+    best[np.isinf(filled.min(axis=-1))] = 0
+    return best
+
+
+@dataclass(frozen=True)
+class BestCarModel:
+    pct: np.ndarray  # float32 (N_DAYS, S, N_DIRS, N_SLOTS, N_CARS)
+    station_ids: Dict[str, int]
+    exits: Mapping[ExitKey, int] = field(default_factory=dict)
+    best: np.ndarray = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # recommend_batch 와 같은 규칙: 값이 없는 칸은 CAR_PRIOR 로 채워 비교
+        missing = np.isnan(self.pct)
+        best = _best_from(np.where(missing, CAR_PRIOR, self.pct))
+        best[missing.all(axis=-1)] = 0
+        object.__setattr__(self, "best", best)
+
+    @classmethod
+    def empty(cls, exits: Mapping[ExitKey, int] | None = None) -> "BestCarModel":
+        pct = np.empty((N_DAYS, 0, N_DIRS, N_SLOTS, N_CARS), dtype=np.float32)
+        return cls(pct=pct, station_ids={}, exits=exits or {})
+
+    def station_id(self, name: str) -> int:
+        sid = self.station_ids.get(name)
+        if sid is None:
+            sid = self.station_ids.get(normalize_station(name), -1)
+        return sid
+
+    def exit_car(self, station: str, next_line: str) -> int:
+        """하차역에서 다음 구간으로 가장 빠른 칸 (모르면 0)"""
+        st = normalize_station(station)
+        return self.exits.get((st, line_key(next_line)), 0)
+
+    def recommend_batch(
+        self,
+        boards: Sequence[str],
+        directions: Sequence[int],
+        now: datetime | Sequence[datetime],
+        exit_cars: Sequence[int] | None = None,
+    ) -> np.ndarray:
+        """
+        승차역·방향(0 상선 / 1 하선, -1 모름)·환승 칸(0 없음) 배열 → 추천 칸(1~N_CARS)
+        now: 공통 시각 1 개 또는 구간별 예상 승차 시각 배열
+        """
+        n = len(boards)
+        times = [now] * n if isinstance(now, datetime) else list(now)
+        ids = np.fromiter((self.station_id(s) for s in boards), np.intp, count=n)
+        dirs = np.asarray(directions, dtype=np.intp).reshape(n)
+        exits = (
+            np.zeros(n, dtype=np.intp)
+            if exit_cars is None
+            else np.asarray(exit_cars, dtype=np.intp).reshape(n)
+        )
+        day = np.fromiter((DAY_TYPE[t.weekday()] - 1 for t in times), np.intp, n)
+        slot = np.fromiter((time_slot(t) for t in times), np.intp, n)
+
+        # 기본값: 데이터 없는 역·슬롯·칸은 CAR_PRIOR
+        load = np.tile(CAR_PRIOR, (n, 1))
+        has_data = np.zeros(n, dtype=bool)
+        known = (ids >= 0) & (slot >= 0)
+        if known.any():
+            rows = self.pct[day[known], ids[known], :, slot[known]]  # (k, 방향, 칸)
+            dd = dirs[known]
+            cnt = (~np.isnan(rows)).sum(axis=1)
+            mean = np.where(
+                cnt > 0, np.nansum(rows, axis=1) / np.maximum(cnt, 1), np.nan
+            )  # 방향 모름 → 상·하선 평균
+            sel = np.where(
+                (dd >= 0)[:, None], rows[np.arange(len(dd)), dd.clip(0)], mean
+            )
+            load[known] = np.where(np.isnan(sel), CAR_PRIOR, sel)
+            has_data[known] = ~np.isnan(sel).all(axis=1)
+        # 환승 칸이 없고 방향을 아는 행은 미리 계산한 best 표를 그대로 사용 (O(1))
+        fast = known & (exits == 0) & (dirs >= 0)
+        far = np.abs(np.arange(1, N_CARS + 1) - exits[:, None]) * (exits > 0)[:, None]
+        out = _best_from(load + EXIT_WEIGHT * far)
+        if fast.any():
+            b = self.best[day[fast], ids[fast], dirs[fast], slot[fast]]
+            out[fast] = np.where(b > 0, b, out[fast])
+        # 칸 데이터가 전혀 없으면 기본 분포보다 환승/출구 칸 위치가 더 확실한 정보
+        guess = ~has_data & (exits > 0)
+        out[guess] = exits[guess]
+        return out
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+def build_car_model(
+    path: Path, exits: Mapping[ExitKey, int] | None = None
+) -> BestCarModel:
+    """칸별 혼잡도 CSV → BestCarModel (같은 역·방향·슬롯·칸 중복은 평균)"""
+    table = load_subway_csv(path)
+    if table.car is None:
+        raise ValueError("칸별 혼잡도 CSV 에 '칸' 열이 없습니다")
+    keep = (table.car >= 1) & (table.car <= N_CARS)
+    station_ids: Dict[str, int] = {}
+    for n, k in zip(table.station, keep):
+        if k:
+            station_ids.setdefault(n, len(station_ids))
+    ids = np.fromiter(
+        (station_ids.get(n, -1) for n in table.station), np.intp, count=len(table)
+    )[keep]
+    d = table.day.astype(np.intp)[keep] - 1
+    r = table.direction.astype(np.intp)[keep]
+    c = table.car.astype(np.intp)[keep] - 1
+    vals = table.pct[keep]
+
+    shape = (N_DAYS, len(station_ids), N_DIRS, N_CARS, N_SLOTS)
+    tot = np.zeros(shape, dtype=np.float64)
+    cnt = np.zeros(shape, dtype=np.int32)
+    valid = ~np.isnan(vals)
+    np.add.at(tot, (d, ids, r, c), np.where(valid, vals, 0.0))
+    np.add.at(cnt, (d, ids, r, c), valid.astype(np.int32))
+    with np.errstate(invalid="ignore"):
+        pct = np.where(cnt > 0, tot / np.maximum(cnt, 1), np.nan).astype(np.float32)
+    return BestCarModel(
+        pct=np.ascontiguousarray(pct.swapaxes(3, 4)),
+        station_ids=station_ids,
+        exits=exits or {},
+    )
+
+
+def load_exit_table(path: Path) -> Dict[ExitKey, int]:
+    """빠른 환승/출구 칸 CSV → {(역명, 환승노선 키): 칸}"""
+    rows = csv.reader(io.StringIO(_decode(Path(path).read_bytes())))
+    header = [h.strip() for h in next(rows)]
+
+    def col(key):
+        for alias in EXIT_COLS[key]:
+            if alias in header:
+                return header.index(alias)
+        raise ValueError(f"환승 칸 CSV 에 '{EXIT_COLS[key][0]}' 열이 없습니다")
+
+    c_st, c_to, c_car = col("station"), col("to"), col("car")
+    out: Dict[ExitKey, int] = {}
+    for r in rows:
+        if len(r) <= max(c_st, c_to, c_car):
+            continue
+        car = r[c_car].strip().split("-")[0].rstrip("칸")
+        if car.isdigit() and 1 <= int(car) <= N_CARS:
+            key = (normalize_station(r[c_st]), line_key(r[c_to].strip() or EXIT))
+            out.setdefault(key, int(car))
+    return out
+
+
+def seed_from_history(
+    model: BestCarModel, rows: Iterable[Tuple[int, str, int, int, int, int, int]]
+) -> BestCarModel:
+    """
+    이동 기록 관측 (요일 1~3, 승차역, 방향, 슬롯, 칸, 횟수, 레벨 합) 으로
+    비어 있는(NaN) 칸을 채운 새 모델. 역은 필요하면 표 끝에 추가.
+    """
+    obs = [
+        (d - 1, normalize_station(st), r, s, c - 1, lv / n)
+        for d, st, r, s, c, n, lv in rows
+        if 1 <= d <= N_DAYS
+        and 0 <= r < N_DIRS
+        and 0 <= s < N_SLOTS
+        and 1 <= c <= N_CARS
+        and n > 0
+        and st
+    ]
+    if not obs:
+        return model
+    station_ids = dict(model.station_ids)
+    for o in obs:
+        if model.station_id(o[1]) < 0:
+            station_ids.setdefault(o[1], len(station_ids))
+    grow = len(station_ids) - model.pct.shape[1]
+    pct = np.concatenate(
+        [
+            model.pct,
+            np.full((N_DAYS, grow, N_DIRS, N_SLOTS, N_CARS), np.nan, np.float32),
+        ],
+        axis=1,
+    )
+    d, r, s, c, lv = (np.array(col) for col in zip(*[(o[0], *o[2:]) for o in obs]))
+    sid = np.array([station_ids.get(o[1], model.station_id(o[1])) for o in obs])
+    seeded = np.interp(lv, np.arange(1, 5), LEVEL_PCT).astype(np.float32)
+    cell = (d, sid, r, s, c)
+    pct[cell] = np.where(np.isnan(pct[cell]), seeded, pct[cell])
+    return BestCarModel(pct=pct, station_ids=station_ids, exits=model.exits)
+
+
+def load_car_model(
+    car_csv: Path,
+    exit_csv: Path | None = None,
+    observations: Iterable[Tuple] = (),
+) -> BestCarModel:
+    """
+    있는 파일 + 이동 기록 관측으로 모델 구성 – 모두 없으면 CAR_PRIOR 만 쓰는 빈 모델
+    """
+    exits = (
+        load_exit_table(exit_csv) if exit_csv is not None and exit_csv.exists() else {}
+    )
+    if car_csv.exists():
+        model = build_car_model(car_csv, exits)
+    else:
+        model = BestCarModel.empty(exits)
+    return seed_from_history(model, observations)
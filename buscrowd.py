@@ -0,0 +1,253 @@
+"""
+buscrowd.py
+===============================================================
+버스 혼잡도 (노선·정류장·시간대별 승차 인원) → 밀집 배열
+----------------------------------------------------------------
+* `seoul_bus_crowd.csv` (ROUTE_ID, HH, BOARD_NUM [, 정류장 열]) 를 한 번만 읽어
+  - `stop_board[정류장 쌍 id, 시]`  : (노선, 승차 정류장)별 시간대 평균 승차 인원
+  - `route_board[노선 id, 시]`      : 노선 전체 시간대 평균 (정류장 모를 때)
+  두 float32 배열로 컴파일합니다. 조회는 dict 로 id 를 찾은 뒤 배열 한 번 gather.
+* 정류장 열(표준 ID / ARS 번호 / 정류장명)이 여러 개면 모두 같은 쌍 id 로 등록 →
+  ODsay 의 startLocalStationID · startArsID · startName 중 아는 것으로 매칭.
+* 원본이 없으면 `BusCrowdIndex.empty()` 를 돌려주고 호출 측이 그대로 보관 →
+  이후 디스크 stat 없이 항상 FALLBACK_LEVEL.
+* 빌드 결과는 지하철과 같은 방식으로 `.npz` 캐시 (CSV mtime·크기 일치 시 재사용).
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from crowd import FALLBACK_LEVEL, _decode, normalize_station
+
+N_HOURS = 24
+BOARD_BOUNDS = np.array([10.0, 25.0, 40.0], dtype=np.float32)  # 승차 인원 → 레벨 경계
+COL_ALIASES = {
+    "route": ("ROUTE_ID", "노선ID", "노선번호"),
+    "hour": ("HH", "시간", "시간대"),
+    "board": ("BOARD_NUM", "승차인원", "승차총승객수"),
+}
+STOP_COLS = (
+    ("STTN_ID", "STOP_ID", "표준버스정류장ID", "정류장ID"),
+    ("ARS_ID", "버스정류장ARS번호", "ARS번호"),
+    ("STTN_NM", "STOP_NM", "정류장명", "역명"),
+)
+
+PairKey = Tuple[str, str]
+
+
+def route_key(route_id) -> str:
+    """'0100', 100, ' 100 ' → '100' 처럼 노선 비교 키"""
+    s = str(route_id).strip()
+    return (s.lstrip("0") or s) if s.isdigit() else s
+
+
+def stop_key(stop) -> str:
+    """ARS '01-234' → '01234', 정류장명은 역명 정규화 규칙 적용"""
+    s = str(stop).strip().replace("-", "")
+    return s if s.isdigit() else normalize_station(s)
+
+
+def boards_to_levels(board: np.ndarray) -> np.ndarray:
+    """평균 승차 인원 → 1~4 레벨 (NaN → FALLBACK_LEVEL)"""
+    b = np.asarray(board, dtype=np.float32)
+    lv = (np.searchsorted(BOARD_BOUNDS, np.nan_to_num(b), side="right") + 1).astype(
+        np.int8
+    )
+    return np.where(np.isnan(b), np.int8(FALLBACK_LEVEL), lv)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class BusCrowdIndex:
+    """
+    stop_board[pair_id, hour] / route_board[route_id, hour] = 평균 승차 인원 (없으면 NaN)
+    """
+
+    stop_board: np.ndarray
+    route_board: np.ndarray
+    route_ids: Dict[str, int]
+    pair_ids: Dict[PairKey, int]
+
+    @classmethod
+    def empty(cls) -> "BusCrowdIndex":
+        return cls(
+            stop_board=np.empty((0, N_HOURS), dtype=np.float32),
+            route_board=np.empty((0, N_HOURS), dtype=np.float32),
+            route_ids={},
+            pair_ids={},
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.route_ids)
+
+    def ids_of(
+        self, routes: Sequence[Sequence[str]], stops: Sequence[Sequence[str]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        구간별 후보 노선 키들 · 승차 정류장 키들 → (노선 id, 쌍 id) 배열 (모르면 -1).
+        노선은 앞쪽 후보부터, 정류장은 그 노선에 등록된 첫 키를 사용.
+        """
+        n = len(routes)
+        rid = np.full(n, -1, dtype=np.int32)
+        pid = np.full(n, -1, dtype=np.int32)
+        for k, (cands, st) in enumerate(zip(routes, stops)):
+            for r in cands:
+                r = route_key(r)
+                if r in self.route_ids:
+                    rid[k] = self.route_ids[r]
+                    pid[k] = next(
+                        (
+                            self.pair_ids[(r, s)]
+                            for s in map(stop_key, st)
+                            if (r, s) in self.pair_ids
+                        ),
+                        -1,
+                    )
+                    break
+        return rid, pid
+
+    def gather(
+        self, route_ids: np.ndarray, pair_ids: np.ndarray, hours: np.ndarray
+    ) -> np.ndarray:
+        """(노선 id, 쌍 id, 시) → 평균 승차 인원. 정류장 값이 없으면 노선 평균, 그것도 없으면 NaN"""
+        rid, pid, hh = np.broadcast_arrays(route_ids, pair_ids, hours)
+        hh = np.asarray(hh, dtype=np.intp) % N_HOURS
+        out = np.full(rid.shape, np.nan, dtype=np.float32)
+        ok = pid >= 0
+        out[ok] = self.stop_board[pid[ok], hh[ok]]
+        miss = np.isnan(out) & (rid >= 0)
+        out[miss] = self.route_board[rid[miss], hh[miss]]
+        return out
+
+    def levels_batch(
+        self,
+        routes: Sequence[Sequence[str]],
+        stops: Sequence[Sequence[str]],
+        hours: Sequence[int],
+    ) -> np.ndarray:
+        """BUS 구간 여러 개를 한 번에 → 레벨 배열 (데이터 없음 FALLBACK_LEVEL)"""
+        if not self:
+            return np.full(len(routes), FALLBACK_LEVEL, dtype=np.int8)
+        rid, pid = self.ids_of(routes, stops)
+        return boards_to_levels(self.gather(rid, pid, np.asarray(hours)))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+def _find_col(header: List[str], aliases: Sequence[str]) -> int:
+    for alias in aliases:
+        if alias in header:
+            return header.index(alias)
+    return -1
+
+
+def _mean_into(shape, rows, cols, vals) -> np.ndarray:
+    tot = np.zeros(shape, dtype=np.float64)
+    cnt = np.zeros(shape, dtype=np.int32)
+    np.add.at(tot, (rows, cols), vals)
+    np.add.at(cnt, (rows, cols), 1)
+    with np.errstate(invalid="ignore"):
+        return np.where(cnt > 0, tot / np.maximum(cnt, 1), np.nan).astype(np.float32)
+
+
+def build_bus_index(path: Path) -> BusCrowdIndex:
+    """롱 포맷 CSV → BusCrowdIndex (같은 노선·정류장·시 중복 행은 평균)"""
+    rows = csv.reader(io.StringIO(_decode(Path(path).read_bytes())))
+    header = [h.strip() for h in next(rows)]
+    c_route, c_hour, c_board = (
+        _find_col(header, COL_ALIASES[k]) for k in ("route", "hour", "board")
+    )
+    for key, c in zip(COL_ALIASES, (c_route, c_hour, c_board)):
+        if c < 0:
+            raise ValueError(
+                f"버스 혼잡도 CSV 에 '{COL_ALIASES[key][0]}' 열이 없습니다"
+            )
+    c_stops = [c for c in (_find_col(header, a) for a in STOP_COLS) if c >= 0]
+    width = max(c_route, c_hour, c_board, *c_stops)
+
+    route_ids: Dict[str, int] = {}
+    pair_ids: Dict[PairKey, int] = {}
+    rid, pid, hours, boards = [], [], [], []
+    n_pairs = 0
+    for r in rows:
+        if len(r) <= width:
+            continue
+        try:
+            hh, b = int(float(r[c_hour])), float(r[c_board].replace(",", ""))
+        except ValueError:
+            continue
+        rk = route_key(r[c_route])
+        rid.append(route_ids.setdefault(rk, len(route_ids)))
+        keys = [stop_key(r[c]) for c in c_stops if r[c].strip()]
+        p = next((pair_ids[(rk, s)] for s in keys if (rk, s) in pair_ids), -1)
+        if keys and p < 0:
+            p, n_pairs = n_pairs, n_pairs + 1
+        for s in keys:
+            pair_ids.setdefault((rk, s), p)
+        pid.append(p)
+        hours.append(hh % N_HOURS)
+        boards.append(b)
+
+    rid_a = np.asarray(rid, dtype=np.intp)
+    pid_a = np.asarray(pid, dtype=np.intp)
+    hh_a = np.asarray(hours, dtype=np.intp)
+    b_a = np.asarray(boards, dtype=np.float64)
+    has = pid_a >= 0
+    return BusCrowdIndex(
+        stop_board=_mean_into((n_pairs, N_HOURS), pid_a[has], hh_a[has], b_a[has]),
+        route_board=_mean_into((len(route_ids), N_HOURS), rid_a, hh_a, b_a),
+        route_ids=route_ids,
+        pair_ids=pair_ids,
+    )
+
+
+def load_bus_index(path: Path, cache: Path | None = None) -> BusCrowdIndex:
+    """
+    원본이 없으면 빈 인덱스. 캐시(.npz)가 같은 버전이면 그대로 읽고, 아니면 빌드 후 저장
+    """
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return BusCrowdIndex.empty()
+    stamp = np.array([st.st_mtime_ns, st.st_size], dtype=np.int64)
+    if cache is not None and cache.exists():
+        try:
+            with np.load(cache, allow_pickle=False) as z:
+                if np.array_equal(z["stamp"], stamp):
+                    routes = z["routes"].tolist()
+                    pairs = zip(z["pair_route"].tolist(), z["pair_stop"].tolist())
+                    return BusCrowdIndex(
+                        stop_board=z["stop_board"],
+                        route_board=z["route_board"],
+                        route_ids={r: i for i, r in enumerate(routes)},
+                        pair_ids={
+                            (r, s): int(p) for (r, s), p in zip(pairs, z["pair_id"])
+                        },
+                    )
+        except (OSError, KeyError, ValueError):
+            pass  # 깨진 캐시 → 재빌드
+    idx = build_bus_index(path)
+    if cache is not None:
+        keys = list(idx.pair_ids)
+        try:
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            with cache.open("wb") as f:
+                np.savez(
+                    f,
+                    stamp=stamp,
+                    stop_board=idx.stop_board,
+                    route_board=idx.route_board,
+                    routes=np.array(list(idx.route_ids), dtype=str),
+                    pair_route=np.array([k[0] for k in keys], dtype=str),
+                    pair_stop=np.array([k[1] for k in keys], dtype=str),
+                    pair_id=np.fromiter(idx.pair_ids.values(), np.int32, len(keys)),
+                )
+        except OSError:
+            pass
+    return idx
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+check_import_time.py
+===============================================================
+`import planner` 콜드 스타트 예산 검사 (CI/로컬에서 실행, 초과 시 종료 코드 1)
+----------------------------------------------------------------
+* 새 인터프리터에서 `import planner` 만 수행해 걸린 시간을 N 회 재고 최솟값을
+  예산(`--budget-ms`, 기본 IMPORT_BUDGET_MS)과 비교합니다.
+* 지연 import 대상(folium · pandas · requests · tqdm · pyarrow · polyline · orjson)이
+  import 시점에 이미 올라와 있으면 시간과 무관하게 실패로 봅니다.
+* `tests/test_import_time.py` 가 이 스크립트를 실행하므로 pytest 에서도 검사됩니다.
+* 임시 HOME 에서 실행해 설정 폴더(~/.route_planner)를 만들지 않는지도 확인.
+
+    python check_import_time.py [--budget-ms 300] [--runs 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 300))
+LAZY_MODULES = (
+    "folium",
+    "pandas",
+    "requests",
+    "tqdm",
+    "pyarrow",
+    "polyline",
+    "orjson",
+)
+ROOT = Path(__file__).resolve().parent
+
+_PROBE = f"""
+import sys, time
+t = time.perf_counter()
+import planner
+ms = (time.perf_counter() - t) * 1000
+eager = [m for m in {LAZY_MODULES!r} if m in sys.modules]
+print(ms, ",".join(eager))
+"""
+
+
+def measure(home: Path) -> tuple[float, list[str]]:
+    env = {**os.environ, "HOME": str(home), "PYTHONDONTWRITEBYTECODE": "1"}
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    return float(out[0]), (out[1].split(",") if len(out) > 1 else [])
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="import planner 시간 예산 검사")
+    p.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    p.add_argument("--runs", type=int, default=5)
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as home:
+        home = Path(home)
+        results = [measure(home) for _ in range(max(args.runs, 1))]
+        made_conf = (home / ".route_planner").exists()
+    best = min(ms for ms, _ in results)
+    eager = sorted({m for _, ms in results for m in ms})
+
+    print(f"import planner: {best:.1f} ms (예산 {args.budget_ms:.0f} ms)")
+    failed = False
+    if best > args.budget_ms:
+        print("  ✗ 예산 초과", file=sys.stderr)
+        failed = True
+    if eager:
+        print(f"  ✗ import 시점에 로드됨: {', '.join(eager)}", file=sys.stderr)
+        failed = True
+    if made_conf:
+        print("  ✗ import 시점에 ~/.route_planner 생성", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
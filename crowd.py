@@ -0,0 +1,404 @@
+"""
+crowd.py
+===============================================================
+지하철 혼잡도 CSV → 밀집(dense) 인덱스
+----------------------------------------------------------------
+* `seoul_subway_crowd.csv` 를 한 번만 읽어
+  `(요일구분, 역 id, 상하구분, 30분 슬롯)` 4차원 float32 배열로 변환합니다.
+* 역명 → 역 id 는 dict 로 보관 → 단건 조회는 O(1) 배열 읽기,
+  여러 구간은 `levels_batch()` 한 번의 벡터 연산으로 처리합니다.
+* CSV 는 pandas 없이 `csv` 모듈로 바로 열 단위 배열에 적재합니다.
+  인코딩(CP949/UTF-8)은 자동 감지, 시간 열은 헤더의 `H시MM분` 을 해석해
+  슬롯에 매핑하므로 공공데이터 갱신본도 코드 수정 없이 읽힙니다.
+* 빌드 결과는 `.npz` 로 캐시 → 원본 CSV 의 mtime·크기가 같으면 재파싱 생략.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 상수
+DAY_TYPE = {0: 1, 1: 1, 2: 1, 3: 1, 4: 1, 5: 2, 6: 3}  # weekday → 1 평일 / 2 토 / 3 일
+DAY_NAMES = {"평일": 1, "토요일": 2, "일요일": 3, "공휴일": 3, "휴일": 3}
+DIR_NAMES = {"상선": 0, "내선": 0, "하선": 1, "외선": 1}
+# 헤더 별칭 (갱신본마다 열 이름이 조금씩 다름)
+COL_ALIASES = {
+    "day": ("요일구분", "요일"),
+    "line": ("호선",),
+    "station": ("출발역", "역명", "역이름"),
+    "direction": ("상하구분", "상하선", "방향"),
+    "car": ("칸", "칸번호", "객차", "객차번호"),  # 칸별 혼잡도 파일에만 있음
+}
+SLOT_HEADER = re.compile(r"^\s*(\d{1,2})\s*시\s*(\d{1,2})\s*분")
+ENCODINGS = ("utf-8-sig", "cp949")
+N_DAYS, N_DIRS = 3, 2
+N_SLOTS = 39  # 05:30 ~ 00:30, 30분 단위
+FIRST_SLOT_MIN = 5 * 60 + 30
+LEVEL_BOUNDS = np.array([70.0, 100.0, 150.0], dtype=np.float32)  # pct_to_level 경계
+FALLBACK_LEVEL = 2
+
+
+def normalize_station(name: str) -> str:
+    """'강남역', '서울역(1)' 같은 표기를 CSV 역명 키로 정규화"""
+    name = name.strip().split("(")[0].strip()
+    if name.endswith("역") and len(name) > 2:
+        name = name[:-1]
+    return name
+
+
+def time_slot(now: datetime) -> int:
+    """시각 → 30분 슬롯 인덱스 (운행 시간 밖이면 -1)"""
+    m = (now.hour * 60 + now.minute - FIRST_SLOT_MIN) % (24 * 60)
+    slot = m // 30
+    return slot if slot < N_SLOTS else -1
+
+
+def slot_positions(minute_of_day) -> np.ndarray:
+    """
+    자정 기준 분(0~1439) 배열 → 연속 슬롯 좌표 (슬롯 중심 = 정수).
+    운행 시간 밖은 NaN. 예) 05:45 → 0.0, 06:00 → 0.5
+    """
+    m = (np.asarray(minute_of_day, dtype=np.float64) - FIRST_SLOT_MIN) % (24 * 60)
+    pos = m / 30 - 0.5
+    return np.where(m < N_SLOTS * 30, np.clip(pos, 0, N_SLOTS - 1), np.nan)
+
+
+# weekday(0=월) → 요일 인덱스(0 평일 / 1 토 / 2 일) 배열 조회용
+DAY_INDEX = np.array([DAY_TYPE[w] - 1 for w in range(7)], dtype=np.int8)
+
+
+def pct_to_levels(pct: np.ndarray) -> np.ndarray:
+    """혼잡 % 배열 → 레벨(1~4) 배열, NaN 은 FALLBACK_LEVEL"""
+    pct = np.asarray(pct, dtype=np.float32)
+    lvl = np.searchsorted(LEVEL_BOUNDS, pct, side="right").astype(np.int8) + 1
+    lvl[np.isnan(pct)] = FALLBACK_LEVEL
+    return lvl
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class SubwayCrowdIndex:
+    """
+    pct[day-1, station_id, direction, slot] = 혼잡 % (없으면 NaN)
+    """
+
+    pct: np.ndarray
+    station_ids: Dict[str, int]
+
+    def station_id(self, name: str) -> int:
+        sid = self.station_ids.get(name)
+        if sid is None:
+            sid = self.station_ids.get(normalize_station(name), -1)
+        return sid
+
+    def lookup(
+        self, station: str, now: datetime, direction: int | None = None
+    ) -> float:
+        """단건 조회 – 방향 미지정이면 상·하선 평균"""
+        return float(self.lookup_batch([station], now, direction)[0])
+
+    def lookup_batch(
+        self,
+        stations: Sequence[str],
+        now: datetime,
+        direction: int | None = None,
+    ) -> np.ndarray:
+        """여러 역을 같은 시각으로 한 번에 조회 → 혼잡 % 배열"""
+        ids = np.fromiter(
+            (self.station_id(s) for s in stations), dtype=np.int32, count=len(stations)
+        )
+        days = np.full(len(ids), DAY_TYPE[now.weekday()] - 1, dtype=np.int8)
+        slots = np.full(len(ids), time_slot(now), dtype=np.int16)
+        return self.gather(ids, days, slots, direction)
+
+    def gather(
+        self,
+        ids: np.ndarray,
+        days: np.ndarray,
+        slots: np.ndarray,
+        direction: int | np.ndarray | None = None,
+    ) -> np.ndarray:
+        """(역 id, 요일, 슬롯[, 방향]) 배열 → 혼잡 % 배열 (모르는 키는 NaN)"""
+        ids = np.asarray(ids)
+        out = np.full(ids.shape, np.nan, dtype=np.float32)
+        ok = (ids >= 0) & (np.asarray(slots) >= 0)
+        if not ok.any():
+            return out
+        d, i, s = np.asarray(days)[ok], ids[ok], np.asarray(slots)[ok]
+        both = self.pct[d, i, :, s]  # (k, N_DIRS)
+        with np.errstate(invalid="ignore"):
+            cnt = (~np.isnan(both)).sum(axis=1)
+            mean = np.where(
+                cnt > 0, np.nansum(both, axis=1) / np.maximum(cnt, 1), np.nan
+            )
+        if direction is None:
+            out[ok] = mean
+        else:  # 방향 -1 은 상·하선 평균
+            dirs = np.broadcast_to(np.asarray(direction), ids.shape)[ok]
+            picked = both[np.arange(len(dirs)), np.clip(dirs, 0, N_DIRS - 1)]
+            out[ok] = np.where(dirs >= 0, picked, mean)
+        return out
+
+    def levels_batch(
+        self,
+        stations: Sequence[str],
+        now: datetime,
+        direction: int | None = None,
+    ) -> np.ndarray:
+        return pct_to_levels(self.lookup_batch(stations, now, direction))
+
+    def station_ids_of(self, stations: Sequence[str]) -> np.ndarray:
+        return np.fromiter(
+            (self.station_id(s) for s in stations), dtype=np.int32, count=len(stations)
+        )
+
+    def gather_interp(
+        self,
+        ids: np.ndarray,
+        days: np.ndarray,
+        pos: np.ndarray,
+        direction: int | np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        연속 슬롯 좌표(slot_positions) 에서 앞뒤 슬롯을 선형 보간한 혼잡 %.
+        입력 배열은 서로 브로드캐스트 가능 (예: (T, 1) 출발 × (S,) 구간).
+        한쪽 슬롯만 값이 있으면 그 값을 사용.
+        """
+        ids, days, pos = np.broadcast_arrays(ids, days, pos)
+        if direction is not None:
+            direction = np.broadcast_to(direction, ids.shape)
+        ok = ~np.isnan(pos)
+        lo = np.where(ok, np.floor(np.nan_to_num(pos)), -1).astype(np.int16)
+        hi = np.where(ok, np.minimum(lo + 1, N_SLOTS - 1), -1).astype(np.int16)
+        w = np.nan_to_num(pos - lo).astype(np.float32)
+        a = self.gather(ids, days, lo, direction)
+        b = self.gather(ids, days, hi, direction)
+        out = a * (1 - w) + b * w
+        out = np.where(np.isnan(a), b, out)
+        return np.where(np.isnan(b), a, out)
+
+    def levels_at(
+        self,
+        stations: Sequence[str],
+        times: Sequence[datetime],
+        direction: int | None = None,
+    ) -> np.ndarray:
+        """역마다 다른 시각(도착 예상 시각)으로 보간 조회 → 레벨 배열"""
+        days = np.fromiter(
+            (DAY_TYPE[t.weekday()] - 1 for t in times), dtype=np.int8, count=len(times)
+        )
+        mins = np.fromiter(
+            (t.hour * 60 + t.minute + t.second / 60 for t in times),
+            dtype=np.float64,
+            count=len(times),
+        )
+        pct = self.gather_interp(
+            self.station_ids_of(stations), days, slot_positions(mins), direction
+        )
+        return pct_to_levels(pct)
+
+
+def aggregate_levels(
+    pct: np.ndarray, group: np.ndarray, weight: np.ndarray, n_groups: int
+):
+    """
+    역별 혼잡 % → 구간(group)별 (최고 레벨 int8, 시간 가중 평균 레벨 float32).
+    값이 없는 역은 제외하고, 구간 전체가 비면 FALLBACK_LEVEL.
+    """
+    pct, group, weight = (np.ravel(a) for a in np.broadcast_arrays(pct, group, weight))
+    known = ~np.isnan(pct)
+    lv = pct_to_levels(pct)
+    w = np.where(known, weight, 0.0)
+    num = np.bincount(group, w * lv, minlength=n_groups)
+    den = np.bincount(group, w, minlength=n_groups)
+    mean = np.where(den > 0, num / np.where(den > 0, den, 1), FALLBACK_LEVEL)
+    peak = np.zeros(n_groups, dtype=np.int8)
+    np.maximum.at(peak, group[known], lv[known])
+    peak[peak == 0] = FALLBACK_LEVEL
+    return peak, mean.astype(np.float32)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class SubwayCrowdTable:
+    """
+    와이드 CSV 의 열 단위(columnar) 메모리 표현 – 행 = 역·방향·요일
+    """
+
+    day: np.ndarray  # int8, 1 평일 / 2 토 / 3 일·공휴일
+    line: np.ndarray  # int16, 호선 번호(숫자가 아니면 0)
+    station: List[str]  # 정규화된 역명
+    direction: np.ndarray  # int8, 0 상선·내선 / 1 하선·외선
+    pct: np.ndarray  # float32 (행, N_SLOTS), 빈 칸은 NaN
+    car: np.ndarray | None = None  # int8 칸 번호 (칸별 파일일 때만)
+
+    def __len__(self) -> int:
+        return len(self.station)
+
+
+def _decode(raw: bytes) -> str:
+    for enc in ENCODINGS:
+        try:
+            return raw.decode(enc)
+        except UnicodeDecodeError:
+            continue
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return raw.decode("cp949", errors="replace")
+    best = from_bytes(raw).best()
+    return str(best) if best is not None else raw.decode("cp949", errors="replace")
+
+
+def _find_col(header: List[str], key: str) -> int:
+    for alias in COL_ALIASES[key]:
+        for i, h in enumerate(header):
+            if h.strip() == alias:
+                return i
+    raise ValueError(f"혼잡도 CSV 에 '{COL_ALIASES[key][0]}' 열이 없습니다")
+
+
+def header_slot(h: str) -> int:
+    """'5시30분', '00시30분' 같은 헤더 → 슬롯 인덱스 (해당 없음 -1)"""
+    m = SLOT_HEADER.match(h)
+    if not m:
+        return -1
+    hh, mm = int(m.group(1)), int(m.group(2))
+    return time_slot(datetime(2000, 1, 1, hh % 24, mm))
+
+
+def _num(v: str) -> float:
+    v = v.strip().replace(",", "")
+    try:
+        return float(v)
+    except ValueError:
+        return np.nan
+
+
+def load_subway_csv(path: Path) -> SubwayCrowdTable:
+    """와이드 포맷 혼잡도 CSV → SubwayCrowdTable (melt 없이 바로 적재)"""
+    rows = csv.reader(io.StringIO(_decode(Path(path).read_bytes())))
+    header = next(rows)
+    c_day, c_dir = _find_col(header, "day"), _find_col(header, "direction")
+    c_st = _find_col(header, "station")
+    try:
+        c_line = _find_col(header, "line")
+    except ValueError:
+        c_line = -1
+    try:
+        c_car = _find_col(header, "car")
+    except ValueError:
+        c_car = -1
+    slot_cols = [(i, header_slot(h)) for i, h in enumerate(header)]
+    slot_cols = [(i, s) for i, s in slot_cols if s >= 0]
+    if not slot_cols:
+        raise ValueError("혼잡도 CSV 에 'H시MM분' 시간 열이 없습니다")
+    src = [i for i, _ in slot_cols]
+    dst = np.array([s for _, s in slot_cols], dtype=np.intp)
+    # 시간 열이 연속이면 슬라이스로 한 번에 꺼냄
+    span = (
+        slice(src[0], src[-1] + 1)
+        if src == list(range(src[0], src[0] + len(src)))
+        else None
+    )
+
+    day, line, direction, station, car, vals = [], [], [], [], [], []
+    for r in rows:
+        if len(r) <= max(c_day, c_dir, c_st, c_car):
+            continue
+        d = DAY_NAMES.get(r[c_day].strip())
+        k = DIR_NAMES.get(r[c_dir].strip())
+        if d is None or k is None:
+            continue
+        if c_car >= 0:
+            cn = r[c_car].strip().rstrip("칸")
+            if not cn.isdigit():
+                continue
+            car.append(int(cn))
+        day.append(d)
+        direction.append(k)
+        station.append(normalize_station(r[c_st]))
+        ln = r[c_line].strip() if 0 <= c_line < len(r) else ""
+        line.append(int(ln) if ln.isdigit() else 0)
+        if span is not None and len(r) >= span.stop:
+            cells = r[span]
+        else:
+            cells = [r[i] if i < len(r) else "" for i in src]
+        try:
+            vals.append(list(map(float, cells)))  # 대부분의 행: 빠른 경로
+        except ValueError:
+            vals.append(list(map(_num, cells)))
+
+    pct = np.full((len(station), N_SLOTS), np.nan, dtype=np.float32)
+    if vals:
+        pct[:, dst] = np.asarray(vals, dtype=np.float32)
+    return SubwayCrowdTable(
+        day=np.asarray(day, dtype=np.int8),
+        line=np.asarray(line, dtype=np.int16),
+        station=station,
+        direction=np.asarray(direction, dtype=np.int8),
+        pct=pct,
+        car=np.asarray(car, dtype=np.int8) if c_car >= 0 else None,
+    )
+
+
+def build_subway_index(path: Path) -> SubwayCrowdIndex:
+    """와이드 포맷 CSV → SubwayCrowdIndex (같은 역명이 여러 호선이면 평균)"""
+    table = load_subway_csv(path)
+    station_ids: Dict[str, int] = {}
+    for n in table.station:
+        station_ids.setdefault(n, len(station_ids))
+    ids = np.fromiter(
+        (station_ids[n] for n in table.station), dtype=np.intp, count=len(table)
+    )
+    d = table.day.astype(np.intp) - 1
+    r = table.direction.astype(np.intp)
+    vals = table.pct
+
+    shape = (N_DAYS, len(station_ids), N_DIRS, N_SLOTS)
+    tot = np.zeros(shape, dtype=np.float64)
+    cnt = np.zeros(shape, dtype=np.int32)
+    valid = ~np.isnan(vals)
+    np.add.at(tot, (d, ids, r), np.where(valid, vals, 0.0))
+    np.add.at(cnt, (d, ids, r), valid.astype(np.int32))
+    with np.errstate(invalid="ignore"):
+        pct = np.where(cnt > 0, tot / np.maximum(cnt, 1), np.nan).astype(np.float32)
+    return SubwayCrowdIndex(pct=pct, station_ids=station_ids)
+
+
+def load_subway_index(path: Path, cache: Path | None = None) -> SubwayCrowdIndex:
+    """
+    캐시(.npz)가 원본 CSV 와 같은 버전이면 그대로 읽고, 아니면 빌드 후 저장
+    """
+    st = Path(path).stat()
+    stamp = np.array([st.st_mtime_ns, st.st_size], dtype=np.int64)
+    if cache is not None and cache.exists():
+        try:
+            with np.load(cache, allow_pickle=False) as z:
+                if np.array_equal(z["stamp"], stamp):
+                    names = z["names"].tolist()
+                    return SubwayCrowdIndex(
+                        pct=z["pct"], station_ids={n: i for i, n in enumerate(names)}
+                    )
+        except (OSError, KeyError, ValueError):
+            pass  # 깨진 캐시 → 재빌드
+    idx = build_subway_index(path)
+    if cache is not None:
+        try:
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            with cache.open("wb") as f:
+                np.savez(
+                    f, stamp=stamp, pct=idx.pct, names=np.array(list(idx.station_ids))
+                )
+        except OSError:
+            pass
+    return idx
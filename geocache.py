@@ -0,0 +1,150 @@
+"""
+geocache.py
+===============================================================
+지오코딩 결과 2단 캐시 (메모리 LRU → 디스크 SQLite)
+----------------------------------------------------------------
+* 1단: 프로세스 내 `cachetools.LRUCache` – 같은 역명·주소 반복 조회는 즉시 반환.
+* 2단: `CONF_DIR/geocode.sqlite` – 프로세스 재시작 후에도 유지.
+* 항목마다 만료 시각(TTL)이 있으며, 검색 실패(결과 없음)도
+  음성(negative) 항목으로 짧게 캐시해 같은 오타로 API 를 반복 호출하지 않습니다.
+* 적중·미스 카운터는 `stats()` 로 확인합니다.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Tuple
+
+from cachetools import LRUCache
+
+MISS = object()  # get() 미스 표시 (None 은 '음성 캐시' 의미)
+POSITIVE_TTL = 30 * 24 * 3600  # 30일
+NEGATIVE_TTL = 24 * 3600  # 1일
+
+Coord = Tuple[float, float]
+
+
+def normalize_query(q: str) -> str:
+    return " ".join(q.split())
+
+
+class GeocodeCache:
+    def __init__(
+        self,
+        path: Path,
+        *,
+        maxsize: int = 2048,
+        ttl: float = POSITIVE_TTL,
+        negative_ttl: float = NEGATIVE_TTL,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._mem: LRUCache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._stats: Counter = Counter()
+
+    # ── 디스크 ────────────────────────────────────────────────────────────────
+    def _conn(self) -> sqlite3.Connection | None:
+        if self._db is None:
+            try:
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS geocode ("
+                    " query TEXT PRIMARY KEY, lat REAL, lng REAL, expires REAL NOT NULL)"
+                )
+                self._db = db
+            except sqlite3.Error:
+                return None  # 디스크 캐시 없이 메모리 캐시만 사용
+        return self._db
+
+    def _disk_get(self, key: str):
+        db = self._conn()
+        if db is None:
+            return None
+        try:
+            return db.execute(
+                "SELECT lat, lng, expires FROM geocode WHERE query = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+
+    def _disk_put(self, key: str, value: Coord | None, expires: float):
+        db = self._conn()
+        if db is None:
+            return
+        lat, lng = value if value is not None else (None, None)
+        try:
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)",
+                    (key, lat, lng, expires),
+                )
+        except sqlite3.Error:
+            pass
+
+    # ── 공개 API ──────────────────────────────────────────────────────────────
+    def get(self, query: str):
+        """(lat, lng) / None(음성 캐시) / MISS"""
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            ent = self._mem.get(key)
+            if ent is not None and ent[1] > now:
+                self._stats["mem_hits"] += 1
+                return self._count(ent[0])
+            row = self._disk_get(key)
+            if row is not None and row[2] > now:
+                value = (row[0], row[1]) if row[0] is not None else None
+                self._mem[key] = (value, row[2])
+                self._stats["disk_hits"] += 1
+                return self._count(value)
+            self._stats["misses"] += 1
+            return MISS
+
+    def _count(self, value):
+        if value is None:
+            self._stats["negative_hits"] += 1
+        return value
+
+    def put(self, query: str, value: Coord | None):
+        key = normalize_query(query)
+        expires = time.time() + (self.ttl if value is not None else self.negative_ttl)
+        with self._lock:
+            self._mem[key] = (value, expires)
+            self._disk_put(key, value, expires)
+
+    def purge_expired(self) -> int:
+        """만료된 디스크 항목 삭제 → 삭제 개수"""
+        with self._lock:
+            db = self._conn()
+            if db is None:
+                return 0
+            with db:
+                return db.execute(
+                    "DELETE FROM geocode WHERE expires <= ?", (time.time(),)
+                ).rowcount
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            db = self._conn()
+            if db is not None:
+                with db:
+                    db.execute("DELETE FROM geocode")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            s = {
+                k: self._stats[k]
+                for k in ("mem_hits", "disk_hits", "negative_hits", "misses")
+            }
+            s["mem_size"] = len(self._mem)
+        return s
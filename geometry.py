@@ -0,0 +1,137 @@
+"""
+geometry.py
+===============================================================
+numpy 기반 좌표 배열 연산 (위경도, [lat, lng] 순서)
+----------------------------------------------------------------
+* haversine   : 점 쌍 배열 / 한 점 → 다수 / (Q, N) 거리 행렬
+* path_length : 폴리라인 누적 길이, 구간(offset)별 길이
+* simplify    : Douglas–Peucker 단순화 (허용 오차 m)
+* bbox        : [[남, 서], [북, 동]] – folium `fit_bounds` 형식
+"""
+
+from __future__ import annotations
+
+import math
+from typing import List
+
+import numpy as np
+
+EARTH_R = 6371000.0
+
+
+def _as_pts(pts) -> np.ndarray:
+    return np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+def haversine(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """브로드캐스팅 haversine 거리 (m)"""
+    la1, la2 = np.radians(lat1), np.radians(lat2)
+    dlng = np.radians(np.asarray(lng2) - np.asarray(lng1))
+    d = np.sin((la2 - la1) / 2) ** 2 + np.cos(la1) * np.cos(la2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_R * np.arcsin(np.sqrt(np.minimum(d, 1.0)))
+
+
+def haversine_to(lat: float, lng: float, lats, lngs) -> np.ndarray:
+    """한 점 → 여러 점 거리 (m)"""
+    return haversine(lat, lng, lats, lngs)
+
+
+def haversine_matrix(qlat, qlng, lats, lngs) -> np.ndarray:
+    """질의점 Q 개 × 대상 N 개 거리 행렬 (Q, N)"""
+    return haversine(
+        np.asarray(qlat)[:, None],
+        np.asarray(qlng)[:, None],
+        np.asarray(lats)[None, :],
+        np.asarray(lngs)[None, :],
+    )
+
+
+def step_lengths(pts) -> np.ndarray:
+    """연속 점 사이 거리 (n-1,)"""
+    p = _as_pts(pts)
+    if len(p) < 2:
+        return np.empty(0)
+    return haversine(p[:-1, 0], p[:-1, 1], p[1:, 0], p[1:, 1])
+
+
+def cumulative_length(pts) -> np.ndarray:
+    """시작점부터 누적 길이 (n,) – 첫 값 0"""
+    p = _as_pts(pts)
+    out = np.zeros(len(p))
+    if len(p) > 1:
+        np.cumsum(step_lengths(p), out=out[1:])
+    return out
+
+
+def path_length(pts) -> float:
+    return float(step_lengths(pts).sum())
+
+
+def segment_lengths(coords, offsets) -> np.ndarray:
+    """
+    연속 버퍼 coords (P, 2) + 구간 경계 offsets (S+1,) → 구간별 길이 (S,)
+    구간 경계를 넘는 점 쌍은 제외한다.
+    """
+    cum = cumulative_length(coords)
+    offsets = np.asarray(offsets)
+    a, b = offsets[:-1], offsets[1:]
+    nonempty = b > a
+    out = np.zeros(len(a))
+    out[nonempty] = cum[b[nonempty] - 1] - cum[a[nonempty]]
+    return out
+
+
+def bbox(pts) -> List[List[float]] | None:
+    """[[min_lat, min_lng], [max_lat, max_lng]] (점이 없으면 None)"""
+    p = _as_pts(pts)
+    if not len(p):
+        return None
+    lo, hi = p.min(axis=0), p.max(axis=0)
+    return [[float(lo[0]), float(lo[1])], [float(hi[0]), float(hi[1])]]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+def _project(p: np.ndarray) -> np.ndarray:
+    """국지 등장방형 투영 → 미터 평면 좌표 (단순화용)"""
+    lat0 = math.radians(float(p[:, 0].mean()))
+    k = EARTH_R * math.pi / 180
+    return np.column_stack((p[:, 1] * k * math.cos(lat0), p[:, 0] * k))
+
+
+def simplify_mask(pts, tolerance_m: float) -> np.ndarray:
+    """Douglas–Peucker 로 남길 점 마스크 (양 끝점은 항상 유지)"""
+    p = _as_pts(pts)
+    n = len(p)
+    keep = np.zeros(n, dtype=bool)
+    if n <= 2 or tolerance_m <= 0:
+        keep[:] = True
+        return keep
+    xy = _project(p)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        a, b = xy[i], xy[j]
+        mid = xy[i + 1 : j]
+        ab = b - a
+        L2 = float(ab @ ab)
+        if L2 == 0.0:
+            d = np.hypot(*(mid - a).T)
+        else:
+            t = np.clip(((mid - a) @ ab) / L2, 0.0, 1.0)
+            d = np.hypot(*(mid - (a + t[:, None] * ab)).T)
+        k = int(np.argmax(d))
+        if d[k] > tolerance_m:
+            m = i + 1 + k
+            keep[m] = True
+            stack.append((i, m))
+            stack.append((m, j))
+    return keep
+
+
+def simplify(pts, tolerance_m: float) -> np.ndarray:
+    p = _as_pts(pts)
+    return p[simplify_mask(p, tolerance_m)]
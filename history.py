@@ -0,0 +1,244 @@
+"""
+history.py
+===============================================================
+이동 기록 저장소 (append-only SQLite WAL) + 집계 API
+----------------------------------------------------------------
+* `trips`    : 이동 1 건 – 시각, 사용자, 출발/도착(입력·좌표), 총 소요, 30분 슬롯
+* `segments` : 구간별 모드·이름·소요·혼잡 (+ 지하철은 승차역·방향·탄 칸)
+  (원본 로그, INSERT 만 수행)
+* 롤업 테이블 `seg_rollup (user, mode, slot)` / `od_rollup (user, origin, dest)` 을
+  기록과 같은 트랜잭션에서 UPSERT 로 누적 → 집계 질의는 그룹 수(수백 행)만
+  읽으므로 기록이 수백만 건이어도 밀리초 단위입니다.
+* `car_rollup (요일, 승차역, 방향, 슬롯, 칸)` : 사용자가 직접 알려 준 (탄 칸, 체감
+  혼잡) 관측만 누적 – 추천 칸 모델(bestcar.seed_from_history)의 재료.
+  추천값·추정 혼잡을 그대로 넣으면 모델이 자기 출력을 학습하므로 제외합니다.
+* 집계: `mode_share` / `crowd_by_slot` / `top_od` / `trip_count` / `car_observations`
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from crowd import DAY_TYPE, N_SLOTS, normalize_station, time_slot
+
+MODES = ("SUBWAY", "BUS", "WALK")
+DEFAULT_USER = "default"
+
+Coord = Tuple[float, float]
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS trips ("
+    " id INTEGER PRIMARY KEY, ts TEXT NOT NULL, user TEXT NOT NULL,"
+    " origin TEXT, dest TEXT, o_lat REAL, o_lng REAL, d_lat REAL, d_lng REAL,"
+    " total_min REAL, day INTEGER, slot INTEGER)",
+    "CREATE TABLE IF NOT EXISTS segments ("
+    " trip_id INTEGER NOT NULL, seq INTEGER NOT NULL, user TEXT NOT NULL,"
+    " slot INTEGER, mode INTEGER, name TEXT, duration REAL, crowd INTEGER,"
+    " board TEXT, direction INTEGER, car INTEGER)",
+    "CREATE TABLE IF NOT EXISTS seg_rollup ("
+    " user TEXT, mode INTEGER, slot INTEGER, n INTEGER, minutes REAL,"
+    " crowd_sum INTEGER, PRIMARY KEY (user, mode, slot)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS od_rollup ("
+    " user TEXT, origin TEXT, dest TEXT, n INTEGER,"
+    " PRIMARY KEY (user, origin, dest)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS car_rollup ("
+    " day INTEGER, board TEXT, direction INTEGER, slot INTEGER, car INTEGER,"
+    " n INTEGER, crowd_sum INTEGER,"
+    " PRIMARY KEY (day, board, direction, slot, car)) WITHOUT ROWID",
+)
+# 이전 스키마 DB 에 추가할 열 (ALTER TABLE ADD COLUMN)
+_MIGRATE = {"segments": ("board TEXT", "direction INTEGER", "car INTEGER")}
+
+
+class TripHistory:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            for stmt in _SCHEMA:
+                db.execute(stmt)
+            for table, cols in _MIGRATE.items():
+                have = {r[1] for r in db.execute(f"PRAGMA table_info({table})")}
+                for col in cols:
+                    if col.split()[0] not in have:
+                        db.execute(f"ALTER TABLE {table} ADD COLUMN {col}")
+            self._db = db
+        return self._db
+
+    def _query(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn().execute(sql, params).fetchall()
+
+    # ── 기록 ─────────────────────────────────────────────────────────────────
+    def record(
+        self,
+        segs: Sequence[Mapping],
+        *,
+        origin: str,
+        dest: str,
+        o: Coord,
+        d: Coord,
+        when: datetime | None = None,
+        user: str = DEFAULT_USER,
+        observed: Mapping[int, Tuple[int, int]] | None = None,
+    ) -> int:
+        """
+        이동 1 건 + 구간 행을 한 트랜잭션으로 추가 → trip id
+        observed: {구간 번호: (탄 칸, 체감 혼잡 레벨)} – 사용자가 알려 준 지하철 관측
+        """
+        when = when or datetime.now()
+        slot = time_slot(when)
+        day = DAY_TYPE[when.weekday()]
+        observed = observed or {}
+        total = float(sum(s.get("duration_min", 0) or 0 for s in segs))
+        with self._lock:
+            db = self._conn()
+            with db:
+                cur = db.execute(
+                    "INSERT INTO trips (ts, user, origin, dest, o_lat, o_lng,"
+                    " d_lat, d_lng, total_min, day, slot)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        when.isoformat(),
+                        user,
+                        origin,
+                        dest,
+                        float(o[0]),
+                        float(o[1]),
+                        float(d[0]),
+                        float(d[1]),
+                        total,
+                        day,
+                        slot,
+                    ),
+                )
+                tid = cur.lastrowid
+                rows, cars, elapsed = [], [], 0.0
+                for i, s in enumerate(segs):
+                    sub = s["mode"] == "SUBWAY"
+                    stops = s.get("stops") or ()
+                    board = normalize_station(str(stops[0])) if sub and stops else None
+                    way = int(s.get("direction", -1)) if sub else None
+                    car, felt = observed.get(i, (None, None))
+                    rows.append(
+                        (
+                            tid,
+                            i,
+                            user,
+                            slot,
+                            MODES.index(s["mode"]) if s["mode"] in MODES else -1,
+                            str(s.get("name", "")),
+                            float(s.get("duration_min", 0) or 0),
+                            int(s.get("crowd", 1) if felt is None else felt),
+                            board,
+                            way,
+                            car,
+                        )
+                    )
+                    if board and car and felt and way is not None and way >= 0:
+                        t = when + timedelta(minutes=elapsed)  # 그 구간 승차 시각
+                        cars.append(
+                            (DAY_TYPE[t.weekday()], board, way, time_slot(t))
+                            + (int(car), int(felt))
+                        )
+                    elapsed += float(s.get("duration_min", 0) or 0)
+                db.executemany(
+                    "INSERT INTO segments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                db.executemany(
+                    "INSERT INTO seg_rollup VALUES (?, ?, ?, 1, ?, ?)"
+                    " ON CONFLICT DO UPDATE SET n = n + 1,"
+                    " minutes = minutes + excluded.minutes,"
+                    " crowd_sum = crowd_sum + excluded.crowd_sum",
+                    [(user, r[4], r[3], r[6], r[7]) for r in rows if r[4] >= 0],
+                )
+                db.execute(
+                    "INSERT INTO od_rollup VALUES (?, ?, ?, 1)"
+                    " ON CONFLICT DO UPDATE SET n = n + 1",
+                    (user, origin, dest),
+                )
+                db.executemany(
+                    "INSERT INTO car_rollup VALUES (?, ?, ?, ?, ?, 1, ?)"
+                    " ON CONFLICT DO UPDATE SET n = n + 1,"
+                    " crowd_sum = crowd_sum + excluded.crowd_sum",
+                    [c for c in cars if c[3] >= 0],
+                )
+        return tid
+
+    # ── 집계 ─────────────────────────────────────────────────────────────────
+    def trip_count(self, user: str = DEFAULT_USER) -> int:
+        return self._query(
+            "SELECT COALESCE(SUM(n), 0) FROM od_rollup WHERE user = ?", (user,)
+        )[0][0]
+
+    def mode_share(self, user: str = DEFAULT_USER) -> Dict[str, Dict[str, float]]:
+        """모드별 {구간 수 비율, 소요 시간 비율, 평균 혼잡}"""
+        rows = self._query(
+            "SELECT mode, SUM(n), SUM(minutes), 1.0 * SUM(crowd_sum) / SUM(n)"
+            " FROM seg_rollup WHERE user = ? GROUP BY mode",
+            (user,),
+        )
+        n = sum(r[1] for r in rows) or 1
+        mins = sum(r[2] for r in rows) or 1.0
+        return {
+            MODES[m]: {"segments": c / n, "minutes": t / mins, "avg_crowd": a}
+            for m, c, t, a in rows
+        }
+
+    def crowd_by_slot(self, user: str = DEFAULT_USER, mode: str | None = "SUBWAY"):
+        """30분 슬롯별 평균 혼잡 레벨 (N_SLOTS,) – 기록 없는 슬롯은 NaN"""
+        sql = (
+            "SELECT slot, 1.0 * SUM(crowd_sum) / SUM(n) FROM seg_rollup"
+            " WHERE user = ?"
+        )
+        params: list = [user]
+        if mode is not None:
+            sql += " AND mode = ?"
+            params.append(MODES.index(mode))
+        rows = self._query(sql + " AND slot >= 0 GROUP BY slot", params)
+        out = np.full(N_SLOTS, np.nan)
+        if rows:
+            slots, avg = np.array(rows).T
+            out[slots.astype(int)] = avg
+        return out
+
+    def top_od(
+        self, user: str = DEFAULT_USER, k: int = 10
+    ) -> List[Tuple[str, str, int]]:
+        """자주 이용한 (출발, 도착, 횟수) 상위 k 개"""
+        return self._query(
+            "SELECT origin, dest, n FROM od_rollup WHERE user = ?"
+            " ORDER BY n DESC LIMIT ?",
+            (user, k),
+        )
+
+    def car_observations(self) -> List[Tuple[int, str, int, int, int, int, int]]:
+        """
+        칸 관측 롤업 (요일 1~3, 승차역, 방향, 슬롯, 칸, 횟수, 체감 레벨 합).
+        기록 파일이 아직 없으면 만들지 않고 빈 리스트.
+        """
+        if self._db is None and not Path(self.path).exists():
+            return []
+        return self._query(
+            "SELECT day, board, direction, slot, car, n, crowd_sum FROM car_rollup"
+        )
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
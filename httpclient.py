@@ -0,0 +1,257 @@
+"""
+httpclient.py
+===============================================================
+Kakao · ODsay 공용 HTTP 클라이언트
+----------------------------------------------------------------
+* `requests.Session` + `HTTPAdapter` 로 호스트별 keep-alive 커넥션 풀을 재사용
+  → 호출마다 TCP+TLS 핸드셰이크를 하지 않습니다.
+* 연결 오류·타임아웃·429/5xx 는 `tenacity` 로 지수 백오프 + 지터 재시도.
+* TLS 인증서 검증은 기본으로 켜져 있습니다. 사내 프록시 등으로 꼭 꺼야 할 때만
+  `PLANNER_HTTP_INSECURE=1` 로 끕니다.
+* 전송 계층(`Transport`)을 교체할 수 있어 테스트에서는 로컬 가짜 전송을 씁니다.
+  실패는 항상 `requests.RequestException` 계열로 올라오므로
+  기존 `except requests.RequestException` 분기가 그대로 동작합니다.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Protocol
+
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import (
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    stop_any,
+    wait_exponential_jitter,
+)
+
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class Timeouts:
+    connect: float = 3.0
+    read: float = 8.0
+
+    def as_requests(self):
+        return (self.connect, self.read)
+
+
+@dataclass(frozen=True)
+class HttpConfig:
+    timeouts: Timeouts = field(default_factory=Timeouts)
+    retries: int = 3  # 총 시도 횟수
+    backoff_initial: float = 0.2
+    backoff_max: float = 2.0
+    backoff_jitter: float = 0.2
+    pool_connections: int = 8  # 호스트별 풀 개수
+    pool_maxsize: int = 32  # 풀당 최대 커넥션
+    verify: bool = True  # TLS 인증서 검증 (PLANNER_HTTP_INSECURE=1 로 끔)
+
+    @classmethod
+    def from_env(cls) -> "HttpConfig":
+        env = os.environ
+        return cls(
+            timeouts=Timeouts(
+                connect=float(env.get("PLANNER_HTTP_CONNECT_TIMEOUT", 3.0)),
+                read=float(env.get("PLANNER_HTTP_READ_TIMEOUT", 8.0)),
+            ),
+            retries=int(env.get("PLANNER_HTTP_RETRIES", 3)),
+            verify=env.get("PLANNER_HTTP_INSECURE", "0") != "1",
+        )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+@dataclass
+class HttpResponse:
+    status: int
+    content: bytes
+    url: str = ""
+
+    def json(self):
+        return orjson.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            resp = requests.Response()
+            resp.status_code, resp.url, resp._content = (
+                self.status,
+                self.url,
+                self.content,
+            )
+            raise requests.HTTPError(
+                f"{self.status} Error for url: {self.url}", response=resp
+            )
+
+
+class Transport(Protocol):
+    def get(
+        self,
+        url: str,
+        *,
+        params: Mapping | None,
+        headers: Mapping | None,
+        timeout,
+        verify: bool,
+    ) -> HttpResponse: ...
+
+
+class RequestsTransport:
+    """Session 기반 기본 전송 – 커넥션 풀·keep-alive"""
+
+    def __init__(self, config: HttpConfig):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=config.pool_connections,
+            pool_maxsize=config.pool_maxsize,
+            max_retries=0,  # 재시도는 HttpClient 가 담당
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, *, params=None, headers=None, timeout=None, verify=True):
+        r = self.session.get(
+            url, params=params, headers=headers, timeout=timeout, verify=verify
+        )
+        return HttpResponse(status=r.status_code, content=r.content, url=r.url)
+
+    def close(self):
+        self.session.close()
+
+
+class Deadline:
+    """
+    time.monotonic 기준 마감 시각. 다른 스레드에서 `shorten` 으로 앞당길 수 있어
+    이미 진행 중인 요청의 다음 시도·재시도에도 바로 반영됩니다 (늦추지는 않음).
+    """
+
+    __slots__ = ("_at", "_lock")
+
+    def __init__(self, at: float):
+        self._at = at
+        self._lock = threading.Lock()
+
+    @property
+    def at(self) -> float:
+        return self._at
+
+    def shorten(self, at: float):
+        with self._lock:
+            self._at = min(self._at, at)
+
+    def left(self) -> float:
+        return self._at - time.monotonic()
+
+
+def _clamp(timeout, left: float):
+    """timeout(초 또는 (connect, read))을 남은 시간 이하로 줄임"""
+    if isinstance(timeout, tuple):
+        return tuple(min(t, left) for t in timeout)
+    return min(timeout, left) if timeout is not None else left
+
+
+def _retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code in RETRY_STATUS
+    return False
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+class HttpClient:
+    def __init__(
+        self, config: HttpConfig | None = None, transport: Transport | None = None
+    ):
+        self.config = config or HttpConfig.from_env()
+        self.transport = transport or RequestsTransport(self.config)
+
+    def _retrying(self, deadline: Deadline | None = None) -> Retrying:
+        c = self.config
+        stop = stop_after_attempt(max(1, c.retries))
+        if deadline is not None:  # 다음 시도(백오프 포함)가 마감을 넘기면 중단
+            stop = stop_any(
+                stop, lambda rs: (rs.upcoming_sleep or 0) >= deadline.left()
+            )
+        return Retrying(
+            retry=retry_if_exception(_retryable),
+            stop=stop,
+            wait=wait_exponential_jitter(
+                initial=c.backoff_initial, max=c.backoff_max, jitter=c.backoff_jitter
+            ),
+            reraise=True,
+        )
+
+    def get(
+        self,
+        url: str,
+        *,
+        params: Mapping | None = None,
+        headers: Mapping | None = None,
+        timeout: float | Timeouts | None = None,
+        deadline: float | Deadline | None = None,
+    ) -> HttpResponse:
+        """
+        GET + 상태 코드 검사 (재시도 포함). 실패 시 requests.RequestException
+        `deadline` (time.monotonic 기준 절대 시각 또는 `Deadline`)을 주면 시도마다
+        timeout 을 남은 시간으로 줄이고, 마감 이후에는 재시도하지 않습니다.
+        """
+        if timeout is None:
+            timeout = self.config.timeouts
+        if isinstance(timeout, Timeouts):
+            timeout = timeout.as_requests()
+        if isinstance(deadline, (int, float)):
+            deadline = Deadline(deadline)
+        for attempt in self._retrying(deadline):
+            with attempt:
+                t = timeout
+                if deadline is not None:
+                    left = deadline.left()
+                    if left <= 0:
+                        raise requests.Timeout(f"마감 초과: {url}")
+                    t = _clamp(timeout, left)
+                r = self.transport.get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    timeout=t,
+                    verify=self.config.verify,
+                )
+                r.raise_for_status()
+        return r
+
+    def get_json(self, url: str, **kw) -> Dict:
+        r = self.get(url, **kw)
+        try:
+            return r.json()
+        except orjson.JSONDecodeError as e:
+            raise requests.RequestException(f"JSON 파싱 실패: {url}") from e
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 프로세스 전역 클라이언트 (서버 프로세스에서도 커넥션 재사용)
+_client: HttpClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def set_client(client: HttpClient | None):
+    """테스트·서버에서 전송 계층/설정을 교체할 때 사용 (None → 기본값으로 재생성)"""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,97 @@
+"""
+learner.py
+===============================================================
+온라인 선호도 학습 (기록 1 건당 O(1) 갱신, 전체 기록 재스캔 없음)
+----------------------------------------------------------------
+* crowd_weight · mode_penalty : 쌍대 로지스틱 랭킹 SGD.
+  선택한 후보 c 와 나머지 후보 r 의 점수 차 Δ = s_r − s_c 에 대해
+  P(c ≻ r) = σ(Δ / τ) 의 로그우도를 올리는 방향으로 한 스텝 이동.
+  점수는 두 파라미터에 대해 선형이므로 기울기 = 특징 차 (F_r − F_c):
+    - crowd_weight 열 : Σ max(평균 혼잡−1, 0)
+    - mode_penalty 열 : 모드별 구간 수
+* walk_limit_min : 선택 경로 도보 시간의 상위 분위수(q)를 추적하는
+  확률적 분위수 갱신  limit += η·(q − 1[walk ≤ limit])
+* 학습률은 runs 가 늘수록 1/√(1+runs) 로 감소 → 초기엔 빠르게, 이후 안정.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
+
+from prefs import Prefs
+from scoring import (
+    MODES,
+    PV_CROWD_WEIGHT,
+    PV_MODE,
+    PV_SIZE,
+    WALK,
+    RouteMatrix,
+    prefs_vector,
+    score_matrix,
+)
+
+LEARNING_RATE = 0.5
+TEMPERATURE = 5.0  # 점수(분) 차 스케일
+WALK_QUANTILE = 0.9
+WALK_STEP = 1.0  # 분
+BOUNDS = {
+    "crowd_weight": (0.0, 5.0),
+    "mode_penalty": (0.0, 10.0),
+    "walk_limit_min": (1.0, 60.0),
+}  # Streamlit 위젯 범위와 동일
+
+
+def route_features(rm: RouteMatrix) -> np.ndarray:
+    """점수의 선형 부분 기울기 (N, PV_SIZE) – 학습 대상 열만 채움"""
+    F = np.zeros((len(rm), PV_SIZE))
+    excess = np.maximum(rm.crowd_mean - 1, 0)
+    F[:, PV_CROWD_WEIGHT] = np.where(rm.mask, excess, 0).sum(axis=1)
+    for i in range(len(MODES)):
+        F[:, PV_MODE.start + i] = (rm.mode == i).sum(axis=1)
+    return F
+
+
+def update_prefs(
+    prefs: Mapping,
+    routes: Sequence[List[dict]],
+    chosen: int,
+    *,
+    lr: float = LEARNING_RATE,
+) -> Dict:
+    """
+    후보 routes 중 chosen(0-based)을 이용했다는 관측 1 건으로 한 스텝 갱신
+    → 저장용 dict (runs + 1)
+    """
+    p = Prefs.from_dict(prefs).to_dict()
+    rm = RouteMatrix.from_routes(routes)
+    if not 0 <= chosen < len(rm):
+        raise IndexError(chosen)
+    step = lr / math.sqrt(1 + p["runs"])
+
+    rejected = np.flatnonzero(rm.mask.any(axis=1))
+    rejected = rejected[rejected != chosen]
+    if len(rejected):
+        pv = prefs_vector(p)
+        s = score_matrix(rm, pv)
+        F = route_features(rm)
+        delta = (s[rejected] - s[chosen]) / TEMPERATURE
+        w = 1.0 / (1.0 + np.exp(np.clip(delta, -50, 50)))  # σ(−Δ): 틀린 만큼 크게
+        grad = (w[:, None] * (F[rejected] - F[chosen])).mean(axis=0)
+        pv += step * grad
+        lo, hi = BOUNDS["crowd_weight"]
+        p["crowd_weight"] = float(np.clip(pv[PV_CROWD_WEIGHT], lo, hi))
+        lo, hi = BOUNDS["mode_penalty"]
+        p["mode_penalty"] = {
+            m: float(np.clip(v, lo, hi)) for m, v in zip(MODES, pv[PV_MODE])
+        }
+
+    walk = float(np.where(rm.mode[chosen] == WALK, rm.duration[chosen], 0.0).sum())
+    limit = float(p["walk_limit_min"])
+    limit += WALK_STEP * (WALK_QUANTILE - (walk <= limit))
+    lo, hi = BOUNDS["walk_limit_min"]
+    p["walk_limit_min"] = round(min(max(limit, lo), hi), 2)
+    p["runs"] += 1
+    return p
@@ -0,0 +1,206 @@
+"""
+maprender.py
+===============================================================
+경량 지도 렌더러 – folium 없이 GeoJSON + 정적 HTML 템플릿
+----------------------------------------------------------------
+* `route_geojson` : 세그먼트 → GeoJSON FeatureCollection (RFC 7946)
+  - 선 구간은 LineString (단순화 + 소수 5 자리, [경도, 위도]).
+    `encoded=True` 면 좌표 대신 Google polyline 문자열을 비표준 멤버
+    `encodedPolyline` 에 싣고 geometry 는 null (RFC 7946 §3.2 허용) → 좌표 배열보다
+    훨씬 작아 HTML 에 끼워 넣는 `render_html` 이 이 형태를 씁니다.
+  - 출발/도착/환승 지점은 Point
+  - `bbox` 는 [서, 남, 동, 북]. Leaflet 용 [[남, 서], [북, 동]] 변환은 템플릿에서
+  - 외곽선(호선·모드)/중심선(혼잡) 색상은 미리 계산해 속성으로 포함
+* `render_html`   : 고정 Leaflet 템플릿에 인코딩된 GeoJSON 을 끼워 넣은 HTML 문자열
+  (템플릿이 polyline 을 풀어 그림. 파일을 쓰지 않으므로 Streamlit 은 메모리에서 바로 표시)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from geometry import bbox, simplify
+
+Coord = Tuple[float, float]
+
+
+class LineColors:
+    """(모드, 이름) → 외곽선 색상. 이름별 결과를 한 번만 계산해 보관"""
+
+    def __init__(
+        self,
+        subway: Mapping[str, str],
+        bus: str,
+        walk: str,
+        default: str = "#333333",
+    ):
+        # 긴 키부터 비교 → '수도권 2호선' 같은 표기에서도 가장 구체적인 호선 선택
+        self._subway = sorted(subway.items(), key=lambda kv: -len(kv[0]))
+        self._fixed = {"BUS": bus, "WALK": walk}
+        self._default = default
+        self._memo: Dict[str, str] = {}
+
+    def __call__(self, mode: str, name: str) -> str:
+        if mode != "SUBWAY":
+            return self._fixed.get(mode, self._default)
+        c = self._memo.get(name)
+        if c is None:
+            c = next((v for k, v in self._subway if k in name), self._default)
+            self._memo[name] = c
+        return c
+
+
+def crowd_gradient_color(level: int, max_level: int = 4) -> str:
+    """혼잡도 레벨(1~max_level) → 녹색~빨강 선형 그라디언트"""
+    ratio = max(0, min(level - 1, max_level - 1)) / (max_level - 1)
+    return f"#{int(255 * ratio):02x}{int(255 * (1 - ratio)):02x}00"
+
+
+@dataclass(frozen=True)
+class MapStyle:
+    line_colors: LineColors
+    crowd_colors: Mapping[int, str] = field(
+        default_factory=lambda: {1: "green", 2: "yellow", 3: "orange", 4: "red"}
+    )
+    outer_weight: int = 15
+    center_weight: int = 2
+    simplify_tol_m: float = 5.0
+
+
+def _point(c: Coord, kind: str, label: str) -> dict:
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [float(c[1]), float(c[0])]},
+        "properties": {"kind": kind, "label": label},
+    }
+
+
+def route_geojson(
+    segs: Sequence[Mapping],
+    o: Coord,
+    d: Coord,
+    style: MapStyle,
+    *,
+    encoded: bool = False,
+):
+    """
+    세그먼트 → FeatureCollection (bbox 는 RFC 7946 [서, 남, 동, 북])
+    encoded: 선 구간을 좌표 대신 polyline 문자열(`encodedPolyline`)로
+    """
+    if encoded:
+        import polyline  # 지연 import – 지도 HTML 을 만들 때만 로드
+
+    feats: List[dict] = [_point(o, "origin", "출발"), _point(d, "dest", "도착")]
+    pts = [np.asarray([o, d], dtype=float)]
+    prev_mode, transfers = None, 0
+    for idx, seg in enumerate(segs, start=1):
+        mode = seg.get("mode")
+        coords = seg.get("poly", [])
+        if len(coords) == 0:
+            prev_mode = mode
+            continue
+        coords = simplify(coords, style.simplify_tol_m)
+        pts.append(coords)
+        crowd = int(seg.get("crowd", 1))
+        name = str(seg.get("name", ""))
+        duration = float(seg.get("duration_min", 0))
+        tip = f"{idx}. {mode} ({name}): {duration:.1f}분 | 혼잡도 {crowd}"
+        if seg.get("best_car"):
+            tip += f" | 추천칸 {seg.get('best_car')}"
+        line = np.round(coords, 5)
+        if encoded:
+            geom = {"geometry": None, "encodedPolyline": polyline.encode(line.tolist())}
+        else:
+            geom = {
+                "geometry": {
+                    "type": "LineString",
+                    "coordinates": line[:, ::-1].tolist(),
+                }
+            }
+        feats.append(
+            {
+                "type": "Feature",
+                **geom,
+                "properties": {
+                    "kind": "segment",
+                    "outer": style.line_colors(mode, name),
+                    "center": crowd_gradient_color(crowd),
+                    "marker": style.crowd_colors.get(crowd, "blue"),
+                    "crowd": crowd,
+                    "tooltip": tip,
+                    "mtip": f"혼잡도 {crowd}: {duration:.1f}분",
+                },
+            }
+        )
+        if prev_mode and prev_mode != mode:
+            transfers += 1
+            label = f"환승 {transfers}: {prev_mode}→{mode}"
+            feats.append(_point(tuple(coords[0]), "transfer", label))
+        prev_mode = mode
+    (s, w), (n, e) = bbox(np.vstack(pts))
+    return {
+        "type": "FeatureCollection",
+        "bbox": [w, s, e, n],
+        "style": {"outer": style.outer_weight, "center": style.center_weight},
+        "features": feats,
+    }
+
+
+_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css">
+<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+<style>html,body,#map{height:100%;margin:0}</style>
+</head><body><div id="map"></div>
+<script>
+const FC = __GEOJSON__;
+const map = L.map("map");
+L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png",
+  {attribution: "&copy; OpenStreetMap contributors"}).addTo(map);
+const ICON = {origin: "#1e6fd9", dest: "#d92c1e", transfer: "#8e44ad"};
+// Google polyline (정밀도 1e5) → [[위도, 경도], ...]
+function decode(str) {
+  const out = [];
+  let i = 0, lat = 0, lng = 0;
+  while (i < str.length) {
+    for (let k = 0; k < 2; k++) {
+      let b, shift = 0, r = 0;
+      do { b = str.charCodeAt(i++) - 63; r |= (b & 0x1f) << shift; shift += 5; } while (b >= 0x20);
+      const dv = r & 1 ? ~(r >> 1) : r >> 1;
+      if (k === 0) lat += dv; else lng += dv;
+    }
+    out.push([lat / 1e5, lng / 1e5]);
+  }
+  return out;
+}
+for (const f of FC.features) {
+  const p = f.properties;
+  if (p.kind === "segment") {
+    const ll = decode(f.encodedPolyline);
+    L.polyline(ll, {color: p.outer, weight: FC.style.outer, opacity: 0.8}).bindTooltip(p.tooltip).addTo(map);
+    L.polyline(ll, {color: p.center, weight: FC.style.center, opacity: 1}).bindTooltip(p.tooltip).addTo(map);
+    L.circleMarker(ll[0], {radius: 5 + p.crowd * 2, color: p.marker, fill: true, fillOpacity: 0.7})
+      .bindTooltip(p.mtip).addTo(map);
+  } else {
+    const c = f.geometry.coordinates;
+    L.circleMarker([c[1], c[0]], {radius: 9, color: "#fff", weight: 2, fillColor: ICON[p.kind], fillOpacity: 1})
+      .bindPopup(p.label).addTo(map);
+  }
+}
+const [w, s, e, n] = FC.bbox;
+map.fitBounds([[s, w], [n, e]]);
+</script></body></html>
+"""
+
+
+def render_html(segs: Sequence[Mapping], o: Coord, d: Coord, style: MapStyle) -> str:
+    """완성된 지도 HTML 문자열 (파일 I/O 없음)"""
+    import orjson
+
+    fc = orjson.dumps(route_geojson(segs, o, d, style, encoded=True)).decode()
+    # </script> 가 데이터에 섞여도 태그가 닫히지 않도록
+    return _TEMPLATE.replace("__GEOJSON__", fc.replace("</", "<\\/"))
@@ -0,0 +1,251 @@
+"""
+metrics.py
+===============================================================
+경량 계측 – 단계별 시간 · 카운터 · 요청 단위 트레이스
+----------------------------------------------------------------
+* 기본은 꺼짐 (`PLANNER_METRICS=1` 또는 `enable()`). 꺼져 있으면 `span()` /
+  `trace()` 는 공용 no-op 객체, `incr()` 는 즉시 반환, `@timed` 는 원 함수 직접
+  호출 → 플래그 검사 1 회 외에는 비용이 없습니다.
+* `span(name)` / `@timed(name)` : 구간 시간(ms) → 현재 트레이스 +
+  프로세스 집계(횟수·합·최대·누적 히스토그램)
+* `incr(name, n)` : 카운터 (캐시 적중, 삼킨 API 오류, 혼잡 FALLBACK 등)
+* `trace(name, **attrs)` : 요청 1 건 범위. contextvars 로 전달되므로
+  스레드 풀에 넘기는 함수는 `bind(fn)` 으로 감싸야 같은 트레이스에 기록됩니다.
+* 내보내기: `snapshot()` (pull) / `add_exporter(fn)` – 트레이스가 끝날 때마다
+  `fn(trace_dict)` 호출 (push – StatsD·OpenTelemetry 등 어댑터를 여기에 연결)
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar, copy_context
+from typing import Callable, Dict, List, Tuple
+
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_enabled = os.getenv("PLANNER_METRICS", "0") == "1"
+_lock = threading.Lock()
+_stats: Dict[str, "_Stat"] = {}
+_counters: Counter = Counter()
+_exporters: List[Callable[[Dict], None]] = []
+
+
+class _Noop:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _Noop()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+class Trace:
+    """요청 1 건의 구간·카운터 기록 (여러 스레드에서 기록 가능)"""
+
+    def __init__(self, name: str, attrs: Dict):
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self.duration_ms: float | None = None
+        self.spans: List[Tuple[str, float, float]] = []  # (이름, 시작 오프셋, 소요) ms
+        self.counters: Counter = Counter()
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _span(self, name: str, t0: float, ms: float):
+        with self._lock:
+            self.spans.append((name, round((t0 - self._t0) * 1000, 3), round(ms, 3)))
+
+    def _incr(self, name: str, n: int):
+        with self._lock:
+            self.counters[name] += n
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "attrs": dict(self.attrs),
+                "started": self.started,
+                "duration_ms": self.duration_ms,
+                "spans": [
+                    {"name": n, "start_ms": s, "duration_ms": d}
+                    for n, s, d in self.spans
+                ],
+                "counters": dict(self.counters),
+            }
+
+
+_current: ContextVar[Trace | None] = ContextVar("planner_trace", default=None)
+
+
+class _Stat:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count, self.total, self.max = 0, 0.0, 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms: float):
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        i = next((k for k, b in enumerate(BUCKETS_MS) if ms <= b), len(BUCKETS_MS))
+        self.buckets[i] += 1
+
+    def as_dict(self) -> Dict:
+        cum, acc = {}, 0
+        for b, c in zip((*BUCKETS_MS, "inf"), self.buckets):
+            acc += c
+            cum[str(b)] = acc
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max, 3),
+            "le_ms": cum,  # 누적 히스토그램 (Prometheus bucket 형식)
+        }
+
+
+def _record(name: str, t0: float, ms: float):
+    with _lock:
+        st = _stats.get(name)
+        if st is None:
+            st = _stats[name] = _Stat()
+        st.add(ms)
+    tr = _current.get()
+    if tr is not None:
+        tr._span(name, t0, ms)
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.t0, (time.perf_counter() - self.t0) * 1000)
+        return False
+
+
+class _TraceScope:
+    __slots__ = ("trace", "token")
+
+    def __init__(self, name: str, attrs: Dict):
+        self.trace = Trace(name, attrs)
+
+    def __enter__(self) -> Trace:
+        self.token = _current.set(self.trace)
+        return self.trace
+
+    def __exit__(self, *exc):
+        tr = self.trace
+        _current.reset(self.token)
+        tr.duration_ms = round((time.perf_counter() - tr._t0) * 1000, 3)
+        _record(f"trace.{tr.name}", tr._t0, tr.duration_ms)
+        if _exporters:
+            data = tr.as_dict()
+            for fn in list(_exporters):
+                try:
+                    fn(data)
+                except Exception as e:  # 내보내기 실패가 요청을 깨지 않도록
+                    print(f"[metrics] exporter {fn!r}: {e}", file=sys.stderr)
+        return False
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 공개 API
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = bool(on)
+
+
+def span(name: str):
+    """`with span("stage"):` – 꺼져 있으면 no-op"""
+    return _Span(name) if _enabled else _NOOP
+
+
+def timed(name: str):
+    """함수 전체를 span 으로 감싸는 데코레이터"""
+
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+def incr(name: str, n: int = 1):
+    if not _enabled or not n:
+        return
+    with _lock:
+        _counters[name] += n
+    tr = _current.get()
+    if tr is not None:
+        tr._incr(name, n)
+
+
+def trace(name: str, **attrs):
+    """`with trace("plan", origin=...) as tr:` – 꺼져 있으면 tr 은 None"""
+    return _TraceScope(name, attrs) if _enabled else _NOOP
+
+
+def current() -> Trace | None:
+    return _current.get()
+
+
+def bind(fn: Callable) -> Callable:
+    """스레드 풀에 넘길 함수를 현재 트레이스 문맥에 묶음 (꺼져 있으면 fn 그대로)"""
+    if not _enabled or _current.get() is None:
+        return fn
+    return functools.partial(copy_context().run, fn)
+
+
+def snapshot() -> Dict:
+    """프로세스 전역 집계 (구간별 통계 + 카운터)"""
+    with _lock:
+        return {
+            "enabled": _enabled,
+            "spans": {k: v.as_dict() for k, v in sorted(_stats.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _counters.clear()
+
+
+def add_exporter(fn: Callable[[Dict], None]):
+    """트레이스 종료 시 호출할 함수 등록 (fn(trace_dict))"""
+    _exporters.append(fn)
+
+
+def remove_exporter(fn: Callable[[Dict], None]):
+    if fn in _exporters:
+        _exporters.remove(fn)
@@ -0,0 +1,110 @@
+"""
+odsay.py
+===============================================================
+ODsay 경로 검색 – 엔드포인트 동시 호출(fan-out)
+----------------------------------------------------------------
+* `searchPubTransPath` / `searchPubTransPathT` 를 스레드 풀에서 동시에 호출하고
+  도착하는 순서대로 결과를 모읍니다.
+* 전체 마감 시간(`deadline`)이 있으며, 한 엔드포인트가 이미 경로를 돌려준 뒤에는
+  나머지를 `grace` 초까지만 기다립니다 → 느린 엔드포인트가 응답을 붙잡지 않음.
+* HTTP 호출은 `httpclient` 의 공용 커넥션 풀·재시도 계층을 거칩니다.
+  각 시도의 timeout·재시도 여부도 같은 `Deadline` 을 따르고, 첫 결과 뒤 grace 로
+  앞당긴 마감도 작업 스레드에 그대로 전달되므로 버려진 요청이 원래 마감까지
+  재시도하며 풀 스레드를 붙잡지 않습니다.
+* 베이스 URL 은 `ODSAY_BASE_URL` 환경변수(또는 인자)로 바꿀 수 있어
+  로컬 스텁 HTTP 서버로 테스트할 수 있습니다.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Tuple
+
+import requests
+
+import metrics
+from httpclient import Deadline, get_client
+
+ODSAY_BASE_URL = os.getenv("ODSAY_BASE_URL", "https://api.odsay.com/v1/api")
+ENDPOINTS: List[Tuple[str, Dict]] = [
+    ("searchPubTransPath", {"SearchType": 0}),
+    ("searchPubTransPathT", {"SearchType": 0}),
+]
+REQUEST_TIMEOUT = 8  # 엔드포인트 1개당 (초)
+DEADLINE = 8.0  # fan-out 전체 마감 (초)
+STRAGGLER_GRACE = 1.0  # 첫 결과 이후 나머지 엔드포인트 대기 (초)
+
+# 느린 요청이 끝날 때까지 호출자를 붙잡지 않도록 풀은 모듈 전역으로 재사용
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="odsay")
+
+
+def common_params(
+    origin: Tuple[float, float], dest: Tuple[float, float], api_key
+) -> Dict:
+    return {
+        "apiKey": api_key,  # ← 개인 ODsay API 키
+        "lang": 0,  # 0 = 한국어
+        "output": "json",
+        "SX": origin[1],  # 출발 X(경도)
+        "SY": origin[0],  # 출발 Y(위도)
+        "EX": dest[1],  # 도착 X
+        "EY": dest[0],  # 도착 Y
+        "OPT": 0,  # 0 = 종합 최적
+        "SearchPathType": 0,  # 0 = 대중교통+도보
+        "reqCoordType": "WGS84GEO",
+        "resCoordType": "WGS84GEO",
+    }
+
+
+def _fetch_one(url: str, params: Dict, timeout: float, end: Deadline) -> List[dict]:
+    with metrics.span(f"odsay.{url.rsplit('/', 1)[-1]}"):
+        data = get_client().get_json(url, params=params, timeout=timeout, deadline=end)
+    return data.get("result", {}).get("path", [])
+
+
+def fetch_paths(
+    origin: Tuple[float, float],
+    dest: Tuple[float, float],
+    *,
+    api_key=None,
+    base_url: str | None = None,
+    deadline: float = DEADLINE,
+    grace: float = STRAGGLER_GRACE,
+) -> List[dict]:
+    """
+    모든 엔드포인트를 동시에 호출해 ODsay `path` 목록을 합쳐 반환.
+    실패·마감 초과 엔드포인트는 건너뛰고, 결과는 엔드포인트 순서로 정렬한다.
+    """
+    base = (base_url or ODSAY_BASE_URL).rstrip("/")
+    common = common_params(origin, dest, api_key)
+    timeout = min(REQUEST_TIMEOUT, deadline)
+    end = Deadline(time.monotonic() + deadline)  # 작업 스레드와 공유
+    fetch = metrics.bind(_fetch_one)
+    futs: Dict[Future, int] = {
+        _pool.submit(fetch, f"{base}/{name}", {**common, **extra}, timeout, end): i
+        for i, (name, extra) in enumerate(ENDPOINTS)
+    }
+
+    results: Dict[int, List[dict]] = {}
+    pending = set(futs)
+    while pending:
+        remaining = end.left()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for f in done:
+            try:
+                paths = f.result()
+            except (requests.RequestException, ValueError):
+                metrics.incr("api_error.odsay")
+                continue  # 해당 엔드포인트 실패 → 나머지 결과만 사용
+            if paths:
+                results[futs[f]] = paths
+        if results:  # 이미 답을 받았으면 나머지는 grace 만큼만 (재시도 포함)
+            end.shorten(time.monotonic() + grace)
+    metrics.incr("odsay.abandoned", len(pending))
+    for f in pending:
+        f.cancel()
+    return [p for i in sorted(results) for p in results[i]]
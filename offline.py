@@ -0,0 +1,265 @@
+"""
+offline.py
+===============================================================
+로컬 멀티모달 라우팅 엔진 (ODsay 장애·쿼터 소진 시 오프라인 대체)
+----------------------------------------------------------------
+* 정류장·역/링크 데이터셋(JSON)을 읽어 CSR 배열 그래프로 압축합니다.
+    {
+      "stations": [{"name": "강남", "line": "2호선", "lat": 37.49, "lng": 127.02}, ...],
+      "links":    [{"from": 0, "to": 1, "min": 2.0, "mode": "SUBWAY"}, ...],
+      "transfer_min": 4
+    }
+  - 링크는 기본 양방향 (`"oneway": true` 로 단방향)
+  - 역명이 같고 호선이 다른 역끼리는 환승 링크(`transfer_min`)를 자동 추가
+* 탐색: 출발 좌표 → 도보 접근 → 그래프 → 도보 이탈 → 도착 좌표 의 A*.
+  휴리스틱은 haversine 거리 / 최고 속도 (항상 실제 비용 이하 → 최적 보장).
+* 지하철·버스 링크 비용 = 소요 분 × (1 + crowd_weight × (혼잡-1) / 10)
+  혼잡 레벨은 출발 시각 기준으로 지하철은 `SubwayCrowdIndex`, 버스는
+  `BusCrowdIndex` 에서 각각 한 번에 조회합니다 (버스 표가 없으면 중립).
+  데이터셋의 WALK 링크는 환승과 같이 도보 구간으로 출력됩니다.
+* 결과는 `segments.Route` 라서 ODsay 후보와 똑같이 채점·렌더링됩니다.
+"""
+
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from crowd import FALLBACK_LEVEL
+from geometry import haversine_to, path_length
+from segments import Route, RouteBuilder
+from spatial import StationIndex
+
+MODES = ("SUBWAY", "BUS", "WALK")
+SUBWAY, BUS, WALK, TRANSFER = 0, 1, 2, 3  # 링크 모드 코드 (3 = 환승 도보)
+WALK_SPEED = 1.3  # m/s (planner.AVG_WALK_SPEED 와 동일)
+ACCESS_RADIUS_M = 1000.0  # 출발/도착 좌표 ↔ 역 도보 연결 반경
+MAX_SPEED_MPM = 100_000 / 60  # 휴리스틱용 최고 속도 (100 km/h, m/분)
+CROWD_COST_SCALE = 0.1  # 혼잡 1레벨당 소요 시간 가중 (× crowd_weight)
+
+Coord = Tuple[float, float]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class TransitGraph:
+    names: List[str]
+    lines: List[str]
+    lat: np.ndarray  # float64 (n,)
+    lng: np.ndarray  # float64 (n,)
+    indptr: np.ndarray  # int32 (n+1,)  CSR
+    indices: np.ndarray  # int32 (e,)
+    minutes: np.ndarray  # float32 (e,)
+    mode: np.ndarray  # int8 (e,)  0 SUBWAY / 1 BUS / 2 WALK / 3 환승
+    spatial: StationIndex = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "spatial", StationIndex(self.lat, self.lng))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TransitGraph":
+        st = data["stations"]
+        n = len(st)
+        names = [s["name"] for s in st]
+        lines = [str(s.get("line", "")) for s in st]
+        src, dst, mins, modes = [], [], [], []
+
+        def add(a, b, m, md, oneway):
+            src.append(a), dst.append(b), mins.append(m), modes.append(md)
+            if not oneway:
+                src.append(b), dst.append(a), mins.append(m), modes.append(md)
+
+        for ln in data.get("links", []):
+            md = MODES.index(ln.get("mode", "SUBWAY"))
+            add(ln["from"], ln["to"], float(ln["min"]), md, ln.get("oneway", False))
+        # 같은 역명 · 다른 호선 → 환승 링크
+        tmin = float(data.get("transfer_min", 4))
+        by_name: Dict[str, List[int]] = {}
+        for i, nm in enumerate(names):
+            by_name.setdefault(nm, []).append(i)
+        for ids in by_name.values():
+            for a in ids:
+                for b in ids:
+                    if a < b and lines[a] != lines[b]:
+                        add(a, b, tmin, TRANSFER, False)
+
+        src_a = np.asarray(src, dtype=np.int32)
+        order = np.argsort(src_a, kind="stable")
+        indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(src_a, minlength=n), out=indptr[1:])
+        return cls(
+            names=names,
+            lines=lines,
+            lat=np.array([s["lat"] for s in st], dtype=np.float64),
+            lng=np.array([s["lng"] for s in st], dtype=np.float64),
+            indptr=indptr,
+            indices=np.asarray(dst, dtype=np.int32)[order],
+            minutes=np.asarray(mins, dtype=np.float32)[order],
+            mode=np.asarray(modes, dtype=np.int8)[order],
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "TransitGraph":
+        import orjson
+
+        return cls.from_dict(orjson.loads(Path(path).read_bytes()))
+
+    def near(self, c: Coord, radius_m: float = ACCESS_RADIUS_M):
+        """좌표 반경 내 역 → (역 인덱스 배열, 거리 m 배열)"""
+        return self.spatial.within(c[0], c[1], radius_m)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+def _edge_costs(
+    g: TransitGraph,
+    station_levels: np.ndarray | None,
+    bus_levels: np.ndarray | None,
+    crowd_weight,
+):
+    """링크별 비용 배열 – 지하철·버스 링크를 각자의 출발역 혼잡도로 가중"""
+    cost = g.minutes.astype(np.float64)
+    if crowd_weight <= 0:
+        return cost
+    src = np.repeat(np.arange(len(g), dtype=np.int32), np.diff(g.indptr))
+    for code, levels in ((SUBWAY, station_levels), (BUS, bus_levels)):
+        if levels is None:
+            continue
+        m = g.mode == code
+        extra = np.maximum(levels[src[m]] - 1, 0) * crowd_weight * CROWD_COST_SCALE
+        cost[m] *= 1 + extra
+    return cost
+
+
+def plan(
+    g: TransitGraph,
+    origin: Coord,
+    dest: Coord,
+    *,
+    station_levels: np.ndarray | None = None,
+    bus_levels: np.ndarray | None = None,
+    crowd_weight: float = 2.0,
+    radius_m: float = ACCESS_RADIUS_M,
+) -> Route | None:
+    """
+    A* 최단(가중) 경로 → Route. 어떤 역에도 닿지 않으면 None.
+    station_levels: 지하철 역별 혼잡 레벨 (len(g),) – SUBWAY 링크에만 적용
+    bus_levels:     버스 정류장별 혼잡 레벨 (len(g),) – BUS 링크에만 적용
+    없으면 해당 모드는 혼잡 가중 없이 FALLBACK_LEVEL 로 표시
+    """
+    n = len(g)
+    if n == 0:
+        return None
+    O, D = n, n + 1  # 가상 노드
+    walk_mpm = WALK_SPEED * 60
+    cost = _edge_costs(g, station_levels, bus_levels, crowd_weight)
+    h = haversine_to(dest[0], dest[1], g.lat, g.lng) / MAX_SPEED_MPM
+    acc_idx, acc_d = g.near(origin, radius_m)
+    egr_idx, egr_d = g.near(dest, radius_m)
+    if len(acc_idx) == 0 or len(egr_idx) == 0:
+        return None
+    egress = dict(zip(egr_idx.tolist(), (egr_d / walk_mpm).tolist()))
+    direct = path_length([origin, dest])
+
+    dist = np.full(n + 2, np.inf)
+    prev = np.full(n + 2, -1, dtype=np.int64)
+    prev_edge = np.full(n + 2, -1, dtype=np.int64)  # -1 = 도보 연결
+    dist[O] = 0.0
+    dist[D] = direct / walk_mpm
+    prev[D] = O
+    heap: List[Tuple[float, int]] = [(0.0, O), (dist[D], D)]
+    while heap:
+        f, u = heapq.heappop(heap)
+        if u == D:
+            break
+        du = dist[u]
+        if u != O and f > du + h[u] + 1e-9:
+            continue  # 이미 더 짧은 경로로 처리됨
+        if u == O:
+            nbrs = zip(
+                acc_idx.tolist(), (acc_d / walk_mpm).tolist(), [-1] * len(acc_idx)
+            )
+        else:
+            a, b = g.indptr[u], g.indptr[u + 1]
+            nbrs = zip(g.indices[a:b].tolist(), cost[a:b].tolist(), range(a, b))
+            if u in egress:
+                nbrs = [*nbrs, (D, egress[u], -1)]
+        for v, w, e in nbrs:
+            nd = du + w
+            if nd < dist[v]:
+                dist[v], prev[v], prev_edge[v] = nd, u, e
+                heapq.heappush(heap, (nd + (0.0 if v == D else h[v]), v))
+
+    # 경로 복원 (D → O)
+    chain = []
+    v = D
+    while v != O:
+        chain.append((int(prev[v]), v, int(prev_edge[v])))
+        v = int(prev[v])
+    chain.reverse()
+    return _to_route(g, origin, dest, chain, station_levels, bus_levels)
+
+
+def _to_route(g, origin, dest, chain, station_levels, bus_levels) -> Route:
+    """노드 체인 → 모드·호선별로 묶은 세그먼트"""
+    n = len(g)
+    rb = RouteBuilder()
+
+    def pt(v):
+        return origin if v == n else dest if v == n + 1 else (g.lat[v], g.lng[v])
+
+    i = 0
+    while i < len(chain):
+        u, v, e = chain[i]
+        if e < 0 or g.mode[e] in (WALK, TRANSFER):  # 도보 연결·도보 링크·환승
+            d = path_length([pt(u), pt(v)])
+            mins = d / (WALK_SPEED * 60) if e < 0 else float(g.minutes[e])
+            rb.add("WALK", "도보", round(d), round(mins, 2), 1, None, [pt(u), pt(v)])
+            i += 1
+            continue
+        mode, line = int(g.mode[e]), g.lines[u]
+        nodes, mins = [u], 0.0
+        while i < len(chain):
+            u2, v2, e2 = chain[i]
+            if e2 < 0 or int(g.mode[e2]) != mode or g.lines[v2] != line:
+                break
+            nodes.append(v2)
+            mins += float(g.minutes[e2])
+            i += 1
+        lat, lng = g.lat[nodes], g.lng[nodes]
+        dist = path_length(np.column_stack((lat, lng)))
+        levels = station_levels if mode == SUBWAY else bus_levels
+        crowd = (
+            int(np.max(levels[nodes[:-1]])) if levels is not None else FALLBACK_LEVEL
+        )
+        rb.add(
+            MODES[mode],
+            line,
+            round(dist),
+            round(mins, 2),
+            crowd,
+            None,
+            zip(lat.tolist(), lng.tolist()),
+            (g.names[k] for k in nodes),
+        )
+    return rb.build()
+
+
+def station_crowd_levels(g: TransitGraph, index, now: datetime) -> np.ndarray:
+    """그래프의 모든 역 혼잡 레벨을 지하철 인덱스에서 한 번에 조회"""
+    return index.levels_batch(g.names, now).astype(np.int8)
+
+
+def bus_stop_levels(g: TransitGraph, index, now: datetime) -> np.ndarray:
+    """그래프의 모든 정류장 혼잡 레벨을 버스 인덱스에서 조회 (노선 = line, 정류장 = name)"""
+    n = len(g)
+    return index.levels_batch(
+        [(ln,) for ln in g.lines], [(nm,) for nm in g.names], [now.hour] * n
+    ).astype(np.int8)
@@ -6,59 +6,90 @@ multimodal_route_planner.py (rev‑2025‑05‑01)
 ----------------------------------------------------------------
 * **학습 모드**(`--learn`) : 이용한 경로를 기록하고
   평균 혼잡 레벨·사용 패턴을 분석해 개인화 가중치를 조정합니다.
+  가중치 갱신은 `--choose N` 으로 직접 고른 경우에만 합니다
+  (플래너 자신의 추천을 학습하면 현재 가중치만 강화되므로).
 
 * **지하철 최적 칸 추천** : 각 지하철 구간마다 ‘가장 여유로운 칸’을
-  히스토리 기반 또는 휴리스틱으로 추정해 표시합니다.
+  칸별 혼잡 표·히스토리 관측(`--learn --car 3,7 --felt 2,4` : 지하철 구간
+  순서대로 탄 칸·체감 혼잡) 또는 기본 분포로 추정해 표시합니다.
+
+* **일괄 모드**(`batch 입력.csv 출력.jsonl`) : OD 쌍 파일을 지도 없이
+  동시 처리해 JSONL/Parquet 로 기록합니다 (batch.py, `--resume` 지원).
+
+* **계측** : `--metrics` 또는 `PLANNER_METRICS=1` 이면 단계별 시간·캐시 적중·
+  삼킨 API 오류·혼잡 FALLBACK 횟수를 기록합니다 (metrics.py, 기본은 꺼짐).
+
+* **서비스 모드**(`serve [--port 8765]`) : 혼잡 표·캐시·커넥션 풀을 상주시킨
+  채 `POST /plan` JSON API 로 후보 경로와 점수를 돌려줍니다 (server.py).
 
 **주의**: `origin`, `dest`에 역명·주소 또는 `위도,경도` 입력 가능.
 """
 from __future__ import annotations
 
 import argparse
-import csv
 import math
-import random
 import sys
 import webbrowser
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
-import orjson
-import folium
-import pandas as pd
-import polyline
-import requests
-from tqdm import tqdm
+import numpy as np
 from typing import Dict, List, Tuple
 
+import metrics
+from bestcar import EXIT, BestCarModel, door_car, load_car_model
+from buscrowd import BusCrowdIndex, boards_to_levels, load_bus_index
+from crowd import DAY_TYPE, FALLBACK_LEVEL, SubwayCrowdIndex, load_subway_index
+from geocache import MISS, GeocodeCache
+from geometry import bbox, simplify
+from history import TripHistory
+from learner import update_prefs
+from maprender import LineColors, MapStyle, crowd_gradient_color, render_html
+from offline import TransitGraph, bus_stop_levels, station_crowd_levels
+from offline import plan as plan_offline
+from prefs import DEFAULT_PREFS, Prefs, PrefsStore
+from routecache import RouteCache
+from scoring import RouteMatrix, prefs_vector, score_matrix
+from segments import Route, RouteBuilder
+from timeline import apply_subway_crowd
+from timeline import departure_sweep as sweep_departures
+
 # 끝끝
 # ─────────────────────────────────────────────────────────────────────────────
 # 설정 및 파일
+# 무거운 의존성(folium · requests · polyline · orjson)은 쓰는 함수 안에서만 import
+# → `import planner` 는 좌표 입력·채점만 하는 경로에서 가볍게 유지.
+# CONF_DIR 는 처음 쓸 때 만든다.
 CONF_DIR = Path.home() / ".route_planner"
-CONF_DIR.mkdir(exist_ok=True)
 PREF_FILE = CONF_DIR / "prefs.json"
-HIST_FILE = CONF_DIR / "history.csv"
-DEFAULT_PREFS = {
-    "crowd_weight": 2.0,
-    "max_crowd": 4,
-    "mode_penalty": {"SUBWAY": 0.0, "BUS": 0.0, "WALK": 0.0},
-    "runs": 0,
-}
+HIST_FILE = CONF_DIR / "history.sqlite"  # 이동 기록 (history.py)
+SUBWAY_CACHE = CONF_DIR / "subway_crowd.npz"  # 혼잡도 인덱스 빌드 캐시
+BUS_CACHE = CONF_DIR / "bus_crowd.npz"
+GEOCODE_DB = CONF_DIR / "geocode.sqlite"  # 지오코딩 디스크 캐시
+MAP_FILE = CONF_DIR / "route.html"  # CLI 지도 출력 (작업 폴더를 어지럽히지 않음)
 # API 키
 import os
 
 ODSAY_KEY = os.getenv("ODSAY_KEY")
 KAKAO_REST_KEY = os.getenv("KAKAO_REST_KEY")
+HIST_USER = os.getenv("PLANNER_USER", "default")  # 기록·집계 사용자 구분
+# 로컬 스텁 서버로 바꿔 테스트·벤치마크 (odsay.ODSAY_BASE_URL 과 같은 방식)
+KAKAO_BASE_URL = os.getenv("KAKAO_BASE_URL", "https://dapi.kakao.com/v2/local")
 # ODSAY_KEY = open("odsay_api.txt").read().strip()
 # print(ODSAY_KEY)
 # KAKAO_REST_KEY = open("kakao_api.txt").read().strip()
 # 혼잡도 CSV
 SUBWAY_CSV = Path("seoul_subway_crowd.csv")
 BUS_CSV = Path("seoul_bus_crowd.csv")
+# 최적 칸 추천: 칸별 혼잡도 CSV / 빠른 환승·출구 칸 CSV (bestcar.py 형식, 없으면 기본 분포)
+SUBWAY_CAR_CSV = Path("seoul_subway_car_crowd.csv")
+TRANSFER_CAR_CSV = Path("seoul_transfer_cars.csv")
+# 오프라인 라우팅용 역/링크 데이터셋 (offline.py 형식)
+TRANSIT_GRAPH = Path(os.getenv("TRANSIT_GRAPH", "seoul_transit_graph.json"))
 
 # 상수
 AVG_WALK_SPEED = 1.3  # m/s
-DAY_TYPE = {0: 1, 1: 1, 2: 1, 3: 1, 4: 1, 5: 2, 6: 3}
+ROUTE_CACHE_TTL = float(os.getenv("ROUTE_CACHE_TTL", 600))  # ODsay 응답 캐시 (초)
 COLOR = {"SUBWAY": "red", "BUS": "green", "WALK": "gray"}
 HEADERS = {"Authorization": f"KakaoAK {KAKAO_REST_KEY}"}
 MODE_COLOR = {"SUBWAY": "red", "BUS": "green", "WALK": "gray"}
@@ -87,55 +118,110 @@ SUBWAY_LINE_COLORS = {
 CROWD_COLOR = {1: "green", 2: "yellow", 3: "orange", 4: "red"}
 OUTER_LINE_WEIGHT = 15  # 외곽선 굵기 (모드/호선별 라인)
 CENTER_LINE_WEIGHT = 2  # 중심선 굵기 (혼잡도 기반 그라디언트)
+SIMPLIFY_TOL_M = 5.0  # 지도 폴리라인 단순화 허용 오차 (m)
+SWEEP_STEP_MIN, SWEEP_SPAN_MIN = 5, 120  # 출발 시각 스윕 간격·범위 (분)
+SWEEP_HINT_GAIN = 5.0  # 늦게 출발 안내를 띄울 최소 점수 개선폭
+# 호선명 → 색상 결과는 LineColors 가 한 번만 계산해 보관
+MAP_STYLE = MapStyle(
+    line_colors=LineColors(SUBWAY_LINE_COLORS, BUS_COLOR, WALK_COLOR),
+    crowd_colors=CROWD_COLOR,
+    outer_weight=OUTER_LINE_WEIGHT,
+    center_weight=CENTER_LINE_WEIGHT,
+    simplify_tol_m=SIMPLIFY_TOL_M,
+)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-def load_prefs():
-    # if PREF_FILE.exists():
-    #    return orjson.loads(PREF_FILE.read_bytes())
-    if PREF_FILE.exists():
-        try:
-            return orjson.loads(PREF_FILE.read_bytes())
-        except:
-            DEFAULT_PREFS = {
-                "crowd_weight": 2.0,
-                "max_crowd": 4,
-                "mode_penalty": {"SUBWAY": 10.0, "BUS": 0.0, "WALK": 2.0},
-                "mode_preference": {"SUBWAY": 0.0, "BUS": 10.0, "WALK": 1.0},
-                "walk_limit_min": 15,
-                "runs": 0,
-            }
-        return DEFAULT_PREFS.copy()
+_prefs_store = PrefsStore(PREF_FILE)
+
+
+def current_prefs() -> Prefs:
+    """점수 계산용 불변 스냅샷 (디스크는 mtime 이 바뀔 때만 다시 읽음)"""
+    return _prefs_store.get()
+
+
+def load_prefs() -> Dict:
+    """UI 편집용 dict 복사본"""
+    return current_prefs().to_dict()
 
 
 def save_prefs(prefs: Dict):
-    PREF_FILE.write_bytes(orjson.dumps(prefs, option=orjson.OPT_INDENT_2))
+    _prefs_store.save(prefs)
 
 
-def append_history(row: Dict):
-    write_header = not HIST_FILE.exists()
-    with HIST_FILE.open("a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=row.keys())
-        if write_header:
-            w.writeheader()
-        w.writerow(row)
+_history = TripHistory(HIST_FILE)
+
+
+def trip_history() -> TripHistory:
+    """집계 API (mode_share, crowd_by_slot, top_od …) 용 저장소"""
+    return _history
+
+
+def record_trip(segs, *, origin: str, dest: str, o, d, observed=None) -> int:
+    """
+    선택한 경로를 구간 단위로 기록 (append-only) → trip id
+    observed: {구간 번호: (탄 칸, 체감 혼잡 1~4)} – 있으면 추천 칸 모델을 다시 시드
+    """
+    global _car_model
+    tid = _history.record(
+        segs, origin=origin, dest=dest, o=o, d=d, user=HIST_USER, observed=observed
+    )
+    if observed:
+        _car_model = None  # 다음 조회 때 새 관측으로 재구성
+    return tid
+
+
+def learn_choice(routes, chosen: int, *, prefs: Dict | None = None) -> Dict:
+    """
+    후보 routes 중 chosen(0-based)을 이용 → 선호도 한 스텝 갱신 후 저장 (learner.py)
+    """
+    new = update_prefs(current_prefs() if prefs is None else prefs, routes, chosen)
+    save_prefs(new)
+    return new
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-def geocode(addr: str):
+_geo_cache = GeocodeCache(GEOCODE_DB)
+
+
+@metrics.timed("geocode.remote")
+def _geocode_remote(addr: str):
+    from httpclient import get_client
+
     for ep in ("address", "keyword"):
-        url = f"https://dapi.kakao.com/v2/local/search/{ep}.json"
-        r = requests.get(
-            url, headers=HEADERS, params={"query": addr}, timeout=5, verify=False
+        url = f"{KAKAO_BASE_URL.rstrip('/')}/search/{ep}.json"
+        docs = (
+            get_client()
+            .get_json(url, headers=HEADERS, params={"query": addr}, timeout=5)
+            .get("documents", [])
         )
-        r.raise_for_status()
-        docs = r.json().get("documents", [])
         if docs:
             return float(docs[0]["y"]), float(docs[0]["x"])
-    raise ValueError(f"주소/역 '{addr}' 검색 실패")
+    return None
+
+
+@metrics.timed("geocode")
+def geocode(addr: str):
+    """
+    역명·주소 → (위도, 경도). 메모리/디스크 캐시 적중 시 네트워크 호출 없음.
+    검색 실패도 음성 캐시로 기록 (네트워크 오류는 캐시하지 않음).
+    """
+    coord = _geo_cache.get(addr)
+    metrics.incr("geocode.cache_miss" if coord is MISS else "geocode.cache_hit")
+    if coord is MISS:
+        coord = _geocode_remote(addr)
+        _geo_cache.put(addr, coord)
+    if coord is None:
+        raise ValueError(f"주소/역 '{addr}' 검색 실패")
+    return coord
+
+
+def geocode_cache_stats() -> Dict[str, int]:
+    return _geo_cache.stats()
 
 
 # ─────────────────────────────────────────────────────────────────────────────
+@metrics.timed("parse_location")
 def parse_location(s: str):
     try:
         lat, lng = map(float, s.split(","))
@@ -149,96 +235,56 @@ def odsay_best_route(origin: Tuple[float, float], dest: Tuple[float, float]):
     """
     ODsay API로 다중 경로를 받아와 개인화 점수 계산 후 최적 경로 1개 선택
     """
-    common = {
-        "apiKey": ODSAY_KEY,
-        "lang": 0,
-        "output": "json",
-        "SX": origin[1],
-        "SY": origin[0],
-        "EX": dest[1],
-        "EY": dest[0],
-        "OPT": 0,
-        "SearchPathType": 0,
-        "reqCoordType": "WGS84GEO",
-        "resCoordType": "WGS84GEO",
-    }
-
-    for endpoint, extra in [
-        ("https://api.odsay.com/v1/api/searchPubTransPath", {"SearchType": 0}),
-        ("https://api.odsay.com/v1/api/searchPubTransPathT", {"SearchType": 0}),
-    ]:
-        try:
-            r = requests.get(
-                endpoint, params={**common, **extra}, timeout=8, verify=False
-            )
-            r.raise_for_status()
-            result = r.json().get("result", {})
-            paths = result.get("path", [])
-            if not paths:
-                continue
-
-            all_segs = []
-            for path in paths:
-                segs = paths_to_segs(path.get("subPath", []))
-                score = score_route(segs)
-                all_segs.append((score, segs))
-
-            if all_segs:
-                best = min(all_segs, key=lambda x: x[0])
-                return best[1]  # 최적 경로 반환
-
-        except requests.RequestException:
-            continue
-
-    return []  # 실패 시 빈 경로
+    return choose_best_route(odsay_all_routes(origin, dest))[1]  # 실패 시 빈 경로
 
 
 def score_route(segs: List[dict], *, prefs: Dict | None = None) -> float:
-    if prefs is None:
-        prefs = load_prefs()
-    score = 0.0
-    total_walk_min = 0
-    for s in segs:
-        mode = s["mode"]
-        duration = s["duration_min"]
-        crowd = s["crowd"]
-
-        # 걷기 제한 시간 초과 페널티
-        if mode == "WALK":
-            total_walk_min += duration
+    """단일 후보 점수 (scoring.score_matrix 참고)"""
+    return float(score_routes([segs], prefs=prefs)[0])
 
-        # 기본 이동 시간 + 모드별 페널티 + 혼잡도 가중치
-        score += duration
-        score += prefs["mode_penalty"].get(mode, 0.0)
-        score += prefs["crowd_weight"] * max(0, crowd - 1)
 
-    # 걷기 시간 초과 시 큰 페널티
-    if total_walk_min > prefs.get("walk_limit_min", 15):
-        score += 999
-
-    return score
+def score_routes(routes: List[List[dict]], *, prefs: Dict | None = None):
+    """후보 N 개를 한 번에 채점 → (N,) 점수 배열"""
+    if prefs is None:
+        prefs = current_prefs()
+    return score_matrix(RouteMatrix.from_routes(routes), prefs_vector(prefs))
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 혼잡 로딩
-_sub_df: pd.DataFrame | None = None
-_bus_df: pd.DataFrame | None = None
+_sub_idx: SubwayCrowdIndex | None = None
+_bus_idx: BusCrowdIndex | None = None
+_car_model: BestCarModel | None = None
 
 
-def _load_sub_df():
-    global _sub_df
-    if _sub_df is None:
+def _load_sub_index() -> SubwayCrowdIndex:
+    global _sub_idx
+    if _sub_idx is None:
         if not SUBWAY_CSV.exists():
             raise FileNotFoundError
-        _sub_df = pd.read_csv(SUBWAY_CSV)
-    return _sub_df
+        _sub_idx = load_subway_index(SUBWAY_CSV, SUBWAY_CACHE)
+    return _sub_idx
+
+
+def _load_car_model() -> BestCarModel:
+    """
+    최초 1회만 적재 (파일이 없어도 빈 모델을 기억해 재확인하지 않음).
+    칸별 CSV 가 없는 칸은 이동 기록의 칸 관측으로 채움 (bestcar.seed_from_history)
+    """
+    global _car_model
+    if _car_model is None:
+        _car_model = load_car_model(
+            SUBWAY_CAR_CSV, TRANSFER_CAR_CSV, _history.car_observations()
+        )
+    return _car_model
 
 
-def _load_bus_df():
-    global _bus_df
-    if _bus_df is None and BUS_CSV.exists():
-        _bus_df = pd.read_csv(BUS_CSV)
-    return _bus_df
+def _load_bus_index() -> BusCrowdIndex:
+    """최초 1회만 적재 (파일이 없으면 빈 인덱스를 기억해 디스크를 다시 보지 않음)"""
+    global _bus_idx
+    if _bus_idx is None:
+        _bus_idx = load_bus_index(BUS_CSV, BUS_CACHE)
+    return _bus_idx
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -252,105 +298,241 @@ def pct_to_level(pct: float):
     return 4
 
 
-def subway_crowd_level(station: str, now: datetime):
+def subway_crowd_levels(stations: List[str], now: datetime) -> np.ndarray:
+    """
+    여러 역의 혼잡 레벨을 인덱스에서 한 번에 조회 (데이터 없으면 2)
+    """
     try:
-        df = _load_sub_df()
-        day = DAY_TYPE[now.weekday()]
-        hhmm = (
-            now.replace(minute=0) if now.minute < 30 else now.replace(minute=30)
-        ).strftime("%H%M")
-        pct = df.loc[
-            (df.DAY_CODE == day) & (df.STATION_NM == station) & (df.HHMM == hhmm),
-            "CONGEST_PCT",
-        ].mean()
-        lvl = pct_to_level(pct) if not pd.isna(pct) else 2
-    except:
-        lvl = 2
-    if lvl >= 3:
-        best = random.choice([1, 10])
-    elif lvl == 2:
-        best = random.choice([2, 9])
-    else:
-        best = random.randint(1, 10)
-    return lvl, best
-
-
-def bus_crowd_level(route_id: str, now: datetime):
-    df = _load_bus_df()
-    if df is None:
-        return 2
+        idx = _load_sub_index()
+    except FileNotFoundError:
+        return np.full(len(stations), 2, dtype=np.int8)
+    return idx.levels_batch(stations, now)
+
+
+def departure_sweep(
+    routes,
+    start: datetime | None = None,
+    *,
+    step_min: float = SWEEP_STEP_MIN,
+    span_min: float = SWEEP_SPAN_MIN,
+    prefs: Dict | None = None,
+):
+    """
+    받아 둔 후보들을 출발 시각 여러 개에 대해 한 번에 재채점 (네트워크 없음)
+    → timeline.Sweep (departs, scores (T, N), best, best_score)
+    """
     try:
-        b = df.loc[
-            (df.ROUTE_ID == int(route_id)) & (df.HH == now.hour), "BOARD_NUM"
-        ].mean()
-        if pd.isna(b):
-            return 2
-        if b < 10:
-            return 1
-        if b < 25:
-            return 2
-        if b < 40:
-            return 3
-        return 4
-    except:
-        return 2
+        idx = _load_sub_index()
+    except FileNotFoundError:
+        idx = None
+    return sweep_departures(
+        routes,
+        idx,
+        prefs_vector(current_prefs() if prefs is None else prefs),
+        start or datetime.now(),
+        bus_index=_load_bus_index(),
+        step_min=step_min,
+        span_min=span_min,
+    )
+
+
+def departure_hint(
+    routes, *, prefs: Dict | None = None, start: datetime | None = None
+) -> str | None:
+    """지금(start)보다 늦게 출발하는 편이 확실히 나으면 안내 문구"""
+    if not any(routes):
+        return None
+    sw = departure_sweep(routes, start, prefs=prefs)
+    k = sw.best_departure()
+    gain = float(sw.best_score[0] - sw.best_score[k])
+    if k == 0 or gain < SWEEP_HINT_GAIN:
+        return None
+    late = round((sw.departs[k] - sw.departs[0]).total_seconds() / 60)
+    return f"{late}분 늦게 출발하면 더 한산합니다 (점수 {gain:.1f} 개선)"
+
+
+def best_cars(
+    boards: List[str],
+    directions: List[int],
+    now: datetime,
+    exit_cars: List[int] | None = None,
+) -> np.ndarray:
+    """승차역·방향(·환승 칸) 배열 → 추천 칸 배열 (bestcar.BestCarModel)"""
+    return _load_car_model().recommend_batch(boards, directions, now, exit_cars)
+
+
+def subway_crowd_level(station: str, now: datetime, direction: int = -1):
+    lvl = int(subway_crowd_levels([station], now)[0])
+    return lvl, int(best_cars([station], [direction], now)[0])
+
+
+def bus_crowd_level(route_id: str, now: datetime, stop: str = ""):
+    """단건 조회 – 승차 정류장을 모르면 노선 평균 (데이터 없으면 2)"""
+    return int(_load_bus_index().levels_batch([(route_id,)], [(stop,)], [now.hour])[0])
+
+
+def _bus_query(sp: dict, t: datetime):
+    """BUS subPath → (노선 후보 키들, 승차 정류장 후보 키들, 승차 시)"""
+    lane = sp.get("lane", [{}])[0]
+    routes = tuple(
+        str(lane[k]) for k in ("busLocalBlID", "busID", "busNo") if lane.get(k)
+    )
+    stops = tuple(
+        str(sp[k])
+        for k in ("startLocalStationID", "startArsID", "startName")
+        if sp.get(k)
+    )
+    return routes, stops, t.hour
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-def paths_to_segs(paths: List[dict], *, prefs: Dict | None = None):
-    segs = []
-    now = datetime.now()
-    if prefs is None:
-        prefs = load_prefs()
-    allowed = {"SUBWAY", "BUS", "WALK"}
-    for sp in paths:
-        tp = sp.get("trafficType")
-        if tp == 1:
-            mode = "SUBWAY"
-            lane0 = sp.get("lane", [{}])[0]
-            # 가능한 키 순서대로 꺼내되, 없으면 빈 문자열 처리
-            name = (
-                lane0.get("laneName")
-                or lane0.get("name")
-                or lane0.get("subwayName")
-                or ""
+def _subway_lane_name(sp: dict) -> str:
+    lane0 = sp.get("lane", [{}])[0]
+    # 가능한 키 순서대로 꺼내되, 없으면 빈 문자열 처리
+    return lane0.get("laneName") or lane0.get("name") or lane0.get("subwayName") or ""
+
+
+WAY_CODE = {1: 0, 2: 1}  # ODsay wayCode 1 상행 / 2 하행 → 상선(0) / 하선(1)
+
+
+def _car_query(paths: List[dict], k: int, model: BestCarModel):
+    """
+    paths[k] (지하철) → (승차역, 방향, 하차역에서 다음 구간으로 빠른 칸).
+    빠른 칸은 환승 칸 표 → 없으면 ODsay 의 `door` (빠른 환승/하차 문 위치)
+    """
+    sp = paths[k]
+    stations = sp.get("passStopList", {}).get("stations", [])
+    board = sp.get("startName") or (stations[0].get("stationName", "") if stations else "")
+    alight = sp.get("endName") or (stations[-1].get("stationName", "") if stations else "")
+    nxt = next((p for p in paths[k + 1 :] if p.get("trafficType") in (1, 2)), None)
+    to = _subway_lane_name(nxt) if nxt and nxt.get("trafficType") == 1 else EXIT
+    exit_car = model.exit_car(alight, to) or door_car(sp.get("door"))
+    return board, WAY_CODE.get(sp.get("wayCode"), -1), exit_car
+
+
+def _sub_minutes(sp: dict) -> float:
+    """subPath 소요 분 (도보는 거리 / 평균 보행 속도)"""
+    if sp.get("trafficType") in (1, 2):
+        return float(sp.get("sectionTime", 0) or 0)
+    return (sp.get("distance", 0) or 0) / AVG_WALK_SPEED / 60
+
+
+def _start_times(paths: List[dict], depart: datetime) -> List[datetime]:
+    """출발 시각 기준 각 subPath 에 도착(승차)하는 예상 시각"""
+    mins = np.cumsum([0.0] + [_sub_minutes(sp) for sp in paths[:-1]])
+    return [depart + timedelta(minutes=float(m)) for m in mins]
+
+
+def paths_to_segs(paths: List[dict]) -> Route:
+    return routes_to_segs([paths])[0]
+
+
+def routes_to_segs(
+    routes: List[List[dict]], depart: datetime | None = None
+) -> List[Route]:
+    """
+    여러 후보의 subPath 리스트를 한꺼번에 원본 세그먼트로 변환 (선호도 무관).
+    = parse_routes (구조·좌표) + annotate_crowd (혼잡·추천 칸), 혼잡 기준 시각은
+    depart (기본: 지금).
+    """
+    out = parse_routes(routes)
+    annotate_crowd(out, routes, depart or datetime.now())
+    return out
+
+
+@metrics.timed("segments.parse")
+def parse_routes(routes: List[List[dict]]) -> List[Route]:
+    """
+    subPath 리스트 → Route (구간 1 개 = subPath 1 개).
+    결과 Route 는 Segment 시퀀스이며 좌표는 경로당 연속 버퍼 하나에 담긴다.
+    duration_min 은 순수 소요 시간이며 페널티는 scoring 단계에서만 더한다.
+    혼잡은 지하철·버스 FALLBACK_LEVEL, 도보 1 로 비워 둔다.
+    """
+    out = []
+    for paths in routes:
+        rb = RouteBuilder()
+        for sp in paths:
+            tp = sp.get("trafficType")
+            if tp == 1:
+                mode, name = "SUBWAY", _subway_lane_name(sp)
+                dur, dist = sp.get("sectionTime", 0), sp.get("distance", 0)
+                crowd = FALLBACK_LEVEL
+            elif tp == 2:
+                mode, name = "BUS", sp["lane"][0]["busNo"]
+                dur, dist = sp["sectionTime"], sp["distance"]
+                crowd = FALLBACK_LEVEL
+            else:
+                mode, name = "WALK", "도보"
+                dist = sp.get("distance", 0)
+                dur = _sub_minutes(sp)
+                crowd = 1
+            stations = sp.get("passStopList", {}).get("stations", [])
+            names = [x.get("stationName", "") for x in stations]
+            if not names and sp.get("startName"):
+                names = [sp["startName"]]
+            rb.add(
+                mode,
+                name,
+                dist,
+                round(dur, 2),
+                crowd,
+                None,
+                ((float(x["y"]), float(x["x"])) for x in stations),
+                names,
             )
-            dur, dist = sp.get("sectionTime", 0), sp.get("distance", 0)
-            crowd, best = subway_crowd_level(name, now)
-        elif tp == 2:
-            mode, name = "BUS", sp["lane"][0]["busNo"]
-            dur, dist = sp["sectionTime"], sp["distance"]
-            crowd = bus_crowd_level(sp["lane"][0].get("busID", ""), now)
-            best = None
-        else:
-            mode, name = "WALK", "도보"
-            dist = sp.get("distance", 0)
-            dur = dist / AVG_WALK_SPEED / 60
-            crowd, best = 1, None
-        # penalty
-        if mode not in allowed:
-            dur += 1e3
-        dur += prefs.get("mode_penalty", {}).get(mode, 0)
-        if crowd > prefs.get("max_crowd", 4):
-            dur += 1e3
-        else:
-            dur += (crowd - 1) * prefs.get("crowd_weight", 2.0)
-        coords = [
-            (float(x["y"]), float(x["x"]))
-            for x in sp.get("passStopList", {}).get("stations", [])
-        ]
-        segs.append(
-            {
-                "mode": mode,
-                "name": name,
-                "distance_m": dist,
-                "duration_min": round(dur, 2),
-                "crowd": crowd,
-                "best_car": best,
-                "poly": coords,
-            }
-        )
-    return segs
+        route = rb.build()
+        # ODsay distance 가 없으면 좌표로 계산한 실제 경로 길이 사용
+        if any(not seg.distance_m for seg in route if seg.mode != "WALK"):
+            for seg, length in zip(route, route.segment_lengths()):
+                if seg.mode != "WALK" and not seg.distance_m:
+                    seg.distance_m = round(float(length))
+        out.append(route)
+    return out
+
+
+@metrics.timed("crowd")
+def annotate_crowd(out: List[Route], routes: List[List[dict]], depart: datetime):
+    """
+    parse_routes 결과에 혼잡·추천 칸을 채움 (모든 후보를 모아 종류별 1 회 일괄 조회).
+    * 지하철: passStopList 출발역 전체를 (역, 방향, 그 역을 지날 예상 시각)으로
+      펼쳐 한 번에 gather → 구간별 최고(crowd)·시간 가중 평균(crowd_mean) (timeline.py)
+    * 버스: (노선, 승차 정류장, 승차 시) 로 한 번에 조회 (buscrowd.py)
+    """
+    model = _load_car_model()
+    sub, bus, car_q, car_t, bus_q = [], [], [], [], []
+    for route, paths in zip(out, routes):
+        for k, (seg, t) in enumerate(zip(route, _start_times(paths, depart))):
+            if seg.mode == "SUBWAY":
+                sub.append(seg)
+                car_q.append(_car_query(paths, k, model))
+                car_t.append(t)  # 추천 칸도 예상 승차 시각 기준
+            elif seg.mode == "BUS":
+                bus.append(seg)
+                bus_q.append(_bus_query(paths[k], t))
+                seg.bus_keys = bus_q[-1][:2]  # 출발 시각 스윕도 같은 키로 조회
+    if car_q:
+        with metrics.span("crowd.car"):
+            boards, dirs, exits = zip(*car_q)
+            cars = model.recommend_batch(boards, dirs, car_t, exits).tolist()
+            for seg, way, car in zip(sub, dirs, cars):
+                seg.direction, seg.best_car = way, car
+    if bus_q:
+        with metrics.span("crowd.bus"):
+            bidx = _load_bus_index()
+            rts, stops, hours = zip(*bus_q)
+            if bidx:
+                board = bidx.gather(*bidx.ids_of(rts, stops), np.asarray(hours))
+            else:
+                board = np.full(len(bus_q), np.nan, dtype=np.float32)
+            metrics.incr("crowd.fallback.bus", int(np.isnan(board).sum()))
+            for seg, lv in zip(bus, boards_to_levels(board).tolist()):
+                seg.crowd, seg.crowd_mean = lv, float(lv)
+    with metrics.span("crowd.subway"):
+        try:
+            idx = _load_sub_index()
+        except FileNotFoundError:
+            idx = None
+        apply_subway_crowd(out, idx, depart)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -369,19 +551,25 @@ def haversine(a: Tuple[float, float], b: Tuple[float, float]):
     return 2 * R * math.asin(math.sqrt(d))
 
 
-def crowd_gradient_color(level: int, max_level: int = 4) -> str:
+@metrics.timed("render")
+def render_map(segs: list[dict], o: tuple[float, float], d: tuple[float, float]) -> str:
     """
-    혼잡도 레벨(1~max_level)에 따라 녹색에서 빨강으로 선형 그라디언트 색상을 반환합니다.
+    빠른 지도: 세그먼트 → GeoJSON(선 구간은 encodedPolyline 문자열) → 정적
+    Leaflet HTML 문자열 (템플릿이 polyline 을 풀어 그림).
+    파일을 쓰지 않으며 folium 객체도 만들지 않습니다 (maprender.py).
     """
-    ratio = max(0, min(level - 1, max_level - 1)) / (max_level - 1)
-    r = int(255 * ratio)
-    g = int(255 * (1 - ratio))
-    return f"#{r:02x}{g:02x}00"
+    return render_html(segs, o, d, MAP_STYLE)
 
 
-def draw_map(segs: list[dict], o: tuple[float, float], d: tuple[float, float]):
+@metrics.timed("render.folium")
+def draw_map(
+    segs: list[dict],
+    o: tuple[float, float],
+    d: tuple[float, float],
+    out: Path = Path("route.html"),
+):
     """
-    folium을 이용해 경로를 시각화합니다.
+    folium을 이용해 경로를 시각화합니다. (레이어 컨트롤이 필요할 때 – 보통은 render_map)
     - 외곽선과 중심선 굵기는 상단 상수 OUTER_LINE_WEIGHT, CENTER_LINE_WEIGHT로 조정 가능
     - 외곽선: 모드/호선별 진한 색상, weight=OUTER_LINE_WEIGHT
     - 중심선: 혼잡도 기반 그라디언트, weight=CENTER_LINE_WEIGHT
@@ -389,7 +577,11 @@ def draw_map(segs: list[dict], o: tuple[float, float], d: tuple[float, float]):
     - 환승 지점에 특별 아이콘 표시
     - 레이어 컨트롤로 토글 가능
     """
+    import folium
+
     m = folium.Map(location=[(o[0] + d[0]) / 2, (o[1] + d[1]) / 2], zoom_start=13)
+    polys = [np.asarray(seg.get("poly", []), dtype=float).reshape(-1, 2) for seg in segs]
+    m.fit_bounds(bbox(np.vstack([[o, d], *polys])))
     folium.Marker(o, popup="출발", icon=folium.Icon(color="blue", icon="play")).add_to(
         m
     )
@@ -401,9 +593,10 @@ def draw_map(segs: list[dict], o: tuple[float, float], d: tuple[float, float]):
     for idx, seg in enumerate(segs, start=1):
         mode = seg.get("mode")
         coords = seg.get("poly", [])
-        if not coords:
+        if len(coords) == 0:
             prev_mode = mode
             continue
+        coords = simplify(coords, SIMPLIFY_TOL_M).tolist()
 
         crowd = seg.get("crowd", 1)
         duration = seg.get("duration_min", 0)
@@ -411,18 +604,7 @@ def draw_map(segs: list[dict], o: tuple[float, float], d: tuple[float, float]):
         name = seg.get("name", "")  # 지하철 호선명 또는 버스 번호 등
 
         # 외곽선 색상 결정
-        if mode == "SUBWAY":
-            for k in SUBWAY_LINE_COLORS.keys():
-                if k in name:
-                    outer_color = SUBWAY_LINE_COLORS[k]
-                elif name in k:
-                    outer_color = SUBWAY_LINE_COLORS[name]
-                else:
-                    pass
-        elif mode == "BUS":
-            outer_color = BUS_COLOR
-        else:  # WALK
-            outer_color = WALK_COLOR
+        outer_color = MAP_STYLE.line_colors(mode, name)
 
         tooltip = f"{idx}. {mode} ({name}): {duration:.1f}분 | 혼잡도 {crowd}"
         if best_car:
@@ -470,49 +652,46 @@ def draw_map(segs: list[dict], o: tuple[float, float], d: tuple[float, float]):
         prev_mode = mode
 
     folium.LayerControl().add_to(m)
-    out = Path("route.html").resolve()
+    out = Path(out).resolve()
     m.save(str(out))
     return out
 
 
-def odsay_all_routes(origin, dest, *, prefs: Dict | None = None) -> List[List[dict]]:
+_route_cache = RouteCache(ttl=ROUTE_CACHE_TTL)
+
+
+@metrics.timed("fetch")
+def fetch_candidate_paths(origin, dest) -> List[dict]:
     """
-    ODsay API에서 얻을 수 있는 모든 후보 경로를 '세그먼트 리스트' 형태로 모아 반환.
+    ODsay 원본 path 목록 (선호도 무관). 같은 격자·시간대 재질의는 캐시에서 반환.
     """
-    common = {
-        "apiKey": ODSAY_KEY,  # ← 개인 ODsay API 키
-        "lang": 0,  # 0 = 한국어
-        "output": "json",
-        "SX": origin[1],  # 출발 X(경도)
-        "SY": origin[0],  # 출발 Y(위도)
-        "EX": dest[1],  # 도착 X
-        "EY": dest[0],  # 도착 Y
-        "OPT": 0,  # 0 = 종합 최적
-        "SearchPathType": 0,  # 0 = 대중교통+도보
-        "reqCoordType": "WGS84GEO",
-        "resCoordType": "WGS84GEO",
-    }
-    endpoints = [
-        ("https://api.odsay.com/v1/api/searchPubTransPath", {"SearchType": 0}),
-        ("https://api.odsay.com/v1/api/searchPubTransPathT", {"SearchType": 0}),
-    ]
+    paths = _route_cache.get(origin, dest)
+    metrics.incr("route_cache.miss" if paths is None else "route_cache.hit")
+    if paths is None:
+        from odsay import fetch_paths
 
-    candidates: list[list[dict]] = []
-    for endpoint, extra in endpoints:
-        try:
-            r = requests.get(
-                endpoint, params={**common, **extra}, timeout=8, verify=False
-            )
-            r.raise_for_status()
-            for path in r.json().get("result", {}).get("path", []):
-                segs = paths_to_segs(path.get("subPath", []), prefs=prefs)
-                if segs:  # 빈 경로 방지
-                    candidates.append(segs)
-        except requests.RequestException:
-            continue  # 해당 엔드포인트 실패 → 다음 시도
+        paths = fetch_paths(origin, dest, api_key=ODSAY_KEY)
+        _route_cache.put(origin, dest, paths)
+    return paths
+
+
+def route_cache_stats() -> Dict[str, int]:
+    return _route_cache.stats()
+
+
+def odsay_all_routes(origin, dest, *, depart: datetime | None = None) -> List[Route]:
+    """
+    ODsay API에서 얻을 수 있는 모든 후보 경로를 '세그먼트 리스트' 형태로 모아 반환.
+    두 엔드포인트는 동시에 호출되며 (odsay.fetch_paths), 원본 응답은 캐시된다.
+    """
+    paths = fetch_candidate_paths(origin, dest)
+    # 모든 후보를 한 번에 세그먼트화 (혼잡도 일괄 조회)
+    raw = [path.get("subPath", []) for path in paths]
+    candidates = [segs for segs in routes_to_segs(raw, depart) if segs]
     return candidates  # 후보 0 개면 빈 리스트
 
 
+@metrics.timed("score")
 def choose_best_route(routes, *, prefs: Dict | None = None) -> Tuple[int, List[dict]]:
     """
     후보 리스트 중 score_route() 총점이 가장 낮은 경로를 골라
@@ -520,25 +699,159 @@ def choose_best_route(routes, *, prefs: Dict | None = None) -> Tuple[int, List[d
     """
     if not routes:
         return -1, []  # 후보가 없으면 -1
-    scored = [(score_route(r, prefs=prefs), i + 1, r) for i, r in enumerate(routes)]
-    scored.sort(key=lambda x: x[0])  # 점수 오름차순
-    _, best_idx, best_route = scored[0]
-    return best_idx, best_route
+    best = int(np.argmin(score_routes(routes, prefs=prefs)))  # 동점이면 앞 후보
+    return best + 1, routes[best]
 
 
-def debug_print_scores(routes: list[list[dict]]):
+def debug_print_scores(routes: list[list[dict]], *, prefs: Dict | None = None):
     """(선택) 후보별 총점·구성 확인용 디버그 헬퍼"""
-    for i, r in enumerate(routes, 1):
-        print(f"[DBG] Route {i:02d}: score={score_route(r):.2f}, " f"segments={len(r)}")
+    for i, (r, sc) in enumerate(zip(routes, score_routes(routes, prefs=prefs)), 1):
+        print(f"[DBG] Route {i:02d}: score={sc:.2f}, " f"segments={len(r)}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 오프라인 대체 경로 (ODsay 실패·빈 응답 시)
+_graph: TransitGraph | None = None
+_graph_missing = False
+
+
+def _load_graph() -> TransitGraph | None:
+    global _graph, _graph_missing
+    if _graph is None and not _graph_missing:
+        if TRANSIT_GRAPH.exists():
+            _graph = TransitGraph.load(TRANSIT_GRAPH)
+        else:
+            _graph_missing = True
+    return _graph
+
+
+@metrics.timed("offline")
+def offline_route(o, d, *, prefs: Dict | None = None) -> Route | None:
+    """로컬 그래프 A* 탐색 (데이터셋이 없거나 닿는 역이 없으면 None)"""
+    g = _load_graph()
+    if g is None:
+        return None
+    if prefs is None:
+        prefs = current_prefs()
+    now = datetime.now()
+    try:
+        levels = station_crowd_levels(g, _load_sub_index(), now)
+    except FileNotFoundError:
+        levels = None
+    bus_idx = _load_bus_index()
+    return plan_offline(
+        g,
+        o,
+        d,
+        station_levels=levels,
+        bus_levels=bus_stop_levels(g, bus_idx, now) if bus_idx else None,
+        crowd_weight=prefs.get("crowd_weight", 2.0),
+    )
+
+
+def walk_minutes(dist_m):
+    """직선 거리(m, 스칼라·배열) → 도보 분"""
+    return dist_m / AVG_WALK_SPEED / 60
+
+
+def stations_near(c, radius_m: float = 800.0) -> List[Tuple[str, str, float]]:
+    """
+    좌표 반경 내 역 (역명, 호선, 거리 m) – 가까운 순. API 호출 없이 로컬 공간 인덱스 사용.
+    오프라인 데이터셋이 없으면 빈 리스트.
+    """
+    g = _load_graph()
+    if g is None:
+        return []
+    idx, dist = g.spatial.within(c[0], c[1], radius_m)
+    return [(g.names[i], g.lines[i], float(m)) for i, m in zip(idx.tolist(), dist)]
+
+
+def nearest_station(c, max_radius_m: float | None = None):
+    """가장 가까운 역 (역명, 호선, 거리 m, 도보 분) 또는 None"""
+    g = _load_graph()
+    if g is None:
+        return None
+    idx, dist = g.spatial.nearest(c[0], c[1], 1, max_radius_m)
+    if not len(idx):
+        return None
+    i, m = int(idx[0]), float(dist[0])
+    return g.names[i], g.lines[i], m, round(walk_minutes(m), 2)
+
+
+def fallback_route(o, d, *, prefs: Dict | None = None):
+    """오프라인 엔진 → 실패 시 직선 도보 1 구간"""
+    route = offline_route(o, d, prefs=prefs)
+    if route:
+        return route
+    dist = haversine(o, d)
+    dur = dist / (AVG_WALK_SPEED * 60)
+    return [
+        {
+            "mode": "WALK",
+            "name": "직선도보",
+            "distance_m": dist,
+            "duration_min": round(dur, 2),
+            "crowd": 1,
+            "best_car": None,
+            "poly": [o, d],
+        }
+    ]
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":  # 일괄 모드 (batch.py)
+        from batch import main as batch_main
+
+        return batch_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":  # 상주 HTTP 서비스 (server.py)
+        from server import main as serve_main
+
+        return serve_main(sys.argv[2:])
+
     p = argparse.ArgumentParser(description="ODsay 멀티모달 플래너 + 시각화 개선 v3")
     p.add_argument("origin")
     p.add_argument("dest")
     p.add_argument("--learn", action="store_true")
+    p.add_argument("--choose", type=int, help="이용할 후보 번호 (기본: 최적 후보)")
+    p.add_argument("--car", help="--learn: 지하철 구간별 탄 칸 (예: 3,7)")
+    p.add_argument("--felt", help="--learn: 지하철 구간별 체감 혼잡 1~4 (예: 2,4)")
+    p.add_argument("--metrics", action="store_true", help="단계별 시간·카운터 출력")
     args = p.parse_args()
 
+    if args.metrics:
+        metrics.enable()
+    with metrics.trace("cli", origin=args.origin, dest=args.dest) as tr:
+        _run_cli(args)
+    if tr is not None:
+        print_trace(tr.as_dict())
+
+
+def print_trace(tr: Dict, file=sys.stderr):
+    """metrics 트레이스 → 사람이 읽는 요약 (구간 시간순 + 카운터)"""
+    print(f"[metrics] {tr['name']} {tr['duration_ms']:.1f} ms", file=file)
+    for sp in tr["spans"]:
+        print(
+            f"  {sp['start_ms']:8.1f} +{sp['duration_ms']:8.2f} ms  {sp['name']}",
+            file=file,
+        )
+    for k, v in sorted(tr["counters"].items()):
+        print(f"  {k} = {v}", file=file)
+
+
+def _observed_cars(segs, cars: str | None, felt: str | None) -> Dict[int, tuple]:
+    """--car / --felt (지하철 구간 순서의 쉼표 목록) → {구간 번호: (칸, 체감 레벨)}"""
+    if not cars or not felt:
+        return {}
+    sub = [i for i, s in enumerate(segs) if s.get("mode") == "SUBWAY"]
+    pairs = zip(cars.split(","), felt.split(","))
+    return {
+        i: (int(c), int(f))
+        for i, (c, f) in zip(sub, pairs)
+        if c.strip().isdigit() and f.strip() in ("1", "2", "3", "4")
+    }
+
+
+def _run_cli(args):
     o = parse_location(args.origin)
     d = parse_location(args.dest)
     routes = odsay_all_routes(o, d)  # ① 후보 목록
@@ -546,20 +859,13 @@ def main():
     best_idx, segs = choose_best_route(routes)  #   # ② 개인 선호 기반 '최적 1 개'
     if best_idx != -1:
         print(f"\n[선택된 후보] {best_idx}번 경로가 최적입니다.")
+    chosen = False  # 사용자가 직접 고른 후보인지 (학습 대상)
+    if args.choose and 1 <= args.choose <= len(routes) and routes[args.choose - 1]:
+        best_idx, segs = args.choose, routes[args.choose - 1]
+        chosen = True
+        print(f"[직접 선택] {best_idx}번 경로를 이용합니다.")
     if not segs:
-        dist = haversine(o, d)
-        dur = dist / (AVG_WALK_SPEED * 60)
-        segs = [
-            {
-                "mode": "WALK",
-                "name": "직선도보",
-                "distance_m": dist,
-                "duration_min": round(dur, 2),
-                "crowd": 1,
-                "best_car": None,
-                "poly": [o, d],
-            }
-        ]
+        segs = fallback_route(o, d)
 
     total = sum(s.get("duration_min", 0) for s in segs)
     print("[경로 요약]")
@@ -569,23 +875,31 @@ def main():
             f"{i}. {s.get('mode'):<6} | {s.get('name'):<10} | {s.get('duration_min',0):5.1f}분{car}"
         )
     print(f"\n▶ 예상 총 소요: {total:.1f}분")
+    hint = departure_hint(routes)
+    if hint:
+        print(f"💡 {hint}")
 
-    html_path = draw_map(segs, o, d)
-    uri = html_path.as_uri()
+    MAP_FILE.parent.mkdir(parents=True, exist_ok=True)
+    MAP_FILE.write_text(render_map(segs, o, d), encoding="utf-8")
+    uri = MAP_FILE.as_uri()
     webbrowser.open(uri)
     print(f"[+] 지도: {uri}")
 
     if args.learn:
-        append_history(
-            {
-                "datetime": datetime.now().isoformat(),
-                "origin": args.origin,
-                "dest": args.dest,
-                "total_min": total,
-                "modes": "/".join({s.get("mode") for s in segs}),
-            }
+        observed = _observed_cars(segs, args.car, args.felt)
+        record_trip(
+            segs, origin=args.origin, dest=args.dest, o=o, d=d, observed=observed
         )
         print("[+] 기록 저장 →", HIST_FILE)
+        if chosen and len(routes) > 1:
+            new = learn_choice(routes, best_idx - 1)
+            print(
+                f"[+] 선호도 갱신 (runs={new['runs']}): "
+                f"crowd_weight={new['crowd_weight']:.2f}, "
+                f"walk_limit_min={new['walk_limit_min']}"
+            )
+        elif len(routes) > 1:
+            print("[i] 선호도 학습은 --choose 로 이용한 후보를 지정할 때만 합니다.")
 
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 import streamlit as st
-import inspect  # 👈 helper for dynamic prefs injection
-from pathlib import Path
+import streamlit.components.v1 as components
+import hashlib
+import orjson
 from datetime import datetime
 from typing import Dict, List
 # 좋아
@@ -11,18 +12,16 @@ from planner import (
     parse_location,
     load_prefs,
     save_prefs,
-    AVG_WALK_SPEED,
-    odsay_all_routes,
+    fetch_candidate_paths,
+    routes_to_segs,
     choose_best_route,
-    draw_map,
-    haversine,
-    append_history,
+    render_map,
+    fallback_route,
+    record_trip,
+    learn_choice,
+    departure_hint,
 )
-
-try:
-    from streamlit_folium import st_folium  # pip install streamlit-folium
-except ImportError:
-    st_folium = None
+from segments import json_default
 
 st.set_page_config(page_title="멀티모달 경로 플래너", layout="wide")
 
@@ -46,7 +45,7 @@ with st.sidebar:
     # 공통 파라미터 ------------------------------------------------------------
     crowd_weight   = st.slider("혼잡도 가중치", 0.0, 5.0, float(p.get("crowd_weight", 2.0)), 0.1)
     max_crowd      = st.slider("허용 최대 혼잡 레벨", 1, 4, int(p.get("max_crowd", 4)), 1)
-    walk_limit_min = st.number_input("허용 최대 도보 (분)", 0, 60, int(p.get("walk_limit_min", 15)), 1)
+    walk_limit_min = st.number_input("허용 최대 도보 (분)", 0.0, 60.0, float(p.get("walk_limit_min", 15)), 0.5)
 
     # 모드별 페널티 -------------------------------------------------------------
     st.subheader("모드별 페널티")
@@ -97,7 +96,7 @@ with col1:
 with col2:
     dest_input = st.text_input("도착지 (역명/주소/위도,경도)")
 
-# 👉 버튼이 눌린 순간의 **위젯 값** 기준으로 prefs dict 를 구성
+# 👉 현재 **위젯 값** 기준으로 prefs dict 를 구성 (매 rerun 마다 재채점에 사용)
 current_prefs: Dict = {
     "crowd_weight": crowd_weight,
     "max_crowd": max_crowd,
@@ -114,7 +113,13 @@ current_prefs: Dict = {
     },
 }
 
-if st.button("🚀  경로 탐색"):
+# ──────────────────────────────────────────────────────────────────────────────
+# 후보 경로는 세션에 보관 → 선호도(슬라이더)만 바뀌면 점수 계산·지도만 다시 수행
+#   search = {"key": (출발 입력, 도착 입력), "origin", "dest", "depart": 탐색 시각,
+#             "routes": 파싱·혼잡·추천 칸까지 끝난 후보 (routes_to_segs 결과)}
+# ──────────────────────────────────────────────────────────────────────────────
+searched = st.button("🚀  경로 탐색")
+if searched:
     if not origin_input or not dest_input:
         st.warning("출발지와 도착지를 모두 입력하세요.")
         st.stop()
@@ -126,61 +131,81 @@ if st.button("🚀  경로 탐색"):
         st.error(str(e))
         st.stop()
 
-    # ── 경로 계산 & 선택 -------------------------------------------------------
-    with st.spinner("경로 계산 중…"):
-
-        def _call_with_prefs(func, *f_args):  # helper: 전달할 함수가 prefs 인자를 지원하면 넣어줌
-            sig = inspect.signature(func)
-            if "prefs" in sig.parameters:
-                return func(*f_args, prefs=current_prefs)  # type: ignore[arg-type]
-            return func(*f_args)
-
-        routes: List[List[Dict]] = _call_with_prefs(odsay_all_routes, origin, dest)
-        best_idx, segs = _call_with_prefs(choose_best_route, routes)
-
-        if not segs:
-            dist = haversine(origin, dest)
-            segs = [{
-                "mode": "WALK",
-                "name": "직선도보",
-                "distance_m": dist,
-                "duration_min": round(dist / (AVG_WALK_SPEED * 60), 2),
-                "crowd": 1,
-                "best_car": None,
-                "poly": [origin, dest],
-            }]
-
-    # ── 경로 요약 ------------------------------------------------------------- -------------------------------------------------------------
+    with st.spinner("경로 검색 중…"):
+        depart = datetime.now()  # 혼잡 기준 시각 – rerun 해도 바뀌지 않게 고정
+        raw = [p.get("subPath", []) for p in fetch_candidate_paths(origin, dest)]
+        st.session_state["search"] = {
+            "key": (origin_input, dest_input),
+            "origin": origin,
+            "dest": dest,
+            "depart": depart,
+            "routes": [r for r in routes_to_segs(raw, depart) if r],
+        }
+
+search = st.session_state.get("search")
+if search and search["key"] == (origin_input, dest_input):
+    origin, dest = search["origin"], search["dest"]
+
+    # ── 경로 점수 계산 & 선택 (네트워크·파싱 없음, 보관한 후보를 재채점만) ------
+    routes: List[List[Dict]] = search["routes"]
+    best_idx, segs = choose_best_route(routes, prefs=current_prefs)
+    rec_idx = best_idx  # 추천 경로 – 사용자가 다른 후보를 고를 때만 학습
+    if len(routes) > 1:  # 학습용: 실제로 이용할 후보를 직접 고를 수 있음
+        pick = st.selectbox(
+            "이용할 경로",
+            range(1, len(routes) + 1),
+            index=best_idx - 1,
+            format_func=lambda i: f"{i}번 · {sum(s['duration_min'] for s in routes[i - 1]):.0f}분"
+            + (" (추천)" if i == rec_idx else ""),
+        )
+        best_idx, segs = pick, routes[pick - 1]
+
+    if not segs:  # ODsay 실패 → 오프라인 엔진 / 직선 도보
+        segs = fallback_route(origin, dest, prefs=current_prefs)
+
+    # ── 경로 요약 -------------------------------------------------------------
     total_min = sum(s.get("duration_min", 0) for s in segs)
     st.subheader("📝  경로 요약")
     for i, s in enumerate(segs, 1):
         car = f" | 추천칸 {s.get('best_car')}" if s.get("best_car") else ""
         st.write(f"{i}. {s.get('mode'):<6} | {s.get('name'):<10} | {s.get('duration_min',0):5.1f}분{car}")
     st.success(f"예상 총 소요 시간: {total_min:.1f}분")
+    hint = departure_hint(routes, prefs=current_prefs, start=search["depart"])
+    if hint:
+        st.info(f"💡 {hint}")
 
     # ── 지도 -------------------------------------------------------------
-    # 🌐 HTML 결과 파일 이름에 타임스탬프를 붙여 브라우저 캐싱 문제 방지
-    html_path: Path = draw_map(segs, origin, dest)
-    unique_path = html_path.with_stem(html_path.stem + f"_{int(datetime.now().timestamp())}")
-    html_path.replace(unique_path)
-    html_path = unique_path
-    if st_folium:
-        st.subheader("🗺️  경로 지도")
-        st_folium(open(html_path, "r", encoding="utf-8").read(), width=900, height=600)
-    else:
-        import webbrowser
-        webbrowser.open(html_path.as_uri())
-
-    # ── 학습 모드 ----------------------------------------------------------
+    # 같은 경로·표시값이면 이전에 만든 지도를 그대로 사용 (HTML 재생성 생략)
+    map_key = hashlib.sha1(
+        orjson.dumps([segs, origin, dest], default=json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    ).hexdigest()
+    cached_map = st.session_state.get("map")
+    if not cached_map or cached_map["key"] != map_key:
+        # GeoJSON + 정적 템플릿 HTML 을 메모리에서 바로 생성 (임시 파일 없음)
+        cached_map = {"key": map_key, "html": render_map(segs, origin, dest)}
+        st.session_state["map"] = cached_map
+    st.subheader("🗺️  경로 지도")
+    components.html(cached_map["html"], height=600)
+
+    # ── 학습 모드: 이용한 경로 기록 + (추천과 다른 후보를 골랐을 때만) 선호도 갱신
+    observed = {}  # 지하철 구간별 (탄 칸, 체감 혼잡) – 추천 칸 모델 시드
     if learn_mode:
-        append_history({
-            "datetime": datetime.now().isoformat(),
-            "origin": origin_input,
-            "dest": dest_input,
-            "total_min": total_min,
-            "modes": "/".join({s.get("mode") for s in segs}),
-        })
-        st.info("📚  경로 이용 기록이 저장되었습니다.")
+        for i, s in enumerate(segs):
+            if s.get("mode") != "SUBWAY":
+                continue
+            c1, c2 = st.columns(2)
+            car = c1.number_input(f"{i + 1}. {s.get('name')} 탄 칸 (0 = 모름)", 0, 10, 0, 1, key=f"car{i}")
+            felt = c2.select_slider("체감 혼잡", [1, 2, 3, 4], value=2, key=f"felt{i}")
+            if car:
+                observed[i] = (int(car), int(felt))
+    if learn_mode and st.button("✅  이 경로 이용 (기록·학습)"):
+        record_trip(segs, origin=origin_input, dest=dest_input, o=origin, d=dest, observed=observed)
+        if best_idx not in (-1, rec_idx):  # 추천을 그대로 따른 선택은 학습하지 않음
+            base = {**current_prefs, "runs": st.session_state["prefs"].get("runs", 0)}
+            st.session_state["prefs"] = learn_choice(routes, best_idx - 1, prefs=base)
+            st.info("📚  경로 이용 기록이 저장되고 선호도가 갱신되었습니다.")
+        else:
+            st.info("📚  경로 이용 기록이 저장되었습니다 (추천 경로 선택 → 선호도 유지).")
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 푸터 -----------------------------------------------------------------------
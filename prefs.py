@@ -0,0 +1,149 @@
+"""
+prefs.py
+===============================================================
+개인화 선호도 – 프로세스 전역 인메모리 저장소
+----------------------------------------------------------------
+* `~/.route_planner/prefs.json` 을 최초 1회만 읽고,
+  이후에는 파일 mtime 이 바뀐 경우에만 다시 읽습니다.
+* 점수 계산에는 불변(frozen) 스냅샷 `Prefs` 를 넘깁니다.
+  `Prefs` 는 Mapping 이므로 기존 dict 기반 코드(`prefs["crowd_weight"]`,
+  `prefs.get(...)`)가 그대로 동작합니다.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Iterator
+
+DEFAULT_PREFS = {
+    "crowd_weight": 2.0,
+    "max_crowd": 4,
+    "walk_limit_min": 15,
+    "mode_penalty": {"SUBWAY": 0.0, "BUS": 0.0, "WALK": 0.0},
+    "mode_preference": {"SUBWAY": 0.0, "BUS": 0.0, "WALK": 0.0},
+    "runs": 0,
+}
+
+
+def _frozen(d: Dict[str, float]) -> Mapping:
+    return MappingProxyType({k: float(v) for k, v in d.items()})
+
+
+@dataclass(frozen=True)
+class Prefs(Mapping):
+    """점수 계산용 불변 선호도 스냅샷"""
+
+    crowd_weight: float = 2.0
+    max_crowd: int = 4
+    walk_limit_min: float = 15
+    mode_penalty: Mapping = field(
+        default_factory=lambda: _frozen(DEFAULT_PREFS["mode_penalty"])
+    )
+    mode_preference: Mapping = field(
+        default_factory=lambda: _frozen(DEFAULT_PREFS["mode_preference"])
+    )
+    runs: int = 0
+
+    @classmethod
+    def from_dict(cls, d: Mapping | None) -> "Prefs":
+        """누락 키는 DEFAULT_PREFS 로 채움"""
+        d = d or {}
+        return cls(
+            crowd_weight=float(d.get("crowd_weight", DEFAULT_PREFS["crowd_weight"])),
+            max_crowd=int(d.get("max_crowd", DEFAULT_PREFS["max_crowd"])),
+            walk_limit_min=float(
+                d.get("walk_limit_min", DEFAULT_PREFS["walk_limit_min"])
+            ),
+            mode_penalty=_frozen(
+                {**DEFAULT_PREFS["mode_penalty"], **(d.get("mode_penalty") or {})}
+            ),
+            mode_preference=_frozen(
+                {**DEFAULT_PREFS["mode_preference"], **(d.get("mode_preference") or {})}
+            ),
+            runs=int(d.get("runs", 0)),
+        )
+
+    def to_dict(self) -> Dict:
+        """저장·UI 편집용 일반 dict (수정 가능 복사본)"""
+        return {
+            f.name: dict(v) if isinstance(v := getattr(self, f.name), Mapping) else v
+            for f in fields(self)
+        }
+
+    # Mapping 인터페이스 – 기존 dict prefs 와 호환
+    def __getitem__(self, key: str):
+        if key not in _FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return (f.name for f in fields(self))
+
+    def __len__(self) -> int:
+        return len(fields(self))
+
+
+_FIELDS = frozenset(f.name for f in fields(Prefs))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+class PrefsStore:
+    """
+    prefs.json 을 감시하는 스레드 안전 캐시.
+    `check_interval` 초 안의 반복 호출은 stat 없이 메모리 스냅샷을 반환합니다.
+    """
+
+    def __init__(self, path: Path, *, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snap: Prefs | None = None
+        self._mtime: int | None = None
+        self._checked = 0.0
+
+    def _mtime_ns(self) -> int | None:
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self) -> Prefs:
+        now = time.monotonic()
+        snap = self._snap
+        if snap is not None and now - self._checked < self.check_interval:
+            return snap
+        with self._lock:
+            self._checked = now
+            mtime = self._mtime_ns()
+            if self._snap is None or mtime != self._mtime:
+                self._snap = self._read()
+                self._mtime = mtime
+            return self._snap
+
+    def _read(self) -> Prefs:
+        import orjson  # 지연 import – 점수 계산만 하는 경로의 import 비용 절감
+
+        try:
+            return Prefs.from_dict(orjson.loads(self.path.read_bytes()))
+        except (OSError, TypeError, ValueError):  # JSONDecodeError ⊂ ValueError
+            return Prefs.from_dict(None)
+
+    def save(self, prefs: Mapping) -> Prefs:
+        import orjson
+
+        snap = prefs if isinstance(prefs, Prefs) else Prefs.from_dict(prefs)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_bytes(orjson.dumps(snap.to_dict(), option=orjson.OPT_INDENT_2))
+            self._snap = snap
+            self._mtime = self._mtime_ns()
+            self._checked = time.monotonic()
+        return snap
+
+    def invalidate(self):
+        with self._lock:
+            self._snap = None
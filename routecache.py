@@ -0,0 +1,88 @@
+"""
+routecache.py
+===============================================================
+ODsay 원본 `path` 응답 캐시
+----------------------------------------------------------------
+* 키 = (출발지·도착지를 격자에 스냅한 좌표, 요일구분, 시간대 버킷)
+  → 몇 십 m 차이의 같은 질의, 같은 시간대의 재검색은 네트워크 없이 응답.
+* 저장 대상은 선호도와 무관한 원본 payload 이므로
+  가중치 슬라이더를 바꿔도 `routes_to_segs` / `choose_best_route` 로 즉시 재정렬됩니다.
+* 크기 제한 + TTL (`cachetools.TTLCache`), 스레드 안전.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from cachetools import TTLCache
+
+from crowd import DAY_TYPE
+
+GRID_DEG = 0.002  # 좌표 스냅 격자 (약 200 m)
+BUCKET_MIN = 15  # 시간대 버킷 (분)
+MAXSIZE = 512
+TTL = 10 * 60  # 초
+
+Coord = Tuple[float, float]
+
+
+class RouteCache:
+    def __init__(
+        self,
+        *,
+        maxsize: int = MAXSIZE,
+        ttl: float = TTL,
+        grid: float = GRID_DEG,
+        bucket_min: int = BUCKET_MIN,
+    ):
+        self.grid = grid
+        self.bucket_min = bucket_min
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._stats: Counter = Counter()
+
+    def _snap(self, c: Coord) -> Tuple[int, int]:
+        return round(c[0] / self.grid), round(c[1] / self.grid)
+
+    def key(self, origin: Coord, dest: Coord, when: datetime | None = None) -> Tuple:
+        when = when or datetime.now()
+        bucket = (when.hour * 60 + when.minute) // self.bucket_min
+        return (
+            self._snap(origin),
+            self._snap(dest),
+            DAY_TYPE[when.weekday()],
+            bucket,
+        )
+
+    def get(
+        self, origin: Coord, dest: Coord, when: datetime | None = None
+    ) -> List[dict] | None:
+        k = self.key(origin, dest, when)
+        with self._lock:
+            paths = self._cache.get(k)
+            self._stats["hits" if paths is not None else "misses"] += 1
+            return paths
+
+    def put(
+        self, origin: Coord, dest: Coord, paths: List[dict], when: datetime | None = None
+    ):
+        if not paths:  # 실패·빈 응답은 캐시하지 않음 → 다음 요청에서 재시도
+            return
+        k = self.key(origin, dest, when)
+        with self._lock:
+            self._cache[k] = paths
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._stats["hits"],
+                "misses": self._stats["misses"],
+                "size": len(self._cache),
+            }
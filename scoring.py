@@ -0,0 +1,152 @@
+"""
+scoring.py
+===============================================================
+선호도 기반 경로 점수 – 벡터화 2단계 파이프라인의 2단계
+----------------------------------------------------------------
+* 1단계(`planner.routes_to_segs`)는 선호도와 무관한 원본 세그먼트
+  (순수 소요 시간·거리·혼잡 레벨·좌표·정차역)만 만듭니다.
+* 이 모듈은 N 개 후보 × M 개 구간을 (N, M) 행렬로 한 번 묶고,
+  선호도 벡터 K 개를 받아 (K, N) 점수를 한 번의 numpy 연산으로 계산합니다.
+  → 한 번 받아온 후보를 여러 사용자/선호도 조합으로 거의 공짜로 재정렬.
+
+점수 = Σ(소요 시간 + 모드 페널티 + crowd_weight·(평균 혼잡-1))
+       + 1000 × (최고 혼잡이 max_crowd 초과인 구간 수) + 999 × (총 도보 > walk_limit_min)
+  평균 혼잡 = 구간 내 역별 레벨의 시간 가중 평균 (crowd_mean), 최고 = crowd
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Mapping, Sequence
+
+import numpy as np
+
+MODES = ("SUBWAY", "BUS", "WALK")
+MODE_IDX = {m: i for i, m in enumerate(MODES)}
+WALK = MODE_IDX["WALK"]
+OVER_CROWD_PENALTY = 1e3
+WALK_LIMIT_PENALTY = 999.0
+
+# 선호도 벡터 열 순서
+PV_CROWD_WEIGHT, PV_MAX_CROWD, PV_WALK_LIMIT = 0, 1, 2
+PV_MODE = slice(3, 3 + len(MODES))
+PV_SIZE = 3 + len(MODES)
+
+
+def prefs_vector(prefs: Mapping) -> np.ndarray:
+    """prefs(dict/Prefs) → float64 벡터 (PV_SIZE,)"""
+    mp = prefs.get("mode_penalty", {}) or {}
+    v = np.empty(PV_SIZE, dtype=np.float64)
+    v[PV_CROWD_WEIGHT] = prefs.get("crowd_weight", 2.0)
+    v[PV_MAX_CROWD] = prefs.get("max_crowd", 4)
+    v[PV_WALK_LIMIT] = prefs.get("walk_limit_min", 15)
+    v[PV_MODE] = [mp.get(m, 0.0) for m in MODES]
+    return v
+
+
+def prefs_matrix(prefs_list: Sequence[Mapping]) -> np.ndarray:
+    return (
+        np.stack([prefs_vector(p) for p in prefs_list])
+        if prefs_list
+        else np.empty((0, PV_SIZE))
+    )
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class RouteMatrix:
+    """후보 N 개 × 구간 M 개로 패딩한 세그먼트 행렬"""
+
+    duration: np.ndarray  # float64 (N, M), 패딩 0
+    crowd: np.ndarray  # int8 (N, M), 패딩 1 – 구간 최고 레벨
+    crowd_mean: np.ndarray  # float32 (N, M), 패딩 1 – 시간 가중 평균 레벨
+    mode: np.ndarray  # int8 (N, M), 패딩 -1
+    mask: np.ndarray  # bool (N, M)
+
+    @classmethod
+    def from_routes(cls, routes: Sequence[List[dict]]) -> "RouteMatrix":
+        n = len(routes)
+        m = max((len(r) for r in routes), default=0)
+        duration = np.zeros((n, m), dtype=np.float64)
+        crowd = np.ones((n, m), dtype=np.int8)
+        crowd_mean = np.ones((n, m), dtype=np.float32)
+        mode = np.full((n, m), -1, dtype=np.int8)
+        for i, r in enumerate(routes):
+            k = len(r)
+            if not k:
+                continue
+            duration[i, :k] = [s["duration_min"] for s in r]
+            crowd[i, :k] = [s["crowd"] for s in r]
+            crowd_mean[i, :k] = [
+                s["crowd"] if s.get("crowd_mean") is None else s["crowd_mean"]
+                for s in r
+            ]
+            mode[i, :k] = [MODE_IDX.get(s["mode"], -1) for s in r]
+        return cls(
+            duration=duration,
+            crowd=crowd,
+            crowd_mean=crowd_mean,
+            mode=mode,
+            mask=mode >= 0,
+        )
+
+    def __len__(self) -> int:
+        return self.duration.shape[0]
+
+
+def score_matrix(rm: RouteMatrix, pv: np.ndarray) -> np.ndarray:
+    """
+    선호도 벡터 (PV_SIZE,) → 점수 (N,)
+    선호도 행렬 (K, PV_SIZE) → 점수 (K, N)
+    """
+    pv = np.asarray(pv, dtype=np.float64)
+    single = pv.ndim == 1
+    P = np.atleast_2d(pv)  # (K, F)
+
+    base = rm.duration.sum(axis=1)  # (N,)
+    # 모드 페널티: 패딩(-1)은 마지막 0 열을 가리키도록 확장
+    pen = np.concatenate([P[:, PV_MODE], np.zeros((len(P), 1))], axis=1)  # (K, 4)
+    mode_pen = pen[:, rm.mode].sum(axis=2)  # (K, N)
+    excess = np.where(rm.mask, np.maximum(rm.crowd_mean - 1, 0), 0).sum(axis=1)  # (N,)
+    too_crowded = rm.crowd[None] > P[:, PV_MAX_CROWD, None, None]  # (K, N, M)
+    over = (rm.mask[None] & too_crowded).sum(axis=2)  # (K, N)
+    walk = np.where(rm.mode == WALK, rm.duration, 0.0).sum(axis=1)  # (N,)
+
+    score = (
+        base[None]
+        + mode_pen
+        + P[:, PV_CROWD_WEIGHT, None] * excess[None]
+        + OVER_CROWD_PENALTY * over
+        + WALK_LIMIT_PENALTY * (walk[None] > P[:, PV_WALK_LIMIT, None])
+    )
+    return score[0] if single else score
+
+
+def best_indices(rm: RouteMatrix, P: np.ndarray) -> np.ndarray:
+    """선호도 K 개 각각의 최적 후보 인덱스 (0-based, 후보 없으면 -1)"""
+    if len(rm) == 0:
+        return np.full(np.atleast_2d(P).shape[0], -1, dtype=np.intp)
+    return np.atleast_2d(score_matrix(rm, np.atleast_2d(P))).argmin(axis=1)
+
+
+def score_sweep(
+    rm: RouteMatrix,
+    crowd: np.ndarray,
+    pv: np.ndarray,
+    crowd_mean: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    출발 시각 T 개별 혼잡 (T, N, M) 로 같은 후보를 한 번에 채점 → (T, N)
+    (시간·모드는 그대로, 혼잡만 시각마다 다름. crowd_mean 없으면 crowd 사용)
+    """
+    T, (N, M) = crowd.shape[0], rm.duration.shape
+    if crowd_mean is None:
+        crowd_mean = crowd
+    tiled = RouteMatrix(
+        duration=np.broadcast_to(rm.duration, (T, N, M)).reshape(T * N, M),
+        crowd=np.asarray(crowd, dtype=np.int8).reshape(T * N, M),
+        crowd_mean=np.asarray(crowd_mean, dtype=np.float32).reshape(T * N, M),
+        mode=np.broadcast_to(rm.mode, (T, N, M)).reshape(T * N, M),
+        mask=np.broadcast_to(rm.mask, (T, N, M)).reshape(T * N, M),
+    )
+    return score_matrix(tiled, pv).reshape(T, N)
@@ -0,0 +1,207 @@
+"""
+segments.py
+===============================================================
+경로 세그먼트의 압축 표현
+----------------------------------------------------------------
+* `Segment` : `__slots__` 객체 (인스턴스 dict 없음). Mapping 이므로
+  기존 dict 세그먼트처럼 `seg["mode"]`, `seg.get("poly")` 로 읽을 수 있습니다.
+* `Route`   : 세그먼트 시퀀스 + 경로 전체 좌표를 담은 연속 float64 버퍼
+  `coords (P, 2)` 와 구간 경계 `offsets (S+1,)`.
+  `seg["poly"]` 는 이 버퍼의 슬라이스 뷰라서 복사가 일어나지 않습니다.
+* `as_dict()` / `json_default` 로 `draw_map`·UI 가 쓰는 dict 모양으로 변환합니다.
+* `bus_keys` 는 Mapping 키가 아닌 내부 속성 – `annotate_crowd` 가 버스 구간에 남긴
+  (노선 후보 키들, 승차 정류장 후보 키들). 출발 시각 스윕이 같은 키로 다시 조회합니다.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from typing import Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from geometry import segment_lengths
+
+KEYS = (
+    "mode",
+    "name",
+    "distance_m",
+    "duration_min",
+    "crowd",
+    "best_car",
+    "poly",
+    "stops",
+    "crowd_mean",
+    "direction",
+)
+_KEYSET = frozenset(KEYS)
+
+
+class Segment(Mapping):
+    __slots__ = (
+        "mode",
+        "name",
+        "distance_m",
+        "duration_min",
+        "crowd",
+        "best_car",
+        "stops",
+        "crowd_mean",
+        "direction",
+        "bus_keys",
+        "_coords",
+        "_a",
+        "_b",
+    )
+
+    def __init__(
+        self,
+        mode: str,
+        name: str,
+        distance_m: float,
+        duration_min: float,
+        crowd: int,
+        best_car: int | None,
+        stops: Tuple[str, ...],
+        coords: np.ndarray,
+        a: int,
+        b: int,
+        crowd_mean: float | None = None,
+        direction: int = -1,
+    ):
+        self.mode = mode
+        self.name = name
+        self.distance_m = distance_m
+        self.duration_min = duration_min
+        self.crowd = crowd
+        self.best_car = best_car
+        self.stops = stops
+        self.crowd_mean = float(crowd) if crowd_mean is None else crowd_mean
+        self.direction = direction
+        self.bus_keys: Tuple[Tuple[str, ...], Tuple[str, ...]] | None = None
+        self._coords, self._a, self._b = coords, a, b
+
+    @property
+    def poly(self) -> np.ndarray:
+        """(n, 2) [lat, lng] 뷰 – Route 버퍼를 공유 (복사 없음)"""
+        return self._coords[self._a : self._b]
+
+    # Mapping 인터페이스 – dict 세그먼트와 호환
+    def __getitem__(self, key: str):
+        if key not in _KEYSET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(KEYS)
+
+    def __len__(self) -> int:
+        return len(KEYS)
+
+    def as_dict(self) -> dict:
+        return {k: getattr(self, k) for k in KEYS}
+
+    def __eq__(self, other) -> bool:
+        """dict 세그먼트와 같은 의미의 비교 – poly 는 배열 값으로 비교"""
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        if other.keys() != _KEYSET:
+            return False
+        return all(
+            (
+                np.array_equal(self.poly, other["poly"])
+                if k == "poly"
+                else getattr(self, k) == other[k]
+            )
+            for k in KEYS
+        )
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (
+            f"Segment({self.mode} {self.name!r} {self.duration_min}분 "
+            f"crowd={self.crowd} pts={self._b - self._a})"
+        )
+
+
+class Route(Sequence):
+    """세그먼트 목록 + 연속 좌표 버퍼"""
+
+    __slots__ = ("segments", "coords", "offsets")
+
+    def __init__(
+        self, segments: List[Segment], coords: np.ndarray, offsets: np.ndarray
+    ):
+        self.segments = segments
+        self.coords = coords
+        self.offsets = offsets
+
+    def __getitem__(self, i):
+        return self.segments[i]
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def as_dicts(self) -> List[dict]:
+        return [s.as_dict() for s in self.segments]
+
+    def segment_lengths(self) -> np.ndarray:
+        """좌표 기준 실제 구간 길이 (m) – 버퍼 전체를 한 번에 계산"""
+        return segment_lengths(self.coords, self.offsets)
+
+    def __repr__(self) -> str:
+        return f"Route({self.segments!r})"
+
+
+class RouteBuilder:
+    """세그먼트를 순서대로 추가하고 마지막에 좌표 버퍼를 한 번만 할당"""
+
+    __slots__ = ("_rows", "_extra", "_flat", "_offsets")
+
+    def __init__(self):
+        self._rows: list = []
+        self._extra: list = []
+        self._flat: List[float] = []
+        self._offsets: List[int] = [0]
+
+    def add(
+        self,
+        mode: str,
+        name: str,
+        distance_m: float,
+        duration_min: float,
+        crowd: int,
+        best_car: int | None,
+        points: Iterable[Tuple[float, float]],
+        stops: Iterable[str] = (),
+        *,
+        crowd_mean: float | None = None,
+        direction: int = -1,
+    ):
+        for lat, lng in points:
+            self._flat.append(lat)
+            self._flat.append(lng)
+        self._offsets.append(len(self._flat) // 2)
+        self._rows.append(
+            (mode, name, distance_m, duration_min, crowd, best_car, tuple(stops))
+        )
+        self._extra.append((crowd_mean, direction))
+
+    def build(self) -> Route:
+        coords = np.array(self._flat, dtype=np.float64).reshape(-1, 2)
+        offsets = np.array(self._offsets, dtype=np.int32)
+        segs = [
+            Segment(*row, coords, int(offsets[i]), int(offsets[i + 1]), *extra)
+            for i, (row, extra) in enumerate(zip(self._rows, self._extra))
+        ]
+        return Route(segs, coords, offsets)
+
+
+def json_default(o):
+    """orjson `default=` 훅 – Route/Segment 를 dict 모양으로 직렬화"""
+    if isinstance(o, Route):
+        return list(o.segments)
+    if isinstance(o, Segment):
+        return o.as_dict()
+    raise TypeError
@@ -0,0 +1,291 @@
+"""
+server.py
+===============================================================
+상주 플래너 서비스 – JSON HTTP API (`planner.py serve [--port 8765]`)
+----------------------------------------------------------------
+* 표준 라이브러리 asyncio 스트림 위의 최소 HTTP/1.1 서버 (keep-alive 지원).
+* 프로세스가 떠 있는 동안 혼잡 인덱스·칸 모델·버스 표·오프라인 그래프,
+  지오코딩/경로 캐시, HTTP 커넥션 풀이 그대로 유지됩니다.
+  기동 시 `warm()` 으로 미리 적재 → 첫 요청부터 콜드 스타트 없음.
+* 경로 계산(ODsay 호출 + numpy 채점)은 블로킹이므로 스레드 풀에서 실행하고,
+  이벤트 루프는 여러 연결을 동시에 받습니다.
+
+엔드포인트
+  POST /plan    {"origin", "dest", "prefs"?, "depart"? (ISO 8601), "map"?: bool,
+                 "trace"?: bool}
+                → {"status", "best_idx", "candidates": [...], "hint", ...}
+                  (계측이 켜져 있고 trace=true 이면 요청 트레이스 포함)
+  GET  /health  → 캐시 통계
+  GET  /metrics → 계측 프로세스 집계 (metrics.snapshot)
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from typing import Dict, Mapping, Tuple
+
+import numpy as np
+import orjson
+import polyline
+import requests
+
+import metrics
+import planner
+from maprender import route_geojson
+from prefs import Prefs
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 8
+MAX_BODY = 64 * 1024
+IDLE_TIMEOUT = 30.0  # keep-alive 연결 유휴 제한 (초)
+
+
+class BadRequest(Exception):
+    def __init__(self, message: str, status: HTTPStatus = HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 경로 계산 (스레드 풀에서 실행)
+def warm():
+    """혼잡 표·칸 모델·오프라인 그래프를 미리 적재"""
+    try:
+        planner._load_sub_index()
+    except FileNotFoundError:
+        pass
+    planner._load_car_model()
+    planner._load_bus_index()
+    planner._load_graph()
+
+
+def _merge_prefs(override) -> Prefs:
+    """
+    저장된 선호도 위에 요청 prefs 를 덮어씀 (모드별 dict 는 키 단위 병합).
+    형식이 맞지 않는 값은 BadRequest.
+    """
+    if override is None:
+        return planner.current_prefs()
+    if not isinstance(override, Mapping):
+        raise BadRequest("prefs 는 JSON 객체여야 합니다")
+    base = planner.current_prefs().to_dict()
+    for k, v in override.items():
+        if isinstance(base.get(k), dict):
+            if not isinstance(v, Mapping):
+                raise BadRequest(f"prefs.{k} 는 JSON 객체여야 합니다")
+            base[k] = {**base[k], **v}
+        else:
+            base[k] = v
+    try:
+        return Prefs.from_dict(base)
+    except (TypeError, ValueError) as e:
+        raise BadRequest(f"prefs 값 형식 오류: {e}") from None
+
+
+def _seg_record(s: Mapping) -> Dict:
+    poly = np.asarray(s.get("poly", ()), dtype=np.float64).reshape(-1, 2)
+    return {
+        "mode": s["mode"],
+        "name": str(s["name"]),
+        "duration_min": float(s["duration_min"]),
+        "distance_m": float(s["distance_m"] or 0),
+        "crowd": int(s["crowd"]),
+        "crowd_mean": float(s.get("crowd_mean", s["crowd"])),
+        "best_car": s.get("best_car"),
+        "stops": list(s.get("stops") or ()),
+        "enc": polyline.encode(poly.tolist()) if len(poly) else "",
+    }
+
+
+def _route_record(segs, score: float) -> Dict:
+    return {
+        "score": round(float(score), 3),
+        "total_min": float(sum(s["duration_min"] for s in segs)),
+        "modes": "/".join(s["mode"] for s in segs),
+        "segments": [_seg_record(s) for s in segs],
+    }
+
+
+def plan(body: Mapping) -> Dict:
+    """요청 1 건 → 응답 dict (입력 오류는 BadRequest)"""
+    if not isinstance(body, Mapping):
+        raise BadRequest("본문은 JSON 객체여야 합니다")
+    with metrics.trace("plan") as tr:
+        out = _plan(body)
+    if tr is not None and body.get("trace"):
+        out["trace"] = tr.as_dict()
+    return out
+
+
+def _plan(body: Mapping) -> Dict:
+    try:
+        origin, dest = str(body["origin"]).strip(), str(body["dest"]).strip()
+    except KeyError as e:
+        raise BadRequest(f"'{e.args[0]}' 필드가 없습니다") from None
+    try:
+        depart = datetime.fromisoformat(body["depart"]) if body.get("depart") else None
+    except (TypeError, ValueError):
+        raise BadRequest("depart 는 ISO 8601 시각이어야 합니다") from None
+    depart = depart or datetime.now()
+    prefs = _merge_prefs(body.get("prefs"))
+    try:
+        o = planner.parse_location(origin)
+        d = planner.parse_location(dest)
+    except ValueError as e:
+        raise BadRequest(str(e), HTTPStatus.UNPROCESSABLE_ENTITY) from None
+    except requests.RequestException as e:  # 지오코딩 API 장애 → 상류 오류
+        raise BadRequest(f"지오코딩 실패: {e}", HTTPStatus.BAD_GATEWAY) from None
+
+    routes = planner.odsay_all_routes(o, d, depart=depart)
+    scores = planner.score_routes(routes, prefs=prefs) if routes else []
+    best_idx, segs = planner.choose_best_route(routes, prefs=prefs)
+    out = {
+        "status": "ok" if segs else "no_route",
+        "origin": {"input": origin, "lat": o[0], "lng": o[1]},
+        "dest": {"input": dest, "lat": d[0], "lng": d[1]},
+        "depart": depart.isoformat(timespec="minutes"),
+        "best_idx": best_idx,
+        "candidates": [_route_record(r, sc) for r, sc in zip(routes, scores)],
+        "fallback": None,
+        "hint": planner.departure_hint(routes, prefs=prefs, start=depart),
+    }
+    if not segs:
+        segs = planner.fallback_route(o, d, prefs=prefs)
+        out["fallback"] = _route_record(segs, planner.score_route(segs, prefs=prefs))
+    if body.get("map"):
+        out["map"] = route_geojson(segs, o, d, planner.MAP_STYLE)
+    return out
+
+
+def health() -> Dict:
+    return {
+        "status": "ok",
+        "route_cache": planner.route_cache_stats(),
+        "geocode_cache": planner.geocode_cache_stats(),
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HTTP
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict, bytes]:
+    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+    if not line:
+        raise ConnectionResetError
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise BadRequest("잘못된 요청 줄") from None
+    headers: Dict[str, str] = {}
+    while (h := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        k, _, v = h.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    try:
+        n = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise BadRequest("잘못된 Content-Length") from None
+    if n < 0:
+        raise BadRequest("잘못된 Content-Length")
+    if n > MAX_BODY:
+        raise BadRequest("요청 본문이 너무 큽니다", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+    body = await reader.readexactly(n) if n else b""
+    return method.upper(), target.split("?", 1)[0], headers, body
+
+
+def _response(status: HTTPStatus, payload, keep_alive: bool) -> bytes:
+    body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+class PlannerServer:
+    def __init__(self, workers: int = DEFAULT_WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="plan")
+
+    async def dispatch(self, method: str, path: str, body: bytes):
+        loop = asyncio.get_running_loop()
+        if path == "/health" and method == "GET":
+            return HTTPStatus.OK, health()
+        if path == "/metrics" and method == "GET":
+            return HTTPStatus.OK, metrics.snapshot()
+        if path == "/plan" and method == "POST":
+            try:
+                req = orjson.loads(body or b"{}")
+            except orjson.JSONDecodeError:
+                raise BadRequest("본문이 JSON 이 아닙니다") from None
+            if not isinstance(req, dict):
+                raise BadRequest("본문은 JSON 객체여야 합니다")
+            return HTTPStatus.OK, await loop.run_in_executor(self.pool, plan, req)
+        if path in ("/health", "/metrics", "/plan"):
+            raise BadRequest("허용되지 않는 메서드", HTTPStatus.METHOD_NOT_ALLOWED)
+        raise BadRequest(f"{path} 없음", HTTPStatus.NOT_FOUND)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                keep = False  # 요청을 다 읽기 전 오류 → 남은 바이트가 있으니 종료
+                try:
+                    method, path, headers, body = await _read_request(reader)
+                    keep = headers.get("connection", "").lower() != "close"
+                    status, payload = await self.dispatch(method, path, body)
+                except BadRequest as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    break
+                except asyncio.TimeoutError:
+                    break
+                except Exception as e:  # 한 요청의 실패가 서비스를 멈추지 않도록
+                    print(f"[serve] {type(e).__name__}: {e}", file=sys.stderr)
+                    status = HTTPStatus.INTERNAL_SERVER_ERROR
+                    payload = {"error": f"{type(e).__name__}: {e}"}
+                writer.write(_response(status, payload, keep))
+                await writer.drain()
+                if not keep:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int, ready: asyncio.Event | None = None):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.pool, warm)
+        server = await asyncio.start_server(self.handle, host, port)
+        self.port = server.sockets[0].getsockname()[1]
+        print(f"[serve] http://{host}:{self.port}", file=sys.stderr)
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="상주 경로 플래너 JSON HTTP 서비스")
+    p.add_argument("--host", default=DEFAULT_HOST)
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = p.parse_args(argv)
+    srv = PlannerServer(args.workers)
+    try:
+        asyncio.run(srv.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+spatial.py
+===============================================================
+역 좌표 공간 인덱스 (격자 버킷)
+----------------------------------------------------------------
+* 역 좌표를 평면(등장방형) 미터 좌표로 투영해 `cell_m` 크기 격자에 버킷팅.
+  역은 셀 키 순으로 정렬해 두고 셀 → (시작, 끝) 구간만 dict 로 보관합니다.
+* 반경 질의: 반경을 덮는 셀들의 후보만 모아 haversine 을 벡터로 계산.
+* k-최근접: 반경을 두 배씩 넓히며 반경 질의를 반복 (정확한 결과).
+* `*_batch` 는 여러 질의점을 한 번에 처리합니다.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+from geometry import EARTH_R, haversine_matrix, haversine_to
+
+CELL_M = 500.0
+DENSE_LIMIT = 4_000_000  # 질의수 × 역수 가 이 이하면 (Q, N) 거리 행렬로 한 번에 계산
+_KEY_SHIFT = 1 << 32
+
+
+class StationIndex:
+    def __init__(self, lat: np.ndarray, lng: np.ndarray, *, cell_m: float = CELL_M):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        self.cell_m = cell_m
+        self._lat0 = float(self.lat.mean()) if len(self.lat) else 37.5
+        self._kx = EARTH_R * math.cos(math.radians(self._lat0)) * math.pi / 180
+        self._ky = EARTH_R * math.pi / 180
+        cx, cy = self._cells(self.lat, self.lng)
+        keys = cx * _KEY_SHIFT + cy
+        self._order = np.argsort(keys, kind="stable")
+        sk = keys[self._order]
+        uniq, start = np.unique(sk, return_index=True)
+        end = np.append(start[1:], len(sk))
+        self._buckets = {int(k): (int(a), int(b)) for k, a, b in zip(uniq, start, end)}
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def _cells(self, lat, lng):
+        cx = np.floor(np.asarray(lng) * self._kx / self.cell_m).astype(np.int64)
+        cy = np.floor(np.asarray(lat) * self._ky / self.cell_m).astype(np.int64)
+        return cx, cy
+
+    def _candidates(self, lat: float, lng: float, radius_m: float) -> np.ndarray:
+        cx, cy = self._cells(lat, lng)
+        r = int(math.ceil(radius_m / self.cell_m)) + 1  # 투영 오차 여유 1칸
+        parts = []
+        for x in range(int(cx) - r, int(cx) + r + 1):
+            for y in range(int(cy) - r, int(cy) + r + 1):
+                span = self._buckets.get(x * _KEY_SHIFT + y)
+                if span:
+                    parts.append(self._order[span[0] : span[1]])
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+    # ── 단일 질의 ────────────────────────────────────────────────────────────
+    def within(
+        self, lat: float, lng: float, radius_m: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """반경 내 역 (인덱스, 거리 m) – 거리 오름차순"""
+        # 격자를 너무 많이 돌아야 하면 전체 벡터 계산이 더 빠름
+        if radius_m / self.cell_m > 40:
+            cand = np.arange(len(self))
+        else:
+            cand = self._candidates(lat, lng, radius_m)
+        d = haversine_to(lat, lng, self.lat[cand], self.lng[cand])
+        keep = d <= radius_m
+        cand, d = cand[keep], d[keep]
+        o = np.argsort(d, kind="stable")
+        return cand[o], d[o]
+
+    def nearest(
+        self, lat: float, lng: float, k: int = 1, max_radius_m: float | None = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """k 개 최근접 역 (인덱스, 거리 m) – max_radius_m 밖은 제외"""
+        if len(self) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        r = self.cell_m
+        limit = max_radius_m if max_radius_m is not None else math.inf
+        while True:
+            rr = min(r, limit)
+            idx, d = self.within(lat, lng, rr)
+            if len(idx) >= k or rr >= limit or len(idx) == len(self):
+                return idx[:k], d[:k]
+            if r / self.cell_m > 40:  # 충분히 넓음 → 전체 계산
+                d = haversine_to(lat, lng, self.lat, self.lng)
+                o = np.argsort(d, kind="stable")[:k]
+                o = o[d[o] <= limit]
+                return o, d[o]
+            r *= 2
+
+    # ── 배치 질의 ────────────────────────────────────────────────────────────
+    def within_batch(
+        self, points: np.ndarray, radius_m: float
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(pts) * len(self) > DENSE_LIMIT:
+            return [self.within(la, lo, radius_m) for la, lo in pts.tolist()]
+        D = haversine_matrix(pts[:, 0], pts[:, 1], self.lat, self.lng)
+        out = []
+        for row in D:
+            i = np.nonzero(row <= radius_m)[0]
+            o = np.argsort(row[i], kind="stable")
+            out.append((i[o], row[i][o]))
+        return out
+
+    def nearest_batch(
+        self, points: np.ndarray, k: int = 1, max_radius_m: float | None = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(Q, k) 인덱스·거리 배열 – 모자란 칸은 -1 / inf"""
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        idx = np.full((len(pts), k), -1, dtype=np.intp)
+        dist = np.full((len(pts), k), np.inf)
+        if len(self) and len(pts) * len(self) <= DENSE_LIMIT:
+            D = haversine_matrix(pts[:, 0], pts[:, 1], self.lat, self.lng)
+            kk = min(k, len(self))
+            part = np.argpartition(D, kk - 1, axis=1)[:, :kk]
+            pd = np.take_along_axis(D, part, axis=1)
+            o = np.argsort(pd, axis=1, kind="stable")
+            part, pd = np.take_along_axis(part, o, 1), np.take_along_axis(pd, o, 1)
+            if max_radius_m is not None:
+                far = pd > max_radius_m
+                part[far], pd[far] = -1, np.inf
+            idx[:, :kk], dist[:, :kk] = part, pd
+            return idx, dist
+        for q, (la, lo) in enumerate(pts.tolist()):
+            i, d = self.nearest(la, lo, k, max_radius_m)
+            idx[q, : len(i)], dist[q, : len(d)] = i, d
+        return idx, dist
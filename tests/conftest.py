@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 저장소 루트의 평면 모듈(server, batch …)을 import 할 수 있게
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
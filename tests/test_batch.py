@@ -0,0 +1,86 @@
+"""batch.py 체크포인트 – 실행 도중 죽어도 기록된 행은 읽을 수 있고 --resume 이 이어감"""
+
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+import batch
+import planner
+
+ROOT = Path(__file__).resolve().parents[1]
+N = 35
+
+# 지오코딩을 막아 네트워크 없이 행을 만들고, id 25 처리 중 프로세스를 강제 종료
+CRASH = textwrap.dedent("""
+    import os, sys
+    from pathlib import Path
+    import batch, planner
+
+    def no_geocode(q):
+        raise ValueError(f"검색 결과 없음: {q}")
+
+    def plan_pair(pair, prefs, _orig=batch.plan_pair):
+        if pair["id"] == "25":
+            os._exit(9)  # kill -9 흉내 – close()·finally 없이 종료
+        return _orig(pair, prefs)
+
+    planner.parse_location = no_geocode
+    batch.plan_pair = plan_pair
+    batch.PARQUET_BATCH = 10
+    batch.run_batch(Path(sys.argv[1]), Path(sys.argv[2]), workers=1, progress=False)
+    """)
+
+
+def _no_geocode(q):
+    raise ValueError(f"검색 결과 없음: {q}")
+
+
+def test_parquet_resume_after_kill(tmp_path, monkeypatch):
+    src = tmp_path / "od.csv"
+    src.write_text(
+        "id,origin,dest\n" + "".join(f"{i},출발{i},도착{i}\n" for i in range(N)),
+        encoding="utf-8",
+    )
+    out = tmp_path / "out.parquet"
+    env = {**os.environ, "HOME": str(tmp_path), "PYTHONPATH": str(ROOT)}
+    r = subprocess.run(
+        [sys.executable, "-c", CRASH, str(src), str(out)],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert r.returncode == 9, r.stderr
+
+    # 체크포인트에 있는 id 는 모두 읽을 수 있는 파일에 있어야 함
+    done = (tmp_path / "out.parquet.done").read_text(encoding="utf-8").split()
+    assert done
+    written = [
+        i.as_py() for p in batch.parquet_parts(out) for i in pq.read_table(p)["id"]
+    ]
+    assert sorted(written) == sorted(done)
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setattr(planner, "parse_location", _no_geocode)
+    monkeypatch.setattr(batch, "PARQUET_BATCH", 10)
+    counts = batch.run_batch(src, out, workers=2, resume=True, progress=False)
+    assert counts["skipped"] == len(done)
+
+    ids = [i.as_py() for p in batch.parquet_parts(out) for i in pq.read_table(p)["id"]]
+    assert sorted(ids, key=int) == [str(i) for i in range(N)]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_parquet_fresh_run_replaces_old_parts(tmp_path, monkeypatch):
+    src = tmp_path / "od.csv"
+    src.write_text("origin,dest\n가,나\n다,라\n", encoding="utf-8")
+    out = tmp_path / "out.parquet"
+    (tmp_path / "out.part1.parquet").write_bytes(b"stale")
+    monkeypatch.setattr(planner, "parse_location", _no_geocode)
+    batch.run_batch(src, out, workers=1, progress=False)
+    assert batch.parquet_parts(out) == [out]
+    assert pq.read_table(out).num_rows == 2
@@ -0,0 +1,17 @@
+"""`import planner` 콜드 스타트 예산 – check_import_time.py 를 새 인터프리터로 실행"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_cold_import_within_budget():
+    r = subprocess.run(
+        [sys.executable, str(ROOT / "check_import_time.py"), "--runs", "3"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert r.returncode == 0, r.stdout + r.stderr
@@ -0,0 +1,44 @@
+"""server.py HTTP 파싱 – 잘못된 요청 헤더는 500 이 아니라 400"""
+
+import asyncio
+
+import orjson
+import pytest
+
+import server
+
+
+async def _roundtrip(raw: bytes):
+    srv = server.PlannerServer(workers=1)
+    tcp = await asyncio.start_server(srv.handle, "127.0.0.1", 0)
+    try:
+        port = tcp.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), 5)  # 서버가 연결을 닫을 때까지
+        writer.close()
+    finally:
+        tcp.close()
+        await tcp.wait_closed()
+        srv.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), head.decode("latin-1"), orjson.loads(body)
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_bad_content_length_is_400(length):
+    raw = (
+        f"POST /plan HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n{{}}"
+    ).encode()
+    status, head, payload = asyncio.run(_roundtrip(raw))
+    assert status == 400
+    assert "Content-Length" in payload["error"]
+    assert "Connection: close" in head
+
+
+def test_oversized_body_is_413():
+    raw = f"POST /plan HTTP/1.1\r\nContent-Length: {server.MAX_BODY + 1}\r\n\r\n"
+    status, head, _ = asyncio.run(_roundtrip(raw.encode()))
+    assert status == 413
+    assert "Connection: close" in head
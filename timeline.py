@@ -0,0 +1,277 @@
+"""
+timeline.py
+===============================================================
+경로 시간축 – 구간별 예상 도착 시각과 출발 시각 스윕
+----------------------------------------------------------------
+* 각 구간의 출발 오프셋(분) = 앞 구간 소요 시간 누적합.
+  지하철 혼잡은 "지금"이 아니라 그 구간에 실제로 도착할 시각에서
+  앞뒤 30분 슬롯을 선형 보간해 조회합니다 (`SubwayCrowdIndex.gather_interp`).
+* 지하철 구간은 passStopList 의 모든 출발역을 (역 id, 방향, 그 역 통과 시각)으로
+  펼쳐 한 번에 gather 하고, 구간별 최고 레벨(crowd)과 역간 소요 시간 가중
+  평균 레벨(crowd_mean)로 모읍니다.
+* `departure_sweep` : 이미 받아 둔 후보들을 출발 시각 T 개(예: 5분 간격 2시간)에
+  대해 (T, 지하철 구간) 혼잡과 (T, 버스 구간) 승차 시 혼잡(`BusCrowdIndex`,
+  `annotate_crowd` 와 같은 노선·정류장 키)을 한 번에 gather → (T, N) 점수를 계산.
+  버스 표에서 찾지 못한 구간은 이미 채워 둔 crowd 를 그대로 씁니다.
+  네트워크 호출 없이 "10분 늦게 출발하면 훨씬 한산" 같은 안내가 가능합니다.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+import metrics
+from buscrowd import BusCrowdIndex, boards_to_levels
+from crowd import (
+    DAY_INDEX,
+    FALLBACK_LEVEL,
+    SubwayCrowdIndex,
+    aggregate_levels,
+    slot_positions,
+)
+from geometry import cumulative_length
+from scoring import MODE_IDX, RouteMatrix, score_sweep
+
+SUBWAY = MODE_IDX["SUBWAY"]
+BUS = MODE_IDX["BUS"]
+
+
+def start_offsets(rm: RouteMatrix) -> np.ndarray:
+    """(N, M) 구간 시작 시각 – 경로 출발 기준 분"""
+    return np.cumsum(rm.duration, axis=1) - rm.duration
+
+
+def _legs(seg, start: float):
+    """
+    지하철 구간 1 개 → (출발역 이름들, 각 역 출발 오프셋(분), 역~다음 역 소요 가중치).
+    역 사이 시간은 정차역 좌표 누적 거리 비율로 배분 (좌표 없으면 균등).
+    """
+    names = list(seg.get("stops") or ())
+    if len(names) < 2:
+        return [names[0] if names else seg["name"]], np.array([start]), np.ones(1)
+    dur = float(seg["duration_min"])
+    poly = np.asarray(seg.get("poly", ()), dtype=np.float64).reshape(-1, 2)
+    cum = cumulative_length(poly) if len(poly) == len(names) else np.zeros(0)
+    frac = cum / cum[-1] if len(cum) and cum[-1] > 0 else np.linspace(0, 1, len(names))
+    w = np.diff(frac) * dur
+    if w.sum() <= 0:
+        w = np.ones(len(names) - 1)
+    return names[:-1], start + frac[:-1] * dur, w
+
+
+@dataclass(frozen=True)
+class SubwayStops:
+    """
+    모든 후보의 지하철 구간을 '출발역' 단위로 평탄화한 조회 키 (P 개 역, S 개 구간)
+    """
+
+    route: np.ndarray  # intp (S,) 구간이 속한 후보
+    seg: np.ndarray  # intp (S,) 후보 내 구간 위치
+    group: np.ndarray  # intp (P,) 역 → 구간 번호 (0..S-1)
+    station_ids: np.ndarray  # int32 (P,) – 모르는 역 -1
+    direction: np.ndarray  # int8 (P,) – 0 상선 / 1 하선 / -1 모름
+    offset: np.ndarray  # float64 (P,) 경로 출발 → 그 역 출발까지 분
+    weight: np.ndarray  # float64 (P,) 그 역 ~ 다음 역 소요 분
+
+    @classmethod
+    def build(cls, routes: Sequence, rm: RouteMatrix, index: SubwayCrowdIndex | None):
+        r, s = np.nonzero(rm.mode == SUBWAY)
+        starts = start_offsets(rm)
+        names, group, dirs, offs, ws = [], [], [], [], []
+        for g, (i, j) in enumerate(zip(r.tolist(), s.tolist())):
+            seg = routes[i][j]
+            nm, off, w = _legs(seg, float(starts[i, j]))
+            names += nm
+            group += [g] * len(nm)
+            dirs += [seg.get("direction", -1)] * len(nm)
+            offs.append(off)
+            ws.append(w)
+        ids = (
+            index.station_ids_of(names)
+            if index is not None
+            else np.full(len(names), -1, dtype=np.int32)
+        )
+        return cls(
+            route=r,
+            seg=s,
+            group=np.asarray(group, dtype=np.intp),
+            station_ids=ids,
+            direction=np.asarray(dirs, dtype=np.int8),
+            offset=np.concatenate(offs) if offs else np.zeros(0),
+            weight=np.concatenate(ws) if ws else np.zeros(0),
+        )
+
+    def __len__(self) -> int:
+        return len(self.seg)
+
+
+def _bus_keys(seg) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """버스 구간 → (노선 후보 키들, 승차 정류장 후보 키들)"""
+    keys = getattr(seg, "bus_keys", None)
+    if keys:
+        return keys
+    return (str(seg["name"]),), tuple(seg.get("stops") or ())[:1]
+
+
+@dataclass(frozen=True)
+class BusStops:
+    """
+    모든 후보의 버스 구간 조회 키 (B 개 구간). 키는 annotate_crowd 가 구간에 남긴
+    `bus_keys` (busLocalBlID/busID/busNo · 정류장 id/ARS/이름) 를 그대로 사용 →
+    없을 때(dict 구간)만 (구간 name, 첫 정차역)
+    """
+
+    route: np.ndarray  # intp (B,) 구간이 속한 후보
+    seg: np.ndarray  # intp (B,) 후보 내 구간 위치
+    route_ids: np.ndarray  # int32 (B,) 버스 표 노선 id (-1 모름)
+    pair_ids: np.ndarray  # int32 (B,) 버스 표 (노선, 정류장) id (-1 모름)
+    offset: np.ndarray  # float64 (B,) 경로 출발 → 승차까지 분
+
+    @classmethod
+    def build(cls, routes: Sequence, rm: RouteMatrix, index: BusCrowdIndex | None):
+        r, s = np.nonzero(rm.mode == BUS)
+        segs = [routes[i][j] for i, j in zip(r.tolist(), s.tolist())]
+        if index:
+            keys = [_bus_keys(seg) for seg in segs]
+            rid, pid = index.ids_of([k[0] for k in keys], [k[1] for k in keys])
+        else:
+            rid = pid = np.full(len(segs), -1, dtype=np.int32)
+        return cls(r, s, rid, pid, start_offsets(rm)[r, s])
+
+    def __len__(self) -> int:
+        return len(self.seg)
+
+
+def bus_crowd(
+    stops: BusStops, index: BusCrowdIndex | None, departs: Sequence[datetime]
+):
+    """출발 시각 T 개 × 버스 구간 B 개 → (레벨 (T, B), 데이터 있음 여부 (T, B))"""
+    T, B = len(departs), len(stops)
+    if not index or not B:
+        return (
+            np.full((T, B), FALLBACK_LEVEL, dtype=np.int8),
+            np.zeros((T, B), dtype=bool),
+        )
+    base = departs[0].replace(hour=0, minute=0, second=0, microsecond=0)
+    dep_min = np.array([(t - base).total_seconds() / 60 for t in departs])
+    hours = ((dep_min[:, None] + stops.offset[None, :]) // 60).astype(np.intp)
+    board = index.gather(stops.route_ids[None, :], stops.pair_ids[None, :], hours)
+    return boards_to_levels(board), ~np.isnan(board)
+
+
+def segment_crowd(
+    stops: SubwayStops,
+    index: SubwayCrowdIndex | None,
+    departs: Sequence[datetime],
+):
+    """
+    출발 시각 T 개 × 역 P 개를 한 번에 gather
+    → 구간별 (최고 레벨, 평균 레벨, 데이터 있음 여부) (T, S)
+    """
+    T, S = len(departs), len(stops)
+    if index is None or not len(stops.group):
+        return (
+            np.full((T, S), FALLBACK_LEVEL, dtype=np.int8),
+            np.full((T, S), FALLBACK_LEVEL, dtype=np.float32),
+            np.zeros((T, S), dtype=bool),
+        )
+    base = departs[0].replace(hour=0, minute=0, second=0, microsecond=0)
+    dep_min = np.array([(t - base).total_seconds() / 60 for t in departs])
+    abs_min = dep_min[:, None] + stops.offset[None, :]  # (T, P)
+    wd = (base.weekday() + (abs_min // (24 * 60)).astype(np.int64)) % 7
+    pct = index.gather_interp(
+        stops.station_ids[None, :],
+        DAY_INDEX[wd],
+        slot_positions(abs_min % (24 * 60)),
+        stops.direction[None, :],
+    )
+    group = np.arange(T)[:, None] * S + stops.group[None, :]
+    peak, mean = aggregate_levels(pct, group, stops.weight[None, :], T * S)
+    known = np.bincount(group[~np.isnan(pct)], minlength=T * S) > 0
+    return peak.reshape(T, S), mean.reshape(T, S), known.reshape(T, S)
+
+
+def apply_subway_crowd(routes: Sequence, index: SubwayCrowdIndex | None, depart):
+    """Route 들의 지하철 구간 crowd(최고)·crowd_mean(평균)을 예상 시각 기준으로 채움"""
+    rm = RouteMatrix.from_routes(routes)
+    stops = SubwayStops.build(routes, rm, index)
+    peak, mean, known = segment_crowd(stops, index, [depart])
+    metrics.incr("crowd.fallback.subway", int((~known).sum()))
+    for k, (i, j) in enumerate(zip(stops.route.tolist(), stops.seg.tolist())):
+        seg = routes[i][j]
+        seg.crowd, seg.crowd_mean = int(peak[0, k]), round(float(mean[0, k]), 3)
+
+
+def crowd_cube(
+    rm: RouteMatrix,
+    stops: SubwayStops,
+    index: SubwayCrowdIndex | None,
+    departs: Sequence[datetime],
+    bus: BusStops | None = None,
+    bus_index: BusCrowdIndex | None = None,
+):
+    """
+    출발 시각별 구간 혼잡 (T, N, M) 최고·평균 – 지하철·버스(표에 있는 구간) 외에는
+    rm 값 그대로
+    """
+    T = len(departs)
+    peak = np.broadcast_to(rm.crowd, (T, *rm.crowd.shape)).copy()
+    mean = np.broadcast_to(rm.crowd_mean, (T, *rm.crowd.shape)).copy()
+    if len(stops):
+        p, m, _ = segment_crowd(stops, index, departs)
+        peak[:, stops.route, stops.seg] = p
+        mean[:, stops.route, stops.seg] = m
+    if bus is not None and len(bus):
+        lv, known = bus_crowd(bus, bus_index, departs)
+        r, s = bus.route, bus.seg
+        peak[:, r, s] = np.where(known, lv, peak[:, r, s])
+        mean[:, r, s] = np.where(known, lv, mean[:, r, s])
+    return peak, mean
+
+
+@dataclass(frozen=True)
+class Sweep:
+    departs: List[datetime]
+    scores: np.ndarray  # (T, N)
+    best: np.ndarray  # (T,) 출발 시각별 최적 후보 (0-based)
+    best_score: np.ndarray  # (T,)
+
+    def best_departure(self) -> int:
+        """점수가 가장 낮은 출발 시각 인덱스"""
+        return int(np.argmin(self.best_score))
+
+
+def departure_sweep(
+    routes: Sequence,
+    index: SubwayCrowdIndex | None,
+    pv: np.ndarray,
+    start: datetime,
+    *,
+    bus_index: BusCrowdIndex | None = None,
+    step_min: float = 5,
+    span_min: float = 120,
+) -> Sweep:
+    """start 부터 step_min 간격으로 span_min 까지 출발했을 때의 (T, N) 점수"""
+    departs = [
+        start + timedelta(minutes=float(m))
+        for m in np.arange(0, span_min + 1e-9, step_min)
+    ]
+    rm = RouteMatrix.from_routes(routes)
+    peak, mean = crowd_cube(
+        rm,
+        SubwayStops.build(routes, rm, index),
+        index,
+        departs,
+        BusStops.build(routes, rm, bus_index),
+        bus_index,
+    )
+    scores = score_sweep(rm, peak, pv, mean)
+    if scores.shape[1] == 0:
+        empty = np.full(len(departs), -1)
+        return Sweep(departs, scores, empty, np.full(len(departs), np.inf))
+    best = scores.argmin(axis=1)
+    return Sweep(departs, scores, best, scores[np.arange(len(departs)), best])